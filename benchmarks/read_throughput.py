@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks how fast the default IO cycle can read from a serial port.
+
+Opens a pseudo-terminal pair, writes to one end at the rate the given baud
+rate allows (10 bits per byte), and runs `Connection._default_cycle()` on the
+other end. Compares the achieved throughput with the line rate and with
+the old cycle that read one byte at a time. POSIX only.
+
+Usage:
+
+    python benchmarks/read_throughput.py [baud] [seconds]
+"""
+
+import os
+import sys
+import threading
+import time
+import tty
+
+import serial
+
+from com_server import Connection, ReceiveQueue, SendQueue
+
+
+class _CountingQueue(ReceiveQueue):
+    """Receive queue that counts how many bytes were pushed"""
+
+    total = 0
+
+    def pushitems(self, *args: bytes) -> None:
+        self.total += sum(len(i) for i in args)
+        super().pushitems(*args)
+
+
+def _legacy_cycle(
+    conn: serial.Serial, rcv_queue: ReceiveQueue, send_queue: SendQueue
+) -> None:
+    """The default cycle before bulk reads were added (receive part only)"""
+
+    if conn.in_waiting:
+        incoming = b""
+        while conn.in_waiting:
+            incoming += conn.read()
+            time.sleep(0.001)
+
+        rcv_queue.pushitems(incoming)
+
+
+def _writer(fd: int, baud: int, seconds: float, stop: threading.Event) -> None:
+    """Writes lines to `fd` no faster than `baud` allows"""
+
+    line = b"0123456789abcdefghijklmnopqrstuvwxyz0123456789ABCDEFGHIJKL\r\n"
+    bytes_per_sec = baud / 10
+    sent = 0
+    st = time.perf_counter()
+
+    while not stop.is_set() and time.perf_counter() - st < seconds:
+        # stay on schedule with the line rate
+        if sent > (time.perf_counter() - st) * bytes_per_sec:
+            time.sleep(0.001)
+            continue
+
+        os.write(fd, line)
+        sent += len(line)
+
+
+def bench(cycle_name: str, baud: int, seconds: float) -> float:
+    """Runs one cycle function for `seconds` and returns the bytes/sec read"""
+
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+
+    conn = Connection(baud, os.ttyname(slave))
+    ser = serial.Serial(os.ttyname(slave), baud, timeout=1)
+    rcv_queue = _CountingQueue([], 256)
+    send_queue = SendQueue([])
+
+    cycle = conn._default_cycle if cycle_name == "bulk" else _legacy_cycle
+
+    stop = threading.Event()
+    writer = threading.Thread(
+        target=_writer, args=(master, baud, seconds, stop), daemon=True
+    )
+
+    st = time.perf_counter()
+    writer.start()
+    while writer.is_alive():
+        cycle(ser, rcv_queue, send_queue)
+        time.sleep(0.01)  # rest_cpu
+
+    # drain whatever is left
+    cycle(ser, rcv_queue, send_queue)
+    elapsed = time.perf_counter() - st
+
+    stop.set()
+    ser.close()
+    os.close(master)
+    os.close(slave)
+
+    return rcv_queue.total / elapsed
+
+
+def main() -> int:
+    if os.name != "posix":
+        print("This benchmark needs a POSIX pseudo-terminal")
+        return 1
+
+    baud = int(sys.argv[1]) if len(sys.argv) > 1 else 115200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    line_rate = baud / 10
+
+    print(f"line rate at {baud} baud: {line_rate:.0f} bytes/sec")
+
+    for name in ("legacy", "bulk"):
+        rate = bench(name, baud, seconds)
+        print(
+            f"{name:>7}: {rate:10.0f} bytes/sec ({rate / line_rate:6.1%} of line rate)"
+        )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
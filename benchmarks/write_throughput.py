@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmarks how many messages per second the default IO cycle can send.
+
+Opens a pseudo-terminal pair, fills the send queue with short messages, and runs
+`Connection._default_cycle()` on one end while counting the lines that arrive on the
+other end. Compares writing one message at a time with joining messages into one write
+(`coalesce_bytes`). A pseudo-terminal is not limited by the baud rate, so this
+measures the overhead of the cycle itself. POSIX only.
+
+Usage:
+
+    python benchmarks/write_throughput.py [baud] [seconds] [coalesce_bytes]
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+import tty
+
+import serial
+
+from com_server import Connection, ReceiveQueue, SendQueue
+
+MESSAGE = b"set 12 345\r\n"
+
+
+def _reader(fd: int, counts: list, stop: threading.Event) -> None:
+    """Counts the lines read from `fd`"""
+
+    while not stop.is_set():
+        try:
+            counts[0] += os.read(fd, 65536).count(b"\n")
+        except OSError:
+            return
+
+
+def bench(baud: int, seconds: float, coalesce_bytes: int) -> float:
+    """Runs the default cycle for `seconds` and returns the messages/sec received"""
+
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+
+    conn = Connection(baud, os.ttyname(slave), coalesce_bytes=coalesce_bytes)
+    ser = serial.Serial(os.ttyname(slave), baud, timeout=1)
+
+    # more than can be sent in `seconds` either way
+    to_send = collections.deque([MESSAGE] * int(baud / 10 / len(MESSAGE) * seconds * 2))
+    rcv_queue = ReceiveQueue([], 256)
+    send_queue = SendQueue(to_send)
+
+    counts = [0]
+    stop = threading.Event()
+    reader = threading.Thread(target=_reader, args=(master, counts, stop), daemon=True)
+    reader.start()
+
+    st = time.perf_counter()
+    while time.perf_counter() - st < seconds:
+        conn._default_cycle(ser, rcv_queue, send_queue)
+        time.sleep(0.01)  # rest_cpu
+
+    time.sleep(0.1)  # let the reader catch up
+    elapsed = time.perf_counter() - st
+
+    stop.set()
+    ser.close()
+    os.close(slave)
+    os.close(master)
+
+    return counts[0] / elapsed
+
+
+def main() -> int:
+    if os.name != "posix":
+        print("This benchmark needs a POSIX pseudo-terminal")
+        return 1
+
+    baud = int(sys.argv[1]) if len(sys.argv) > 1 else 115200
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3.0
+    coalesce_bytes = int(sys.argv[3]) if len(sys.argv) > 3 else 4096
+    line_rate = baud / 10 / len(MESSAGE)
+
+    # a pseudo-terminal does not slow down to the baud rate, so the coalesced
+    # cycle can go faster than a real serial port could
+    print(f"line rate at {baud} baud: {line_rate:.0f} messages/sec")
+
+    single = bench(baud, seconds, 0)
+    print(f"{'one at a time':>18}: {single:8.0f} messages/sec")
+
+    coalesced = bench(baud, seconds, coalesce_bytes)
+    print(
+        f"{f'coalesced ({coalesce_bytes})':>18}: {coalesced:8.0f} messages/sec ({coalesced / single:.1f}x)"
+    )
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
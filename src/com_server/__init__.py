@@ -14,9 +14,21 @@ if vers.major < 3 or (vers.major == 3 and vers.minor < 6):
     raise EnvironmentError("Python version >= 3.6 is required")
 
 from .api_server import ConnectionResource, EndpointExistsException, RestApiHandler
+from .async_connection import AsyncConnection
 from .base_connection import ConnectException
 from .connection import Connection
 from .constants import *
+from .framing import (
+    BaseFramer,
+    CobsFramer,
+    DelimiterFramer,
+    FixedLengthFramer,
+    LengthPrefixFramer,
+    SlipFramer,
+)
+from .journal import ReceiveJournal
+from .macro import Macro, MacroStep
+from .poll import Poller, PollJob
 from .server import (
     ConnectionRoutes,
     add_resources,
@@ -25,6 +37,13 @@ from .server import (
     start_conns,
     DuplicatePortException,
 )
-from .tools import ReceiveQueue, SendQueue, all_ports
+from .tools import (
+    ReceiveQueue,
+    ReceiveSnapshot,
+    SendQueue,
+    SendRateLimiter,
+    all_ports,
+)
+from .websocket import WebSocketServer
 
 __version__ = "0.2b1"
@@ -9,6 +9,7 @@ Contains commands to run the COM server.
 
 import logging
 import sys
+import typing as t
 
 import click
 from flask import Flask
@@ -20,8 +21,18 @@ from serial import __version__ as s_v
 from . import __version__
 from .api import V1
 from .connection import Connection
+from .constants import (
+    IO_MODE_POLL,
+    IO_MODE_SELECT,
+    ROUTE_MAX_STREAMS,
+    ROUTE_MAX_WAITING,
+    SERVER_SPARE_THREADS,
+)
 from .server import ConnectionRoutes, start_app
 
+# threads needed for the default limits of ConnectionRoutes; see start_app()
+MIN_THREADS = ROUTE_MAX_WAITING + ROUTE_MAX_STREAMS + SERVER_SPARE_THREADS
+
 # logger setup
 logger = logging.getLogger(__name__)
 logger.propagate = (
@@ -82,6 +93,18 @@ def main(ctx: click.Context, version: bool) -> None:
     default=8080,
     help="The port of the host server (optional) [default: 8080].",
 )
+@click.option(
+    "--websocket-port",
+    type=int,
+    default=None,
+    help="If given, also serves a WebSocket connected to the serial port on this port (optional).",
+)
+@click.option(
+    "--threads",
+    type=click.IntRange(min=MIN_THREADS),
+    default=None,
+    help=f"The number of threads that serve requests (optional) [default: {MIN_THREADS}, the least allowed].",
+)
 @click.option(
     "--send-int",
     type=int,
@@ -100,6 +123,18 @@ def main(ctx: click.Context, version: bool) -> None:
     default=256,
     help="The maximum size of the receive queue [default: 256].",
 )
+@click.option(
+    "--queue-max-bytes",
+    type=int,
+    default=None,
+    help="The maximum total size, in bytes, of the data in the receive queue (optional) [default: no limit].",
+)
+@click.option(
+    "--io-mode",
+    type=click.Choice([IO_MODE_POLL, IO_MODE_SELECT]),
+    default=IO_MODE_POLL,
+    help="How the IO thread waits for serial data; 'select' is not supported on Windows [default: poll].",
+)
 @click.option(
     "--logfile",
     type=str,
@@ -115,9 +150,13 @@ def run(
     serport: str,
     host: str,
     port: int,
+    websocket_port: t.Optional[int],
+    threads: t.Optional[int],
     send_int: int,
     timeout: int,
     queue_size: int,
+    queue_max_bytes: t.Optional[int],
+    io_mode: str,
     logfile: str,
     cors: bool,
 ) -> None:
@@ -150,6 +189,8 @@ def run(
         timeout=timeout,
         send_interval=send_int,
         queue_size=queue_size,
+        queue_max_bytes=queue_max_bytes,
+        io_mode=io_mode,
     ) as conn:
         logger.info(f"Connection with serial port established at {conn.port}")
 
@@ -162,6 +203,15 @@ def run(
         handler = ConnectionRoutes(conn)
         V1(handler)
 
-        start_app(app, api, handler, logfile=logfile, host=host, port=port)
+        start_app(
+            app,
+            api,
+            handler,
+            logfile=logfile,
+            host=host,
+            port=port,
+            websocket_port=websocket_port,
+            threads=threads,
+        )
 
     logger.info("exited")
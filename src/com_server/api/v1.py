@@ -5,11 +5,40 @@
 Version 1 of Builtin API. All endpoints below will be prefixed with /v1/ and cannot be used.
 """
 
+import json
+import re
+import time
 import typing as t
 
-from flask_restful import reqparse, abort
+from flask import Response, request
+from flask_restful import inputs, reqparse, abort
 
-from .. import ConnectionResource, ConnectionRoutes, all_ports
+from .. import ConnectException, ConnectionResource, ConnectionRoutes, all_ports
+from ..constants import ACCESS_SHARED, ACCESS_UNLOCKED
+
+# longest time, in seconds, that /receive/next waits for new data
+RECEIVE_NEXT_MAX_WAIT = 60.0
+
+# number of objects that /receive (for a time range) and /receive/next return if no limit
+# is given, and the most they return, since with a journal they can cover the whole history
+RECEIVE_RANGE_DEFAULT_LIMIT = 1000
+RECEIVE_RANGE_MAX_LIMIT = 10000
+
+# time, in seconds, after which /stream sends a comment if there were no events,
+# so that the connection is not closed for being idle and closed clients are noticed
+STREAM_KEEPALIVE = 15.0
+
+# most objects that /stream reads from the receive queue at once
+STREAM_BATCH_SIZE = 256
+
+# most operations in one /batch request
+BATCH_MAX_OPS = 256
+
+# longest time, in seconds, that one "sleep" operation in /batch can sleep
+BATCH_MAX_SLEEP = 10.0
+
+# longest time, in seconds, that one /batch request runs, since it holds the serial port the whole time
+BATCH_MAX_TIME = 10.0
 
 
 class V1:
@@ -41,9 +70,14 @@ class V1:
             "/send": self._Sender,
             "/receive/<int:num_before>": self._Receiver,
             "/receive": self._All_Received,
+            "/receive/next": self._Receive_Next,
+            "/stream": self._Stream,
             "/get": self._Get,
             "/first_response": self._Get_First,
             "/send_until": self._Send_Until,
+            "/batch": self._Batch,
+            "/macros/<string:name>": self._Macro,
+            "/polls/<string:name>": self._Poll,
             "/connection_state": self._Connection_State,
             "/all_ports": self._All_Ports,
         }
@@ -76,21 +110,23 @@ class V1:
             args = self.parser.parse_args(strict=True)
 
             # no need for check_type because everything will be parsed as a string
-            res = self.conn.send(
+            dispatch_time = self.conn.queue_send(
                 *args["data"],
                 ending=args["ending"],
                 concatenate=args["concatenate"],
             )
 
-            if not res:
+            if dispatch_time is None:
                 # abort if failed to send
                 return {"message": "Failed to send"}
 
-            return {"message": "OK", "data": args}
+            return {"message": "OK", "data": args, "dispatch_time": dispatch_time}
 
     class _Receiver(ConnectionResource):
         """/receive/<int:num_before>"""
 
+        access = ACCESS_SHARED
+
         def get(self, num_before: int) -> dict:
             res = self.conn.receive_str(num_before=num_before)
 
@@ -106,7 +142,53 @@ class V1:
     class _All_Received(ConnectionResource):
         """/receive"""
 
+        access = ACCESS_SHARED
+
+        parser = reqparse.RequestParser()
+        parser.add_argument(
+            "since",
+            type=float,
+            location="args",
+            help="Only return data received at or after this timestamp",
+        )
+        parser.add_argument(
+            "until",
+            type=float,
+            location="args",
+            help="Only return data received at or before this timestamp",
+        )
+        parser.add_argument(
+            "limit",
+            type=int,
+            location="args",
+            help=f"Maximum number of objects to return, oldest first; by default {RECEIVE_RANGE_DEFAULT_LIMIT}, at most {RECEIVE_RANGE_MAX_LIMIT}",
+        )
+
         def get(self) -> dict:
+            # strict parsing would also try to read a JSON body, which GET requests do not have
+            args = self.parser.parse_args()
+
+            if any(args[arg] is not None for arg in ("since", "until", "limit")):
+                limit = args["limit"]
+                if limit is None:
+                    limit = RECEIVE_RANGE_DEFAULT_LIMIT
+                elif limit < 0:
+                    abort(400, message="limit has to be nonnegative")
+
+                rcv = self.conn.receive_range(
+                    args["since"], args["until"], min(limit, RECEIVE_RANGE_MAX_LIMIT)
+                )
+
+                return {
+                    "message": "OK",
+                    "seqs": [seq for seq, _, _ in rcv],
+                    "timestamps": [ts for _, ts, _ in rcv],
+                    "data": [
+                        self.conn.conv_bytes_to_str(data, errors="replace")
+                        for _, _, data in rcv
+                    ],
+                }
+
             all_rcv = self.conn.all_rcv()
 
             return {
@@ -115,9 +197,167 @@ class V1:
                 "data": [data for _, data in all_rcv],
             }
 
+    class _Receive_Next(ConnectionResource):
+        """/receive/next"""
+
+        # only waits on the receive queue, so other endpoints can be used while waiting
+        access = ACCESS_UNLOCKED
+
+        parser = reqparse.RequestParser()
+        parser.add_argument(
+            "cursor",
+            type=int,
+            default=0,
+            location="args",
+            help="Sequence number of the last object already received; 0 to start from the beginning",
+        )
+        parser.add_argument(
+            "wait",
+            type=float,
+            default=0.0,
+            location="args",
+            help=f"Maximum time, in seconds, to wait for new data; at most {RECEIVE_NEXT_MAX_WAIT}",
+        )
+        parser.add_argument(
+            "limit",
+            type=int,
+            default=RECEIVE_RANGE_DEFAULT_LIMIT,
+            location="args",
+            help=f"Maximum number of objects to return, oldest first; by default {RECEIVE_RANGE_DEFAULT_LIMIT}, at most {RECEIVE_RANGE_MAX_LIMIT}",
+        )
+
+        def get(self) -> dict:
+            # strict parsing would also try to read a JSON body, which GET requests do not have
+            args = self.parser.parse_args()
+
+            if args["wait"] < 0 or args["limit"] < 0:
+                abort(400, message="wait and limit have to be nonnegative")
+
+            if args["limit"] > RECEIVE_RANGE_MAX_LIMIT:
+                abort(400, message=f"limit can be at most {RECEIVE_RANGE_MAX_LIMIT}")
+
+            cursor, rcv = self.conn.receive_next(args["cursor"], limit=args["limit"])
+
+            if not rcv and args["wait"] > 0:
+                # a long poll holds a server thread while it waits
+                self.routes.open_stream()
+
+                try:
+                    cursor, rcv = self.conn.receive_next(
+                        cursor,
+                        wait=min(args["wait"], RECEIVE_NEXT_MAX_WAIT),
+                        limit=args["limit"],
+                    )
+                finally:
+                    self.routes.close_stream()
+
+            return {
+                "message": "OK",
+                "cursor": cursor,
+                "seqs": [seq for seq, _, _ in rcv],
+                "timestamps": [ts for _, ts, _ in rcv],
+                "data": [
+                    self.conn.conv_bytes_to_str(data, errors="replace")
+                    for _, _, data in rcv
+                ],
+            }
+
+    class _Stream(ConnectionResource):
+        """/stream"""
+
+        # streams from the receive queue, so other endpoints can be used while streaming
+        access = ACCESS_UNLOCKED
+
+        parser = reqparse.RequestParser()
+        parser.add_argument(
+            "cursor",
+            type=int,
+            location="args",
+            help="Sequence number to stream after if there is no Last-Event-ID header; by default only new data is streamed",
+        )
+        parser.add_argument(
+            "match",
+            location="args",
+            help="Regular expression; only received strings that contain a match are streamed",
+        )
+
+        def get(self) -> Response:
+            # strict parsing would also try to read a JSON body, which GET requests do not have
+            args = self.parser.parse_args()
+
+            cursor = args["cursor"]
+            if "Last-Event-ID" in request.headers:
+                # sent by EventSource when reconnecting
+                try:
+                    cursor = int(request.headers["Last-Event-ID"])
+                except ValueError:
+                    abort(400, message="Last-Event-ID has to be a sequence number")
+
+            if cursor is None:
+                cursor = self.conn.snapshot().last_seq
+
+            pattern = None
+            if args["match"] is not None:
+                try:
+                    pattern = re.compile(args["match"])
+                except re.error:
+                    abort(400, message="match has to be a valid regular expression")
+
+            # holds a server thread until the client goes away
+            self.routes.open_stream()
+
+            res = Response(
+                self._events(cursor, pattern),
+                mimetype="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            )
+            res.call_on_close(self.routes.close_stream)
+
+            return res
+
+        def _events(
+            self, cursor: int, pattern: t.Optional[t.Pattern]
+        ) -> t.Iterator[str]:
+            """
+            Yields an event for each object received after `cursor` until the serial port disconnects
+            """
+
+            sent_at = time.time()
+
+            while True:
+                try:
+                    cursor, rcv = self.conn.receive_next(
+                        cursor, wait=STREAM_KEEPALIVE, limit=STREAM_BATCH_SIZE
+                    )
+                except ConnectException:
+                    return
+
+                events = []
+                for seq, ts, data in rcv:
+                    # framed data such as SLIP or COBS is often not text
+                    str_data = self.conn.conv_bytes_to_str(data, errors="replace") or ""
+                    if pattern is not None and pattern.search(str_data) is None:
+                        continue
+
+                    # JSON has no newlines, so the data fits on one line
+                    events.append(
+                        f"id: {seq}\ndata: {json.dumps({'timestamp': ts, 'data': str_data})}\n\n"
+                    )
+
+                if events:
+                    yield "".join(events)
+                elif time.time() - sent_at >= STREAM_KEEPALIVE:
+                    yield ": keepalive\n\n"
+                else:
+                    continue
+
+                sent_at = time.time()
+
     class _Get(ConnectionResource):
         """/get"""
 
+        access = ACCESS_SHARED
+
         def get(self) -> dict:
             got = self.conn.get()
 
@@ -204,9 +444,227 @@ class V1:
 
             return {"message": "OK", "data": args}
 
+    class _Batch(ConnectionResource):
+        """/batch"""
+
+        parser = reqparse.RequestParser()
+        parser.add_argument(
+            "ops",
+            type=list,
+            required=True,
+            location="json",
+            help="List of operations to run in order",
+        )
+        parser.add_argument(
+            "stop_on_failure",
+            type=inputs.boolean,
+            default=False,
+            location="json",
+            help="If true, stops after the first operation that does not respond with OK",
+        )
+
+        # arguments of each operation: name -> (required, type)
+        _OP_ARGS: t.Dict[str, t.Dict[str, t.Tuple[bool, t.Tuple[type, ...]]]] = {
+            "send": {
+                "data": (True, (list, str, int, float)),
+                "ending": (False, (str,)),
+                "concatenate": (False, (str,)),
+            },
+            "get": {},
+            "wait_for": {"response": (True, (str,))},
+            "receive": {"num_before": (False, (int,))},
+            "sleep": {"seconds": (True, (int, float))},
+        }
+
+        def post(self) -> dict:
+            args = self.parser.parse_args(strict=True)
+            ops = args["ops"]
+
+            if len(ops) > BATCH_MAX_OPS:
+                abort(400, message=f"at most {BATCH_MAX_OPS} operations are allowed")
+
+            # check everything before running anything
+            for i, op in enumerate(ops):
+                self._check_op(i, op)
+
+            if self._max_time(ops) > BATCH_MAX_TIME:
+                abort(
+                    400,
+                    message=f"the sleeps and timeouts of the operations add up to more than {BATCH_MAX_TIME} seconds",
+                )
+
+            deadline = time.time() + BATCH_MAX_TIME
+            results = []
+
+            try:
+                for op in ops:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        results.append(
+                            {"op": op["op"], "message": "Time limit reached"}
+                        )
+                        break
+
+                    res = getattr(self, f"_op_{op['op']}")(op, remaining)
+                    results.append(res)
+
+                    if args["stop_on_failure"] and res["message"] != "OK":
+                        break
+            except ConnectException:
+                abort(500, message="Serial port disconnected.")
+
+            return {"message": "OK", "results": results}
+
+        def _check_op(self, index: int, op: t.Any) -> None:
+            """
+            Responds with 400 if operation `index` is not formatted correctly
+            """
+
+            if not isinstance(op, dict) or op.get("op") not in self._OP_ARGS:
+                abort(
+                    400,
+                    message=f"operation {index} has to be an object whose op is one of: {', '.join(self._OP_ARGS)}",
+                )
+
+            allowed = self._OP_ARGS[op["op"]]
+
+            for name in op:
+                if name != "op" and name not in allowed:
+                    abort(400, message=f"operation {index}: unknown argument {name}")
+
+            for name, (required, types) in allowed.items():
+                if name not in op:
+                    if required:
+                        abort(400, message=f"operation {index}: {name} is required")
+                elif isinstance(op[name], bool) or not isinstance(op[name], types):
+                    abort(400, message=f"operation {index}: {name} has the wrong type")
+
+            if op["op"] == "sleep" and not 0 <= op["seconds"] <= BATCH_MAX_SLEEP:
+                abort(
+                    400,
+                    message=f"operation {index}: seconds has to be between 0 and {BATCH_MAX_SLEEP}",
+                )
+
+            if op["op"] == "receive" and op.get("num_before", 0) < 0:
+                abort(
+                    400, message=f"operation {index}: num_before has to be nonnegative"
+                )
+
+        def _max_time(self, ops: t.List[dict]) -> float:
+            """
+            Returns the longest time that the operations can take by waiting for data or sleeping
+            """
+
+            total = 0.0
+            for op in ops:
+                if op["op"] == "sleep":
+                    total += op["seconds"]
+                elif op["op"] in ("get", "wait_for"):
+                    total += self.conn.timeout
+
+            return total
+
+        def _op_send(self, op: dict, remaining: float) -> dict:
+            data = op["data"] if isinstance(op["data"], list) else [op["data"]]
+
+            dispatch_time = self.conn.queue_send(
+                *data,
+                ending=op.get("ending", "\r\n"),
+                concatenate=op.get("concatenate", " "),
+                # so that sends in one batch do not fail because of each other
+                wait=min(self.conn.send_interval, remaining),
+            )
+
+            if dispatch_time is None:
+                return {"op": "send", "message": "Failed to send"}
+
+            return {"op": "send", "message": "OK", "dispatch_time": dispatch_time}
+
+        def _op_get(self, op: dict, remaining: float) -> dict:
+            got = self.conn.get(timeout=min(self.conn.timeout, remaining))
+
+            if got is None:
+                return {"op": "get", "message": "Nothing received"}
+
+            return {"op": "get", "message": "OK", "data": got}
+
+        def _op_wait_for(self, op: dict, remaining: float) -> dict:
+            if not self.conn.wait_for_response(
+                op["response"], timeout=min(self.conn.timeout, remaining)
+            ):
+                return {"op": "wait_for", "message": "Nothing received"}
+
+            return {"op": "wait_for", "message": "OK"}
+
+        def _op_receive(self, op: dict, remaining: float) -> dict:
+            res = self.conn.receive_str(num_before=op.get("num_before", 0))
+
+            if not isinstance(res, tuple):
+                return {"op": "receive", "message": "Receive item not found"}
+
+            return {
+                "op": "receive",
+                "message": "OK",
+                "timestamp": res[0],
+                "data": res[1],
+            }
+
+        def _op_sleep(self, op: dict, remaining: float) -> dict:
+            time.sleep(min(op["seconds"], remaining))
+
+            return {"op": "sleep", "message": "OK"}
+
+    class _Macro(ConnectionResource):
+        """/macros/<string:name>"""
+
+        def post(self, name: str) -> dict:
+            if name not in self.routes.macros:
+                abort(404, message="Macro not found")
+
+            # the body is optional, since macros without parameters do not need one
+            body = request.get_json(silent=True)
+            params = body.get("params", {}) if isinstance(body, dict) else {}
+
+            if (
+                not isinstance(body, (dict, type(None)))
+                or not isinstance(params, dict)
+                or not all(isinstance(v, (str, int, float)) for v in params.values())
+            ):
+                abort(400, message="params has to be an object of strings and numbers")
+
+            try:
+                results = self.routes.macros[name].run(self.conn, params)
+            except ValueError as e:
+                abort(400, message=str(e))
+            except ConnectException:
+                abort(500, message="Serial port disconnected.")
+
+            return {"message": results[-1]["message"], "results": results}
+
+    class _Poll(ConnectionResource):
+        """/polls/<string:name>"""
+
+        # only reads the cached response, so it never waits for the serial port
+        access = ACCESS_UNLOCKED
+
+        def get(self, name: str) -> dict:
+            if name not in self.routes.polls:
+                abort(404, message="Poll job not found")
+
+            job = self.routes.polls[name]
+            latest = job.latest
+
+            if latest is None:
+                return {"message": "Nothing received", "failures": job.failures}
+
+            return {"message": "OK", **latest, "failures": job.failures}
+
     class _Connection_State(ConnectionResource):
         """/connection_state"""
 
+        # only reads attributes, so it does not wait for slow endpoints
+        access = ACCESS_UNLOCKED
+
         def get(self) -> dict:
             return {
                 "message": "OK",
@@ -216,12 +674,18 @@ class V1:
                     "send_interval": self.conn.send_interval,
                     "available": self.conn.available,
                     "port": self.conn.port,
+                    "rcv_queue_bytes": self.conn.rcv_queue_bytes,
+                    "queue_max_bytes": self.conn.queue_max_bytes,
                 },
+                "wait_queue": self.routes.wait_stats,
             }
 
     class _All_Ports(ConnectionResource):
         """/all_ports"""
 
+        # does not use the connection
+        access = ACCESS_UNLOCKED
+
         def get(self) -> dict:
             res = all_ports()
 
@@ -7,32 +7,106 @@ the web API for the Serial port.
 """
 
 import logging
-import threading
+import math
 import typing as t
 
 import flask
 import flask_restful
 import waitress
 from flask_cors import CORS
+from werkzeug.exceptions import ServiceUnavailable
 
 from . import connection  # for typing
 from . import disconnect
+from .constants import (
+    ACCESS_EXCLUSIVE,
+    ROUTE_MAX_WAIT,
+    ROUTE_MAX_WAITING,
+    SERVER_SPARE_THREADS,
+)
+from .tools import LockQueueFullException, ReadWriteLock
+
+if t.TYPE_CHECKING:
+    from .server import ConnectionRoutes
 
 
 class EndpointExistsException(Exception):
     pass
 
 
+class _Busy(ServiceUnavailable):
+    """
+    `503 Service Unavailable` with a JSON message and a `Retry-After` header
+    """
+
+    def __init__(self, message: str, retry_after: int) -> None:
+        super().__init__()
+        self.data = {"message": message}
+        self._retry_after = retry_after
+
+    def get_headers(self, *args: t.Any, **kwargs: t.Any) -> t.List[t.Tuple[str, str]]:
+        return list(super().get_headers(*args, **kwargs)) + [
+            ("Retry-After", str(self._retry_after))
+        ]
+
+
+def acquire_or_abort(lock: ReadWriteLock, shared: bool, max_wait: float) -> None:
+    """Acquires the lock of a connection's endpoints from a request, or responds with `503 Service Unavailable`.
+
+    Responds with `503` if the lock's wait queue is full or `max_wait` is reached. When the queue is full,
+    `Retry-After` is `max_wait` rounded up: by then, every request in the queue has at least stopped waiting.
+    This is only a hint, since the requests that got the lock may still be holding it.
+
+    Used by both `RestApiHandler` and `ConnectionRoutes`; the caller releases the lock.
+
+    Args:
+        lock (ReadWriteLock): The lock to acquire.
+        shared (bool): Whether to acquire it shared (for reading) instead of exclusively.
+        max_wait (float): The most seconds to wait for the lock.
+
+    Raises:
+        werkzeug.exceptions.ServiceUnavailable: If the lock could not be acquired.
+    """
+
+    try:
+        acquired = lock.acquire(shared, max_wait)
+    except LockQueueFullException:
+        raise _Busy(
+            "Too many requests waiting for the serial port.",
+            max(1, math.ceil(max_wait)),
+        ) from None
+
+    if not acquired:
+        # other endpoints used the connection for too long
+        flask_restful.abort(
+            503,
+            message="An endpoint is currently in use by another process.",
+        )
+
+
 class ConnectionResource(flask_restful.Resource):
     """A custom resource object that is built to be used with `RestApiHandler` and `ConnectionRoutes`.
 
     This class is to be extended and used like the `Resource` class.
     Have `get()`, `post()`, and other methods for the types of responses you need.
+
+    With `ConnectionRoutes`, `access` decides how the connection is locked while the resource runs:
+
+    - `ACCESS_EXCLUSIVE` (default): one resource at a time, for resources that send or
+    otherwise depend on nothing else using the serial port at the same time.
+    - `ACCESS_SHARED`: at the same time as other shared resources, but not with exclusive ones,
+    for resources that only read, such as getting the receive queue or the connection state.
+    - `ACCESS_UNLOCKED`: not locked at all, for resources that only use thread-safe `Connection`
+    methods and may take a long time, such as waiting for new data.
     """
 
     # typing for autocompletion
     conn: connection.Connection
     other: t.Dict[str, connection.Connection]
+    routes: "ConnectionRoutes"  # only with ConnectionRoutes
+
+    # how ConnectionRoutes locks the connection while this resource runs
+    access: str = ACCESS_EXCLUSIVE
 
     # functions will be implemented in subclasses
 
@@ -54,8 +128,10 @@ class RestApiHandler:
     that the receive and send queues will **reset** when the serial port is disconnected.
 
     If another process accesses an endpoint while another is
-    currently being used, then it will respond with
-    `503 Service Unavailable`.
+    currently being used, then it waits in line, first come, first served,
+    for up to `max_wait` seconds, and then responds with `503 Service Unavailable`.
+    If `max_waiting` requests are already waiting, it responds with
+    `503 Service Unavailable` and a `Retry-After` header right away.
 
     More information on [Flask](https://flask.palletsprojects.com/en/2.0.x/) and [flask-restful](https://flask-restful.readthedocs.io/en/latest/).
 
@@ -75,6 +151,8 @@ class RestApiHandler:
         has_register_recall: bool = True,
         add_cors: bool = False,
         catch_all_404s: bool = True,
+        max_wait: float = ROUTE_MAX_WAIT,
+        max_waiting: t.Optional[int] = ROUTE_MAX_WAITING,
         **kwargs: t.Any,
     ) -> None:
         """Constructor for class
@@ -87,12 +165,21 @@ class RestApiHandler:
         accessed. By default True.
         - `add_cors` (bool): If True, then the Flask app will have [cross origin resource sharing](https://developer.mozilla.org/en-US/docs/Web/HTTP/CORS) enabled. By default False.
         - `catch_all_404s` (bool): If True, then there will be JSON response for 404 errors. Otherwise, there will be a normal HTML response on 404. By default True.
+        - `max_wait` (float): The longest time, in seconds, that a request waits for another endpoint to finish before
+        responding with `503 Service Unavailable`. If 0, responds with 503 right away. By default 10.
+        - `max_waiting` (int, None): The most requests that can wait at once; more requests respond with
+        `503 Service Unavailable` right away. If None, there is no limit. By default 16.
+        Each waiting request takes a server thread; `run()` serves with enough threads for this limit.
         - `**kwargs`, will be passed to `flask_restful.Api()`. See [here](https://flask-restful.readthedocs.io/en/latest/api.html#id1) for more info.
         """
 
+        if max_wait < 0:
+            raise ValueError("max_wait must be nonnegative")
+
         # from above
         self._conn = conn
         self._has_register_recall = has_register_recall
+        self._max_wait = max_wait
 
         # flask, flask_restful
         self._app = flask.Flask(__name__)
@@ -110,8 +197,8 @@ class RestApiHandler:
         self._registered: t.Optional[
             str
         ] = None  # keeps track of who is registered; None if not registered
-        self._lock = (
-            threading.Lock()
+        self._lock = ReadWriteLock(
+            max_waiting
         )  # for making sure only one thread is accessing Connection obj at a time
 
         if has_register_recall:
@@ -151,8 +238,8 @@ class RestApiHandler:
         names as duplicate endpoints.
 
         If another process accesses an endpoint while another is
-        currently being used, then it will respond with
-        `503 Service Unavailable`.
+        currently being used, then it waits up to `max_wait` seconds
+        and then responds with `503 Service Unavailable`.
 
         Parameters:
         - `endpoint` (str): The endpoint to the resource. Cannot repeat.
@@ -208,15 +295,14 @@ class RestApiHandler:
                         flask_restful.abort(
                             400, message="Not registered; only one connection at a time"
                         )
-                    elif self._lock.locked():
-                        # if another endpoint is currently being used
-                        flask_restful.abort(
-                            503,
-                            message="An endpoint is currently in use by another process.",
-                        )
-                    else:
-                        with self._lock:
-                            val = func(_self, *args, **kwargs)
+
+                    # wait for other endpoints to finish
+                    acquire_or_abort(self._lock, False, self._max_wait)
+
+                    try:
+                        val = func(_self, *args, **kwargs)
+                    finally:
+                        self._lock.release()
 
                     return val
 
@@ -303,6 +389,9 @@ class RestApiHandler:
         For more information, see [here](https://docs.pylonsproject.org/projects/waitress/en/stable/arguments.html#arguments).
         For Waitress documentation, see [here](https://docs.pylonsproject.org/projects/waitress/en/stable/).
 
+        Unless `threads` is given, serves with `max_waiting` threads for waiting requests plus 4 more,
+        instead of Waitress's default of 4, so that the `max_waiting` limit can be reached.
+
         Automatically disconnects the `Connection` object after
         the server is closed.
 
@@ -322,6 +411,11 @@ class RestApiHandler:
         _disconnect_handler = disconnect.Reconnector(self._conn, _logger, logfile)
         _disconnect_handler.start()
 
+        # each waiting request takes a thread
+        kwargs.setdefault(
+            "threads", (self._lock.max_waiting or 0) + SERVER_SPARE_THREADS
+        )
+
         waitress.serve(self._app, **kwargs)
 
         self._conn.disconnect()  # disconnect if stop running
@@ -329,6 +423,16 @@ class RestApiHandler:
     # backward compatibility
     run_prod = run
 
+    @property
+    def wait_stats(self) -> t.Dict[str, t.Optional[int]]:
+        """
+        Numbers about requests waiting for endpoints: `waiting` (waiting right now),
+        `holders` (running right now), `max_waiting`, `rejected` (responded with 503
+        because too many were waiting), and `timed_out` (responded with 503 after `max_wait`).
+        """
+
+        return self._lock.stats()
+
     @property
     def flask_obj(self) -> flask.Flask:
         """
@@ -0,0 +1,540 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contains implementation of the asyncio connection object.
+"""
+
+import asyncio
+import os
+import signal
+import time
+import typing as t
+from types import TracebackType
+
+from serial.serialutil import SerialException
+
+from .base_connection import RCV_WAIT_INTERVAL, BaseConnection, ConnectException
+from .tools import SendQueue
+
+if os.name == "posix":
+    import termios
+
+
+class AsyncConnection(BaseConnection):
+    """Class that interfaces with the serial port from an `asyncio` event loop.
+
+    Instead of an IO thread, the event loop watches the serial port with `loop.add_reader()`
+    and writes queued data with callbacks. The methods that wait for data (`connect()`, `get()`,
+    `get_first_response()`, `wait_for_response()`, `send_for_response()`, and `reconnect()`)
+    are coroutines, so many of them can wait at once without a thread for each.
+    All other methods are the same as in `Connection`.
+
+    Since those methods are coroutines, an `AsyncConnection` is not a `Connection`, and it cannot be
+    used where a `Connection` is expected, such as `ConnectionRoutes`, `Poller`, or `WebSocketServer`.
+
+    Use it with `async with` or call `await connect()` from inside the event loop.
+    `disconnect()` should also be called from the thread running the event loop.
+    Custom IO threads are not supported. Not supported on Windows.
+
+    ```py
+    import asyncio
+    from com_server import AsyncConnection
+
+    async def main():
+        async with AsyncConnection(115200, "/dev/ttyUSB0") as conn:
+            print(await conn.get_first_response("hello"))
+
+    asyncio.run(main())
+    ```
+    """
+
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
+        """
+        Same as `BaseConnection.__init__()`. `io_mode` and `rest_cpu` have no effect.
+
+        Raises:
+            EnvironmentError: If running on Windows.
+        """
+
+        if os.name == "nt":
+            raise EnvironmentError("AsyncConnection is not supported on Windows")
+
+        super().__init__(*args, **kwargs)
+
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._fd = -1  # file descriptor that the event loop is watching
+
+        # futures of coroutines waiting for data
+        self._waiters: t.Set[asyncio.Future] = set()
+
+        # data read since the line was last quiet and timer for pushing it to the receive queue
+        self._incoming = bytearray()
+        self._incoming_handle: t.Optional[asyncio.TimerHandle] = None
+
+        # timer for writing the next object in the send queue
+        self._write_handle: t.Optional[asyncio.Handle] = None
+
+    def __enter__(self) -> "AsyncConnection":
+        """
+        Not supported; use `async with` instead.
+        """
+
+        raise TypeError("Use 'async with' with AsyncConnection")
+
+    async def __aenter__(self) -> "AsyncConnection":
+        """Async context manager
+
+        When in an async context manager, it will automatically connect itself
+        to its serial port and return itself.
+        """
+
+        if not self.connected:
+            await self.connect()
+
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type,
+        exc_value: BaseException,
+        exc_tb: t.Optional[TracebackType],
+    ) -> None:
+        """Async context manager
+
+        When exiting from the `async with` statement, it will automatically close itself.
+        """
+
+        self.disconnect()
+
+    async def connect(self) -> None:  # type: ignore[override]
+        """Begins connection to the serial port.
+
+        When called, initializes a serial instance if not initialized already.
+        Then, waits 2 seconds for the other end to start up without blocking the event loop
+        and starts watching the serial port from the event loop.
+
+        Raises:
+            ConnectException: If the connection is already established.
+        """
+
+        if self._conn is not None:
+            if self._exception:
+                # raise exception if true
+                raise ConnectException("Connection already established")
+
+            # return if initialized already
+            return
+
+        self._open_serial()
+
+        await asyncio.sleep(2)  # wait for other end to start up properly
+
+        self._start_watching()
+
+    def disconnect(self) -> None:
+        """Closes connection to the serial port.
+
+        Same as `Connection.disconnect()`, but also stops watching the serial port
+        from the event loop. Coroutines waiting for data will return as if they timed out.
+        """
+
+        self._stop_watching()
+        super().disconnect()
+        self._notify_waiters()
+
+    async def get(
+        self,
+        return_bytes: bool = False,
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+        timeout: t.Optional[float] = None,
+    ) -> t.Optional[t.Union[bytes, str]]:
+        """Gets first response after this method is called.
+
+        Same as `Connection.get()`, but as a coroutine.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        # for timeout
+        deadline = time.time() + (self._timeout if timeout is None else timeout)
+
+        # wait for data with a sequence number greater than the most recent one when called
+        seq = self._rcv_queue.last_seq
+        while True:
+            last_seq, new = await self._wait_for_rcv_async(seq, deadline)
+            if not new:
+                # timeout reached
+                return None
+
+            res = self._first_new_rcv(last_seq, new, return_bytes, read_until, strip)
+            if res is not None:
+                return res
+
+            seq = last_seq
+
+    async def get_first_response(
+        self,
+        *data: t.Any,
+        return_bytes: bool = False,
+        ending: str = "\r\n",
+        concatenate: str = " ",
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+    ) -> t.Optional[t.Union[str, bytes]]:
+        """Gets the first response from the serial port after sending something.
+
+        Same as `Connection.get_first_response()`, but as a coroutine.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        send_success = self.send(
+            *data, check_type=True, ending=ending, concatenate=concatenate
+        )
+
+        if not send_success:
+            # send interval not reached
+            return None
+
+        return await self.get(return_bytes, read_until, strip)
+
+    async def wait_for_response(
+        self,
+        response: t.Any,
+        after_timestamp: float = -1.0,
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+        timeout: t.Optional[float] = None,
+    ) -> bool:
+        """Waits until the connection receives a given response.
+
+        Same as `Connection.wait_for_response()`, but as a coroutine.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        after_timestamp = float(after_timestamp)
+        if after_timestamp < 0:
+            # negative number to indicate program to use current time, time in parameter does not work
+            after_timestamp = time.time()
+
+        # convert non-bytes to str
+        if not isinstance(response, bytes):
+            response = str(response)
+
+        # for timeout
+        deadline = time.time() + (self._timeout if timeout is None else timeout)
+
+        # check everything received since the most recent object when called
+        # (including that object) until the response matches
+        seq = self._rcv_queue.last_seq - 1
+        while True:
+            last_seq, new = await self._wait_for_rcv_async(seq, deadline)
+            if not new:
+                if last_seq == seq:
+                    # timeout reached
+                    return False
+
+                # the receive queue did not have the most recent object when called
+                # (for example, it was empty), so wait for the next one
+                seq = last_seq
+                continue
+
+            if self._response_in_rcv(
+                last_seq, new, response, after_timestamp, read_until, strip
+            ):
+                # correct response has been received
+                return True
+
+            seq = last_seq
+
+    async def send_for_response(
+        self,
+        response: t.Any,
+        *data: t.Any,
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+        ending: str = "\r\n",
+        concatenate: str = " ",
+    ) -> bool:
+        """Sends something until the connection receives a given response or timeout is reached.
+
+        Same as `Connection.send_for_response()`, but as a coroutine.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        st_t = time.time()  # for timeout
+
+        while True:
+            if time.time() - st_t > self._timeout:
+                # timeout reached
+                return False
+
+            self.send(*data, ending=ending, concatenate=concatenate)
+
+            if time.time() - st_t > self._timeout:
+                # timeout reached
+                return False
+
+            send_t = time.time()
+
+            if await self.wait_for_response(
+                response=response,
+                after_timestamp=send_t,
+                read_until=read_until,
+                strip=strip,
+            ):
+                return True
+
+    async def receive_next(
+        self, cursor: int, wait: float = 0.0, limit: t.Optional[int] = None
+    ) -> t.Tuple[int, t.List[t.Tuple[int, float, bytes]]]:
+        """Returns the objects received after a cursor, waiting for new objects if there are none
+
+        Same as `Connection.receive_next()`, but as a coroutine.
+        """
+
+        cursor = self._check_cursor(cursor, wait, limit)
+        await self._wait_for_seq_async(cursor, time.time() + wait)
+
+        return self._after_cursor(cursor, limit)
+
+    async def reconnect(self, timeout: t.Optional[float] = None) -> bool:
+        """Attempts to reconnect the serial port.
+
+        Same as `Connection.reconnect()`, but as a coroutine.
+        """
+
+        if self.connected:
+            raise ConnectException("Connection already established")
+
+        st_t = time.time()
+
+        while True:
+            if timeout is not None and time.time() - st_t > timeout:
+                # break if timeout reached
+                return False
+
+            try:
+                await self.connect()
+
+                # able to connect
+                return True
+            except (SerialException, termios.error):
+                # port not found
+                await asyncio.sleep(0.1)
+
+    def custom_io_thread(self, func: t.Callable) -> t.Callable:
+        """
+        Not supported, as there is no IO thread.
+
+        Raises:
+            TypeError: Always.
+        """
+
+        raise TypeError("AsyncConnection does not support custom IO threads")
+
+    def _start_watching(self) -> None:
+        """
+        Starts watching the serial port from the running event loop
+        """
+
+        assert self._conn is not None  # mypy
+
+        self._loop = asyncio.get_running_loop()
+        self._fd = self._conn.fileno()
+        self._loop.add_reader(self._fd, self._on_readable)
+
+        # send anything that was queued before connecting
+        self._wake_io_thread()
+
+    def _stop_watching(self) -> None:
+        """
+        Stops watching the serial port and cancels timers
+        """
+
+        if self._loop is not None and self._fd >= 0:
+            self._loop.remove_reader(self._fd)
+        self._fd = -1
+
+        for handle in (self._incoming_handle, self._write_handle):
+            if handle is not None:
+                handle.cancel()
+
+        self._incoming_handle = self._write_handle = None
+        self._incoming = bytearray()
+
+    def _on_disconnect(self) -> None:
+        """
+        Called when a serial operation fails because the port was disconnected
+        """
+
+        self._stop_watching()
+
+        # reset connection and IO variables
+        self._conn = None
+        self._reset()
+        self._notify_waiters()
+
+        if self._exit_on_disconnect:
+            os.kill(os.getpid(), signal.SIGTERM)
+
+    def _on_readable(self) -> None:
+        """
+        Called by the event loop when the serial port has data.
+
+        Reads everything that is waiting, then waits for the line to be quiet
+        for two character times before pushing the data to the
+        receive queue, like the default cycle of `Connection`.
+        """
+
+        if self._conn is None:
+            return
+
+        try:
+            self._incoming += self._conn.read(max(self._conn.in_waiting, 1))
+        except (ConnectException, OSError, SerialException, termios.error):
+            self._on_disconnect()
+            return
+
+        assert self._loop is not None  # mypy
+
+        if self._incoming_handle is not None:
+            self._incoming_handle.cancel()
+
+        gap = 20 / self._baud  # 10 bits per character
+        self._incoming_handle = self._loop.call_later(gap, self._push_incoming)
+
+    def _push_incoming(self) -> None:
+        """
+        Pushes the data read since the line was last quiet to the receive queue,
+        split into frames if there is a framer
+        """
+
+        self._incoming_handle = None
+
+        if not self._incoming:
+            return
+
+        frames = self._frames(bytes(self._incoming))
+        self._incoming = bytearray()
+
+        if frames:
+            self._rcv_queue.push(*[(time.time(), frame) for frame in frames])
+            self._notify_waiters()
+
+    def _wake_io_thread(self) -> None:
+        """
+        Schedules writing the send queue on the event loop. Safe to call from any thread.
+        """
+
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._start_writing)
+
+    def _start_writing(self) -> None:
+        """
+        Starts writing the send queue if it is not being written already
+        """
+
+        if self._write_handle is None:
+            self._write_pending()
+
+    def _write_pending(self) -> None:
+        """
+        Writes the front of the send queue, then schedules the next write 0.01 seconds later
+        if there is more to send, with the same spacing as the default cycle of `Connection`.
+        Data held back by the rate limiter is written once it is due. If `coalesce_bytes` is positive,
+        joins the front of the send queue into one write like the default cycle does, and if `pace_writes`
+        is True, writes as much as the wire can take.
+        """
+
+        self._write_handle = None
+
+        if self._conn is None:
+            return
+
+        next_paced = self._release_paced()
+
+        if len(self._to_send) <= 0 and not self._write_rest:
+            if next_paced is not None:
+                # wait until the rate limiter allows the next data to be sent
+                assert self._loop is not None  # mypy
+                self._write_handle = self._loop.call_later(
+                    max(next_paced - time.time(), 0), self._write_pending
+                )
+
+            return
+
+        try:
+            if self._pace_writes:
+                self._conn.write(self._take_paced_chunk(SendQueue(self._to_send)))
+            elif self._coalesce_bytes > 0:
+                self._conn.write(self._join_send_queue(SendQueue(self._to_send)))
+            else:
+                self._conn.write(self._to_send[0])
+                self._to_send.popleft()
+        except (ConnectException, OSError, SerialException, termios.error):
+            self._on_disconnect()
+            return
+
+        if len(self._to_send) > 0 or len(self._paced) > 0 or self._write_rest:
+            assert self._loop is not None  # mypy
+            self._write_handle = self._loop.call_later(0.01, self._write_pending)
+
+    def _notify_waiters(self) -> None:
+        """
+        Wakes up all coroutines waiting for data
+        """
+
+        for fut in self._waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def _wait_for_rcv_async(
+        self, after_seq: int, deadline: float
+    ) -> t.Tuple[int, t.List[t.Tuple[float, bytes]]]:
+        """
+        Same as `BaseConnection._wait_for_rcv()`, but waits on a future instead of the condition variable
+        """
+
+        if not await self._wait_for_seq_async(after_seq, deadline):
+            return after_seq, []
+
+        with self._lock:
+            return self._rcv_queue.last_seq, self._rcv_queue.since(after_seq)
+
+    async def _wait_for_seq_async(self, after_seq: int, deadline: float) -> bool:
+        """
+        Same as `BaseConnection._wait_for_seq()`, but waits on a future instead of the condition variable
+        """
+
+        loop = asyncio.get_running_loop()
+
+        while self._rcv_queue.last_seq <= after_seq:
+            remaining = deadline - time.time()
+            if remaining <= 0 or not self.connected:
+                return False
+
+            fut = loop.create_future()
+            self._waiters.add(fut)
+
+            try:
+                await asyncio.wait_for(fut, min(remaining, RCV_WAIT_INTERVAL))
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self._waiters.discard(fut)
+
+        return True
+
+    def _io_thread(self) -> None:
+        """
+        Not used, as the event loop handles IO.
+        """
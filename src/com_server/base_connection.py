@@ -6,7 +6,9 @@ Contains implementation of Connection object.
 """
 
 import abc
+import collections
 import json
+import math
 import os
 import threading
 import time
@@ -15,10 +17,18 @@ from types import TracebackType
 
 import serial
 
-from . import constants, tools
+from . import constants, framing, tools
+from .journal import ReceiveJournal
 
 SEND_QUEUE_MAX_SIZE = 65536
 
+# longest time a thread waits for received data before checking the connection again
+RCV_WAIT_INTERVAL = 1.0
+
+# with `pace_writes` and no `device_buffer_size`, how much data, in seconds of wire time,
+# the default cycle writes ahead of the wire; longer than a cycle so that the line does not go idle
+PACE_AHEAD = 0.05
+
 
 class ConnectException(Exception):
     """
@@ -45,8 +55,16 @@ class BaseConnection(abc.ABC):
         timeout: float = 1,
         send_interval: float = 1,
         queue_size: int = constants.RCV_QUEUE_SIZE_NORMAL,
+        queue_max_bytes: t.Optional[int] = None,
         exit_on_disconnect: bool = False,
         rest_cpu: bool = True,
+        io_mode: str = constants.IO_MODE_POLL,
+        framer: t.Optional[framing.BaseFramer] = None,
+        rate_limiter: t.Optional[tools.SendRateLimiter] = None,
+        coalesce_bytes: int = 0,
+        pace_writes: bool = False,
+        device_buffer_size: t.Optional[int] = None,
+        journal: t.Optional[ReceiveJournal] = None,
         **kwargs: t.Any,
     ) -> None:
         """Initializes BaseConnection and Connection-like classes
@@ -64,13 +82,40 @@ class BaseConnection(abc.ABC):
             Note that this does NOT mean that it will be able to send every `send_interval` seconds. It means that the `send()` method will \
             exit if the interval has not reached `send_interval` seconds. NOT recommended to set to small values. Defaults to 1.
             queue_size (int, optional): The number of previous data that was received that the program should keep. Must be nonnegative. Defaults to 256.
+            queue_max_bytes (int, None, optional): The maximum total size, in bytes, of the previous data that the program should keep. \
+            The oldest data is removed when this or `queue_size` is exceeded, except that the most recent data is always kept. \
+            If None, only `queue_size` is used. Defaults to None.
             exit_on_disconnect (bool, optional): If True, sends `SIGTERM` signal to the main thread if the serial port is disconnected. Does not work on Windows. Defaults to False.
             rest_cpu (bool, optional): If True, will add 0.01 second delay to end of IO thread. Otherwise, removes those delays but will result in increased CPU usage. \
-            Not recommended to set to False with the default IO thread. Defaults to True.
+            Not recommended to set to False with the default IO thread. Has no effect when `io_mode` is `IO_MODE_SELECT`. Defaults to True.
+            io_mode (str, optional): How the IO thread waits between cycles. If `IO_MODE_POLL`, runs a cycle every 0.01 seconds. \
+            If `IO_MODE_SELECT`, waits on the serial port's file descriptor and only runs a cycle when data arrives or \
+            something is added to the send queue. `IO_MODE_SELECT` is not supported on Windows. Defaults to `IO_MODE_POLL`.
+            framer (BaseFramer, None, optional): Splits the data read by the default IO cycle into frames, such as lines, \
+            so that each item in the receive queue is one complete frame. Incomplete frames are kept until the rest is read. \
+            Each connection needs its own framer. If None, everything read at once is one item. Defaults to None.
+            rate_limiter (SendRateLimiter, None, optional): Limits how fast data is sent. If given, `send_interval` is ignored, \
+            and data sent faster than the limit is held back and sent later instead of being rejected. \
+            Each connection needs its own rate limiter. Defaults to None.
+            coalesce_bytes (int, optional): If positive, the default IO cycle joins the data in the send queue into one write \
+            of up to this many bytes each cycle instead of writing one object every 0.01 seconds. An object larger than this is still written whole. \
+            If 0, objects are written one at a time. Defaults to 0.
+            pace_writes (bool, optional): If True, the default IO cycle calculates how long the data it writes takes to go through the wire \
+            (using the baud rate, `bytesize`, `parity`, and `stopbits`) and writes just enough each cycle to keep the line busy, splitting objects if needed. \
+            `coalesce_bytes` is ignored. Defaults to False.
+            device_buffer_size (int, None, optional): The size, in bytes, of the receive buffer of the device. If given and `pace_writes` is True, \
+            then no more than this many bytes are written that have not gone through the wire yet. \
+            If None, writes about 0.05 seconds of data ahead. Defaults to None.
+            journal (ReceiveJournal, None, optional): If given, everything received is also written to this journal on disk, \
+            where it is kept after it is removed from the receive queue. Sequence numbers continue from the last one in the journal. Defaults to None.
             **kwargs (Any): Passed to pyserial
 
         Raises:
-            EnvironmentError: Raised if `exit_on_disconnect` is True and it is running on a Windows machine.
+            EnvironmentError: Raised if `exit_on_disconnect` is True or `io_mode` is `IO_MODE_SELECT` and it is running on a Windows machine.
+            ValueError: If `io_mode` is not one of `IO_MODE_POLL` or `IO_MODE_SELECT`.
+            ValueError: If `device_buffer_size` or `queue_max_bytes` is not positive.
+            TypeError: If `framer` is not a `BaseFramer` or None, `rate_limiter` is not a `SendRateLimiter` or None, \
+            or `journal` is not a `ReceiveJournal` or None.
         """
 
         # from above
@@ -82,13 +127,54 @@ class BaseConnection(abc.ABC):
         self._timeout = abs(float(timeout))  # make sure positive
         self._pass_to_pyserial = kwargs
         self._queue_size = abs(int(queue_size))  # make sure positive
+        self._queue_max_bytes = queue_max_bytes
         self._send_interval = abs(float(send_interval))  # make sure positive
         self._exit_on_disconnect = exit_on_disconnect
         self._rest_cpu = rest_cpu
+        self._io_mode = io_mode
+        self._framer = framer
+        self._rate_limiter = rate_limiter
+        self._coalesce_bytes = abs(int(coalesce_bytes))  # make sure positive
+        self._pace_writes = pace_writes
+        self._device_buffer_size = device_buffer_size
+
+        # time it takes to send one byte through the wire
+        self._byte_time = tools.wire_time(
+            1,
+            self._baud,
+            kwargs.get("bytesize", serial.EIGHTBITS),
+            kwargs.get("parity", serial.PARITY_NONE),
+            kwargs.get("stopbits", serial.STOPBITS_ONE),
+        )
 
         if os.name == "nt" and self._exit_on_disconnect:
             raise EnvironmentError("exit_on_fail is not supported on Windows")
 
+        if self._io_mode not in (constants.IO_MODE_POLL, constants.IO_MODE_SELECT):
+            raise ValueError(f"Unknown io_mode {self._io_mode!r}")
+
+        if os.name == "nt" and self._io_mode == constants.IO_MODE_SELECT:
+            raise EnvironmentError("io_mode IO_MODE_SELECT is not supported on Windows")
+
+        if self._device_buffer_size is not None and self._device_buffer_size <= 0:
+            raise ValueError("device_buffer_size must be positive")
+
+        if self._queue_max_bytes is not None and self._queue_max_bytes <= 0:
+            raise ValueError("queue_max_bytes must be positive")
+
+        if self._framer is not None and not isinstance(
+            self._framer, framing.BaseFramer
+        ):
+            raise TypeError("framer must be a BaseFramer or None")
+
+        if self._rate_limiter is not None and not isinstance(
+            self._rate_limiter, tools.SendRateLimiter
+        ):
+            raise TypeError("rate_limiter must be a SendRateLimiter or None")
+
+        if journal is not None and not isinstance(journal, ReceiveJournal):
+            raise TypeError("journal must be a ReceiveJournal or None")
+
         # initialize Serial object
         self._conn: t.Optional[serial.Serial] = None
 
@@ -98,18 +184,34 @@ class BaseConnection(abc.ABC):
             0.0,
             b"",
         )  # stores the data that the user previously received
-
-        # IO variables
-        self._rcv_queue: t.List[
-            t.Tuple[float, bytes]
-        ] = (
-            []
-        )  # stores previous received strings and timestamps, tuple (timestamp, str)
-        self._to_send: t.List[bytes] = []  # queue data to send
+        self._last_rcv_seq = (
+            0  # sequence number of the data that the user previously received
+        )
 
         # this lock makes sure data from the receive queue
         # and send queue are written to and read safely
-        self._lock = threading.Lock()
+        # reentrant so that the receive queue methods can be called while holding it
+        self._lock = threading.RLock()
+
+        # notified whenever something is added to the receive queue; shares `_lock`
+        self._rcv_cond = threading.Condition(self._lock)
+
+        # IO variables
+        # stores previous received strings and timestamps, tuple (timestamp, str),
+        # each with a sequence number; the oldest element is removed when the size exceeds queue_size
+        # or the total size of the bytes exceeds queue_max_bytes
+        self._rcv_queue = tools.ReceiveBuffer(
+            self._queue_size, self._rcv_cond, self._queue_max_bytes, journal
+        )
+        self._to_send: t.Deque[bytes] = collections.deque()  # queue data to send
+
+        # data held back by the rate limiter, tuple (time to send, bytes), in order of time
+        self._paced: t.Deque[t.Tuple[float, bytes]] = collections.deque()
+
+        # for pace_writes: when the data written so far will have gone through the wire,
+        # and the rest of an object that was split
+        self._wire_free_at = 0.0
+        self._write_rest = b""
 
     def __repr__(self) -> str:
         """
@@ -164,6 +266,20 @@ class BaseConnection(abc.ABC):
             # return if initialized already
             return
 
+        self._open_serial()
+
+        time.sleep(2)  # wait for other end to start up properly
+
+        # start receive thread
+        threading.Thread(
+            name="Serial-IO-thread", target=self._io_thread, daemon=True
+        ).start()
+
+    def _open_serial(self) -> None:
+        """
+        Finds the first available port out of the given ports and opens a serial instance on it
+        """
+
         # timeout should be None in pyserial
         pyser_timeout = None if self._timeout == constants.NO_TIMEOUT else self._timeout
 
@@ -195,13 +311,6 @@ class BaseConnection(abc.ABC):
         self._conn.flushInput()
         self._conn.flushOutput()
 
-        time.sleep(2)  # wait for other end to start up properly
-
-        # start receive thread
-        threading.Thread(
-            name="Serial-IO-thread", target=self._io_thread, daemon=True
-        ).start()
-
     def disconnect(self) -> None:
         """Closes connection to the serial port.
 
@@ -219,8 +328,11 @@ class BaseConnection(abc.ABC):
             return
 
         self._conn.close()
-        self._reset()
         self._conn = None
+        self._reset()
+
+        # let the IO thread notice the disconnect if it is waiting
+        self._wake_io_thread()
 
     def send(
         self,
@@ -244,9 +356,10 @@ class BaseConnection(abc.ABC):
         Additionally, parts of the send queue will be all sent together until it reaches 0.5 seconds,
         which may end up with unexpected behavior in some programs.
         To prevent these problems, either make the value of `send_interval` larger,
-        or add a delay within the main thread.
+        add a delay within the main thread, or give the connection a `rate_limiter`.
 
-        If the program has not waited long enough before sending, then the method will return `false`.
+        If the program has not waited long enough before sending, or the queue is full, then the method will return `false`.
+        If the connection has a `rate_limiter`, then `send_interval` is not checked; use `queue_send()` to find out when the data will be sent.
 
         If `check_type` is True, then it will process each argument, then concatenate, encode, and send.
             - If the argument is `bytes` then decodes to `str`
@@ -264,18 +377,49 @@ class BaseConnection(abc.ABC):
             ConnectException: If serial port not connected.
 
         Returns:
-            bool: true on success, false if send interval not reached.
+            bool: true on success, false if send interval not reached or the queue is full.
+        """
+
+        return (
+            self.queue_send(
+                *data, check_type=check_type, ending=ending, concatenate=concatenate
+            )
+            is not None
+        )
+
+    def queue_send(
+        self,
+        *data: t.Any,
+        check_type: bool = True,
+        ending: str = "\r\n",
+        concatenate: str = " ",
+        wait: float = 0.0,
+    ) -> t.Optional[float]:
+        """Sends data to the port and returns when it is expected to be sent
+
+        Same as `send()`, but returns the time (from `time.time()`) when the data will be
+        put into the send queue instead of a `bool`. This is the current time unless
+        the connection has a `rate_limiter` and the data is over the limit, in which case
+        it is the time that the rate limiter scheduled it for.
+
+        Args:
+            `*data` (Any): Everything that is to be sent, each as a separate parameter. Must have at least one parameter.
+            ending (str, optional): The ending of the bytes object to be sent through the serial port. Defaults to "\\r\\n".
+            concatenate (str, optional): What the strings in args should be concatenated by. Defaults to a space (" ").
+            wait (float, optional): The longest time, in seconds, to wait for the send interval if it was not reached, \
+            instead of failing right away (see `queue_bytes()`). Defaults to 0.
+
+        Raises:
+            ConnectException: If serial port not connected.
+
+        Returns:
+            Union[float, None]: The expected dispatch time, or None if send interval not reached or the queue is full.
         """
 
         # check if connection open
         if not self.connected:
             raise ConnectException("No connection established")
 
-        # check if it should send by using send_interval.
-        if time.time() - self._last_sent <= self._send_interval:
-            return False
-        self._last_sent = time.time()
-
         # check `check_type`, then converts each element
         send_data: str = ""
         if check_type:
@@ -284,16 +428,84 @@ class BaseConnection(abc.ABC):
             send_data = concatenate.join([str(i) for i in data])
 
         # add ending to string
-        send_data_bytes = (send_data + ending).encode("utf-8")
+        return self.queue_bytes((send_data + ending).encode("utf-8"), wait)
+
+    def queue_bytes(self, data: bytes, wait: float = 0.0) -> t.Optional[float]:
+        """Adds a bytes object to the send queue as is and returns when it is expected to be sent
+
+        Like `queue_send()`, but `data` is sent without any conversion or ending.
+        If the send interval was not reached, this waits (blocking the calling thread) until
+        it is, as long as that is within `wait` seconds, instead of failing right away.
+        A full send queue still fails right away.
+
+        Args:
+            data (bytes): The bytes to send.
+            wait (float, optional): The longest time, in seconds, to wait for the send interval. Defaults to 0.
+
+        Raises:
+            ConnectException: If serial port not connected.
+
+        Returns:
+            Union[float, None]: The expected dispatch time, or None if send interval not reached within `wait` seconds or the queue is full.
+        """
+
+        deadline = time.time() + wait
+
+        while True:
+            dispatch_at = self._queue_bytes(data)
+            if dispatch_at is not None:
+                return dispatch_at
+
+            # only the send interval is worth waiting for; the rate limiter
+            # does not reject, and a full send queue may not empty in time
+            ready_at = self._last_sent + self._send_interval
+            now = time.time()
+            if self._rate_limiter is not None or ready_at < now or ready_at >= deadline:
+                return None
+
+            time.sleep(ready_at - now + 0.001)
+
+    def _queue_bytes(self, send_data_bytes: bytes) -> t.Optional[float]:
+        """
+        Adds a bytes object to the send queue as is, checking the send interval, queue size, and rate limiter.
+        Returns the expected dispatch time like `queue_send()`, or None if it was not added.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
 
         # make sure nothing is reading/writing to the receive queue
         # while reading/assigning the variable
         with self._lock:
-            if len(self._to_send) < SEND_QUEUE_MAX_SIZE:
-                # only append if limit has not been reached
+            now = time.time()
+
+            # check if it should send by using send_interval (rate limiter replaces it)
+            if (
+                self._rate_limiter is None
+                and now - self._last_sent <= self._send_interval
+            ):
+                return None
+
+            if len(self._to_send) + len(self._paced) >= SEND_QUEUE_MAX_SIZE:
+                # do not append if limit has been reached
+                return None
+
+            dispatch_at = now
+            if self._rate_limiter is not None:
+                dispatch_at = self._rate_limiter.reserve(len(send_data_bytes), now)
+
+            if dispatch_at <= now and len(self._paced) <= 0:
                 self._to_send.append(send_data_bytes)
+            else:
+                # held back until dispatch_at; behind everything else held back so the order is kept
+                self._paced.append((dispatch_at, send_data_bytes))
+
+            # only data that was added starts a new send interval
+            self._last_sent = now
+
+        self._wake_io_thread()
 
-        return True
+        return dispatch_at
 
     def receive(self, num_before: int = 0) -> t.Optional[t.Tuple[float, bytes]]:
         """Returns the most recent receive object.
@@ -330,12 +542,261 @@ class BaseConnection(abc.ABC):
             # make sure nothing is reading/writing to the receive queue
             # while reading/assigning the variable
             with self._lock:
-                self._last_rcv = self._rcv_queue[-1 - num_before]  # last received data
+                self._set_last_rcv(
+                    self._rcv_queue.last_seq - num_before,
+                    self._rcv_queue[-1 - num_before],
+                )  # last received data
 
             return self._last_rcv
         except IndexError:
             return None
 
+    def conv_bytes_to_str(
+        self,
+        rcv: t.Optional[bytes],
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+        errors: str = "strict",
+    ) -> t.Optional[str]:
+        """Converts bytes object to string given parameters
+
+        Args:
+            rcv (bytes, None): A bytes object. If None, then the method will return None.
+            read_until (bytes, None, optional): Will return a string that terminates with `read_until`, excluding `read_until`. \
+            For example, if the string is `"abcdefg123456]"`, and `read_until` is `]`, then it will return `"abcdefg123456"`. \
+            If there are multiple occurrences of `read_until`, then it will return the string that terminates with the first one. \
+            If None, the it will return the entire string. Defaults to None.
+            strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
+            If False, returns the processed string in its entirety. Defaults to True.
+            errors (str, optional): How bytes that are not valid UTF-8 are handled, as in `bytes.decode()`. \
+            Use `"replace"` to replace them with U+FFFD instead of raising `UnicodeDecodeError`. Defaults to `"strict"`.
+
+        Returns:
+            Optional[str]: A string representing the processed data, or None if `rcv` is None
+        """
+
+        if rcv is None:
+            return None
+
+        res = rcv.decode("utf-8", errors=errors)
+
+        try:
+            ret = res[0 : res.index(str(read_until))]  # sliced string
+            if strip:
+                return ret.strip()
+            else:
+                return ret
+
+        except (ValueError, TypeError):
+            # read_until does not exist or it is None, so return the entire thing
+            if strip:
+                return res.strip()
+            else:
+                return res
+
+    def all_rcv(
+        self,
+        return_bytes: bool = False,
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+    ) -> t.Union[t.List[t.Tuple[float, str]], t.List[t.Tuple[float, bytes]]]:
+        """Returns entire receive queue
+
+        Args:
+            return_bytes (bool, optional): Will return bytes if True and string if False. If true, other args will be ignored. Defaults to False.
+            read_until (bytes, None, optional): All strings in the list will terminate with `read_until` without the `read_until` character. \
+            For example, if a string in the list was `"abcdefg123456]"`, and `read_until` is `]`, then the string will become `"abcdefg123456"`. \
+            If None, the it will return the entire string. Defaults to None.
+            strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
+            If False, returns the processed string in its entirety. Defaults to True.
+
+        Raises:
+            ConnectException: If serial port not connected, this exception will be raised.
+
+        Returns:
+            Union[List[Tuple[float, str]], List[Tuple[float, bytes]]]: A list of tuples indicating the timestamp received and the converted string from bytes if `return_bytes` \
+                is false, otherwise a list of tuples indicating the timestamp received and bytes object from serial port.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        # items are immutable tuples, so they can be shared instead of copied
+        _rq = self._rcv_queue.snapshot()
+
+        if return_bytes:
+            return list(_rq)
+
+        ret: t.List[t.Tuple[float, str]] = []
+
+        for ts, rcv in _rq:
+            to_str = self.conv_bytes_to_str(rcv, read_until=read_until, strip=strip)
+            assert to_str  # mypy
+
+            ret.append((ts, to_str))
+
+        return ret
+
+    def snapshot(self) -> tools.ReceiveSnapshot:
+        """Returns a read-only view of the entire receive queue
+
+        Unlike `all_rcv()`, nothing is copied or converted, so this takes the same amount
+        of time no matter how large the receive queue is. Items received afterwards
+        are not added to the snapshot. It can be sliced by index or by sequence number
+        (see `ReceiveSnapshot`) without copying the items.
+
+        Raises:
+            ConnectException: If serial port not connected, this exception will be raised.
+
+        Returns:
+            ReceiveSnapshot: A snapshot of the receive queue, where each item is a tuple \
+                indicating the timestamp received and bytes object from serial port.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        return self._rcv_queue.snapshot()
+
+    def receive_since(
+        self, seq: int, limit: t.Optional[int] = None
+    ) -> t.List[t.Tuple[int, float, bytes]]:
+        """Returns the objects received after the object with sequence number `seq`
+
+        Sequence numbers are found with arithmetic instead of searching the receive queue.
+        If there is a journal (see the `journal` argument), then objects that were removed
+        from the receive queue are read from the journal.
+
+        Args:
+            seq (int): The sequence number of the last object that was already read, or 0 to read from the start.
+            limit (int, None, optional): The maximum number of objects to return, oldest first. \
+            If None, there is no limit; with a journal, that can be the whole history. Defaults to None.
+
+        Raises:
+            ConnectException: If serial port not connected, this exception will be raised.
+            ValueError: If `limit` is negative.
+
+        Returns:
+            List[Tuple[int, float, bytes]]: A list of tuples indicating the sequence number, timestamp received, \
+                and bytes object from serial port, oldest first.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        if limit is not None and limit < 0:
+            raise ValueError("limit has to be nonnegative")
+
+        snap = self._rcv_queue.snapshot()
+        return self._history(snap.seq_range(seq + 1), seq + 1, None, limit)
+
+    def receive_range(
+        self,
+        start_ts: t.Optional[float] = None,
+        end_ts: t.Optional[float] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[t.Tuple[int, float, bytes]]:
+        """Returns the objects received from `start_ts` to `end_ts`
+
+        Objects are found with a binary search of the timestamps in the receive queue,
+        so this takes time proportional to the number of objects returned instead of the size
+        of the receive queue. If there is a journal (see the `journal` argument), then objects
+        that were removed from the receive queue are read from the journal.
+
+        Args:
+            start_ts (float, None, optional): The earliest timestamp (from `time.time()`), inclusive. \
+            If None, starts from the oldest object. Defaults to None.
+            end_ts (float, None, optional): The latest timestamp, inclusive. \
+            If None, ends at the most recent object. Defaults to None.
+            limit (int, None, optional): The maximum number of objects to return, oldest first. \
+            If None, there is no limit. Defaults to None.
+
+        Raises:
+            ConnectException: If serial port not connected, this exception will be raised.
+            ValueError: If `limit` is negative.
+
+        Returns:
+            List[Tuple[int, float, bytes]]: A list of tuples indicating the sequence number, timestamp received, \
+                and bytes object from serial port, oldest first.
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        if limit is not None and limit < 0:
+            raise ValueError("limit has to be nonnegative")
+
+        snap = self._rcv_queue.snapshot()
+        rcv = snap.time_range(start_ts, end_ts)
+        journal = self._rcv_queue.journal
+
+        start_seq = rcv.first_seq
+        if journal is not None and (
+            start_ts is None or not len(snap) or start_ts < snap[0][0]
+        ):
+            # the time range starts before the oldest item in the receive queue
+            start_seq = (
+                journal.first_seq
+                if start_ts is None
+                else self._rcv_queue.journal_seq_at_time(start_ts)
+            )
+
+        return self._history(rcv, start_seq, end_ts, limit)
+
+    def receive_str(
+        self,
+        num_before: int = 0,
+        read_until: t.Optional[str] = None,
+        strip: bool = True,
+    ) -> t.Optional[t.Tuple[float, str]]:
+        """Returns the most recently received object as a processed string.
+
+        To get the bytes object, use `Connection.receive()`.
+
+        The IO thread will continuously detect data from the serial port and put the `bytes` objects in the `rcv_queue`.
+        If there are no parameters, the method will return the most recent received data.
+        If `num_before` is greater than 0, then will return `num_before`th previous data.
+            - Note: Must be less than the current size of the queue and greater or equal to 0
+                - If not, returns None (no data)
+            - Example:
+                - 0 will return the most recent received data
+                - 1 will return the 2nd most recent received data
+                - ...
+
+        Args:
+            num_before (int, optional): The position in the receive queue to return data from. Defaults to 0.
+            read_until (bytes, None, optional): Will return a string that terminates with `read_until`, excluding `read_until`. \
+            For example, if the string is `"abcdefg123456]"`, and `read_until` is `]`, then it will return `"abcdefg123456"`. \
+            If there are multiple occurrences of `read_until`, then it will return the string that terminates with the first one. \
+            If None, the it will return the entire string. Defaults to None.
+            strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
+            If False, returns the processed string in its entirety. Defaults to True.
+
+        Raises:
+            ConnectException: If serial port not connected, this exception will be raised.
+
+        Returns:
+            Optional[Tuple[float, str]]: A `tuple` representing `(timestamp received, string data)` and None if no data was found
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        rcv_tuple = self.receive(num_before=num_before)
+        if rcv_tuple is None:
+            # return if None
+            return None
+
+        str_data = self.conv_bytes_to_str(
+            rcv_tuple[1], read_until=read_until, strip=strip
+        )
+
+        if not str_data:
+            # mypy
+            return None
+
+        return (rcv_tuple[0], str_data)
+
     @property
     def connected(self) -> bool:
         """A property to determine if the connection object is currently connected to a serial port or not.
@@ -418,9 +879,44 @@ class BaseConnection(abc.ABC):
 
             return 0
 
-        last_rcv_ind = self._binary_search_rcv(self._last_rcv[0])
+        with self._lock:
+            # everything is new if the last received data is not in the queue anymore
+            return min(
+                self._rcv_queue.last_seq - self._last_rcv_seq, len(self._rcv_queue)
+            )
 
-        return len(self._rcv_queue) - last_rcv_ind - 1
+    @property
+    def rcv_queue_bytes(self) -> int:
+        """A property indicating how much memory the data in the receive queue uses.
+
+        Getter:
+
+        - Gets the total size, in bytes, of the data in the receive queue.
+        """
+
+        return self._rcv_queue.nbytes
+
+    @property
+    def queue_max_bytes(self) -> t.Optional[int]:
+        """A property to determine the maximum total size of the data in the receive queue.
+
+        Getter:
+
+        - Gets the maximum total size, in bytes, of the data in the receive queue, or None if only `queue_size` is used.
+        """
+
+        return self._queue_max_bytes
+
+    @property
+    def journal(self) -> t.Optional[ReceiveJournal]:
+        """A property to get the journal that everything received is written to.
+
+        Getter:
+
+        - Gets the `ReceiveJournal` object, or None if there is no journal.
+        """
+
+        return self._rcv_queue.journal
 
     @property
     def port(self) -> str:
@@ -460,44 +956,270 @@ class BaseConnection(abc.ABC):
 
         self._last_sent = time.time()  # prevents from sending too rapidly
 
-        self._rcv_queue = []  # stores previous received strings
-        self._to_send = []  # queue data to send
+        # sequence numbers are kept, clearing also wakes up threads waiting for data
+        self._rcv_queue.clear()  # stores previous received strings
+        self._to_send = collections.deque()  # queue data to send
+        self._paced = collections.deque()
+        self._write_rest = b""
+
+        if self._rate_limiter is not None:
+            self._rate_limiter.reset()
+
+        if self._framer is not None:
+            # incomplete frame from before disconnecting is not valid
+            self._framer.reset()
+
+    def _release_paced(self) -> t.Optional[float]:
+        """
+        Moves data held back by the rate limiter whose time has come into the send queue.
+
+        Returns the time when the next data held back should be sent, or None if nothing is held back.
+        """
+
+        with self._lock:
+            now = time.time()
+            while len(self._paced) > 0 and self._paced[0][0] <= now:
+                self._to_send.append(self._paced.popleft()[1])
+
+            return self._paced[0][0] if len(self._paced) > 0 else None
 
-    def _binary_search_rcv(self, target: float) -> int:
+    def _join_send_queue(self, send_queue: tools.SendQueue) -> bytes:
         """
-        Binary searches a timestamp in the receive queue and returns the index of that timestamp.
+        Pops objects from the front of the send queue and joins them, stopping before `coalesce_bytes` would be exceeded.
+        Always pops at least one object.
+        """
+
+        parts = [send_queue.front()]
+        size = len(parts[0])
+        send_queue.pop()
 
-        Works because the timestamps in the receive queue are sorted by default.
+        while (
+            len(send_queue) > 0
+            and size + len(send_queue.front()) <= self._coalesce_bytes
+        ):
+            parts.append(send_queue.front())
+            size += len(parts[-1])
+            send_queue.pop()
 
-        When comparing, rounds to 4 digits.
+        return b"".join(parts)
+
+    def _take_paced_chunk(self, send_queue: tools.SendQueue) -> bytes:
+        """
+        Pops as many bytes from the front of the send queue as can be written without having more than
+        `device_buffer_size` bytes (or `PACE_AHEAD` seconds of data) that have not gone through the wire yet.
+        Objects are split if needed; the rest is written first next time.
+        """
+
+        now = time.time()
+        self._wire_free_at = max(self._wire_free_at, now)
+
+        if self._device_buffer_size is not None:
+            limit = self._device_buffer_size
+        else:
+            limit = max(int(PACE_AHEAD / self._byte_time), 1)
+
+        # bytes written that are still waiting to go through the wire (rounded up to not overflow)
+        in_flight = math.ceil((self._wire_free_at - now) / self._byte_time)
+
+        parts: t.List[bytes] = []
+        size = 0
+
+        while size < limit - in_flight:
+            if not self._write_rest:
+                if len(send_queue) <= 0:
+                    break
+
+                self._write_rest = send_queue.front()
+                send_queue.pop()
+
+            part = self._write_rest[: limit - in_flight - size]
+            self._write_rest = self._write_rest[len(part) :]
+            parts.append(part)
+            size += len(part)
+
+        self._wire_free_at += size * self._byte_time
+
+        return b"".join(parts)
+
+    def _frames(self, data: bytes) -> t.List[bytes]:
+        """
+        Splits `data` into frames using the framer, or returns it as one frame if there is no framer
+        """
+
+        if self._framer is None:
+            return [data]
+
+        return self._framer.feed(data)
+
+    def _set_last_rcv(self, seq: int, rcv: t.Tuple[float, bytes]) -> None:
+        """
+        Marks `rcv`, which has sequence number `seq`, as the data that the user previously received
         """
 
         with self._lock:
-            _tmp_q = self._rcv_queue.copy()
+            self._last_rcv = rcv
+            self._last_rcv_seq = seq
+
+    def _check_cursor(self, cursor: int, wait: float, limit: t.Optional[int]) -> int:
+        """
+        Checks the arguments of `receive_next()` and returns the cursor to wait after
+        """
+
+        if not self.connected:
+            raise ConnectException("No connection established")
+
+        if wait < 0:
+            raise ValueError("wait has to be nonnegative")
+
+        if limit is not None and limit < 0:
+            raise ValueError("limit has to be nonnegative")
+
+        # a cursor from the future (for example, from before a restart) reads from now on,
+        # instead of from the beginning, which with a journal can be the whole history
+        return min(cursor, self._rcv_queue.last_seq)
+
+    def _after_cursor(
+        self, cursor: int, limit: t.Optional[int]
+    ) -> t.Tuple[int, t.List[t.Tuple[int, float, bytes]]]:
+        """
+        Returns the new cursor and the objects after `cursor`
+        """
 
-        if len(_tmp_q) <= 0:
-            # not found if no size
-            return -1
+        new = self.receive_since(cursor, limit)
+        return (new[-1][0] if new else cursor), new
 
-        low = 0
-        high = len(_tmp_q)
+    def _history(
+        self,
+        rcv: tools.ReceiveSnapshot,
+        start_seq: int,
+        end_ts: t.Optional[float],
+        limit: t.Optional[int],
+    ) -> t.List[t.Tuple[int, float, bytes]]:
+        """
+        Returns the items in `rcv` as `(seq, timestamp, bytes)` tuples, after the items from `start_seq`
+        that are only in the journal (up to `end_ts`, if given), and at most `limit` of them
+        """
+
+        ret: t.List[t.Tuple[int, float, bytes]] = []
+
+        journal = self._rcv_queue.journal
+        if journal is not None and start_seq < rcv.first_seq:
+            end_seq = rcv.first_seq - 1
+            if end_ts is not None:
+                end_seq = min(end_seq, self._rcv_queue.journal_seq_at_time(end_ts))
 
-        while low <= high:
-            mid = (low + high) // 2  # integer division
+            # includes items that are still being written to the journal
+            ret = [
+                item
+                for item in self._rcv_queue.journal_entries(start_seq, end_seq, limit)
+                if end_ts is None or item[1] <= end_ts
+            ]
 
-            # comparing rounding to two digits
-            cmp1 = round(_tmp_q[mid][0], 4)
-            cmp2 = round(target, 4)
+        if limit is not None:
+            rcv = rcv.seq_range(end_seq=rcv.first_seq + max(limit - len(ret), 0) - 1)
 
-            if cmp1 == cmp2:
-                return mid
-            elif cmp1 < cmp2:
-                low = mid + 1
+        ret.extend((rcv.first_seq + i, ts, data) for i, (ts, data) in enumerate(rcv))
+
+        return ret
+
+    def _first_new_rcv(
+        self,
+        last_seq: int,
+        new: t.List[t.Tuple[float, bytes]],
+        return_bytes: bool,
+        read_until: t.Optional[str],
+        strip: bool,
+    ) -> t.Optional[t.Union[bytes, str]]:
+        """
+        Returns the first object in `new` (the most recent of which has sequence number `last_seq`)
+        as bytes or as a processed string, skipping empty strings, and marks it as received.
+        Returns None if there is no such object.
+        """
+
+        for i, (ts, data) in enumerate(new):
+            res: t.Optional[t.Union[bytes, str]] = data
+            if not return_bytes:
+                res = self.conv_bytes_to_str(data, read_until=read_until, strip=strip)
+
+            if return_bytes or res:
+                self._set_last_rcv(last_seq - (len(new) - 1 - i), (ts, data))
+                return res
+
+        return None
+
+    def _response_in_rcv(
+        self,
+        last_seq: int,
+        new: t.List[t.Tuple[float, bytes]],
+        response: t.Union[bytes, str],
+        after_timestamp: float,
+        read_until: t.Optional[str],
+        strip: bool,
+    ) -> bool:
+        """
+        Checks if any object in `new` (the most recent of which has sequence number `last_seq`)
+        was received after `after_timestamp` and matches `response`. If one does, marks it as received.
+        """
+
+        for i, (ts, data) in enumerate(new):
+            # timestamp needs to be greater than start of method and response needs to match
+            if ts < after_timestamp:
+                continue
+
+            if isinstance(response, bytes):
+                matched = data == response
             else:
-                high = mid - 1
+                str_data = self.conv_bytes_to_str(
+                    data, read_until=read_until, strip=strip
+                )
+                matched = bool(str_data) and str_data == response
+
+            if matched:
+                self._set_last_rcv(last_seq - (len(new) - 1 - i), (ts, data))
+                return True
+
+        return False
+
+    def _wait_for_rcv(
+        self, after_seq: int, deadline: float
+    ) -> t.Tuple[int, t.List[t.Tuple[float, bytes]]]:
+        """
+        Waits until the receive queue has objects with sequence numbers greater than `after_seq`.
+
+        Returns the sequence number of the most recent object and the new objects, oldest first.
+        If `deadline` (a UNIX timestamp) is reached or the connection closes first, returns
+        `after_seq` and an empty list. The IO thread notifies `_rcv_cond` whenever it adds
+        to the receive queue, so this returns as soon as something new arrives.
+        """
+
+        with self._rcv_cond:
+            if not self._wait_for_seq(after_seq, deadline):
+                return after_seq, []
 
-        # return -1 if not found
-        return -1
+            return self._rcv_queue.last_seq, self._rcv_queue.since(after_seq)
+
+    def _wait_for_seq(self, after_seq: int, deadline: float) -> bool:
+        """
+        Waits until the receive queue has an object with a sequence number greater than `after_seq`
+        without reading any objects. Returns False if `deadline` is reached or the connection closes first.
+        """
+
+        with self._rcv_cond:
+            while self._rcv_queue.last_seq <= after_seq:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.connected:
+                    return False
+
+                self._rcv_cond.wait(min(remaining, RCV_WAIT_INTERVAL))
+
+            return True
+
+    def _wake_io_thread(self) -> None:
+        """Tells the IO thread that there is work to do.
+
+        Does nothing by default. IO threads that block while waiting
+        for events should override this to wake themselves up.
+        """
 
     @abc.abstractmethod
     def _io_thread(self) -> None:
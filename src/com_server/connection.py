@@ -5,21 +5,29 @@
 Contains implementation of connection object.
 """
 
-import copy
 import os
+import selectors
 import signal
+import threading
 import time
 import typing as t
 
 import serial
 from serial.serialutil import SerialException
 
+from . import constants
 from .base_connection import BaseConnection, ConnectException
 from .tools import ReceiveQueue, SendQueue
 
 if os.name == "posix":
     import termios
 
+# longest time the IO thread blocks in `IO_MODE_SELECT` before checking the connection again
+SELECT_TIMEOUT = 0.1
+
+# initial size of the buffer that the default cycle reads into; grows if a single read is larger
+READ_BUFFER_SIZE = 65536
+
 
 class Connection(BaseConnection):
     """Class that interfaces with the serial port.
@@ -28,61 +36,38 @@ class Connection(BaseConnection):
     If this does not happen, then the IO thread will still be running for an object that has already been deleted.
     """
 
-    def __enter__(self) -> "Connection":
+    def __init__(self, *args: t.Any, **kwargs: t.Any) -> None:
         """
-        Same as `BaseConnection.__enter__()` but returns `Connection` object rather than a `BaseConnection` object.
+        Same as `BaseConnection.__init__()`.
         """
 
-        if not self.connected:
-            self.connect()
+        super().__init__(*args, **kwargs)
 
-        return self
+        # used to wake up the IO thread when `io_mode` is `IO_MODE_SELECT`
+        self._selector: t.Optional[selectors.BaseSelector] = None
+        self._wake_r: t.Optional[int] = None
+        self._wake_w: t.Optional[int] = None
+        self._wake_lock = threading.Lock()
 
-    def conv_bytes_to_str(
-        self,
-        rcv: t.Optional[bytes],
-        read_until: t.Optional[str] = None,
-        strip: bool = True,
-    ) -> t.Optional[str]:
-        """Converts bytes object to string given parameters
+        # preallocated buffer that the default cycle reads into
+        self._read_buf = bytearray(READ_BUFFER_SIZE)
 
-        Args:
-            rcv (bytes, None): A bytes object. If None, then the method will return None.
-            read_until (bytes, None, optional): Will return a string that terminates with `read_until`, excluding `read_until`. \
-            For example, if the string is `"abcdefg123456]"`, and `read_until` is `]`, then it will return `"abcdefg123456"`. \
-            If there are multiple occurrences of `read_until`, then it will return the string that terminates with the first one. \
-            If None, the it will return the entire string. Defaults to None.
-            strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
-            If False, returns the processed string in its entirety. Defaults to True.
-
-        Returns:
-            Optional[str]: A string representing the processed data, or None if `rcv` is None
+    def __enter__(self) -> "Connection":
+        """
+        Same as `BaseConnection.__enter__()` but returns `Connection` object rather than a `BaseConnection` object.
         """
 
-        if rcv is None:
-            return None
-
-        res = rcv.decode("utf-8")
-
-        try:
-            ret = res[0 : res.index(str(read_until))]  # sliced string
-            if strip:
-                return ret.strip()
-            else:
-                return ret
+        if not self.connected:
+            self.connect()
 
-        except (ValueError, TypeError):
-            # read_until does not exist or it is None, so return the entire thing
-            if strip:
-                return res.strip()
-            else:
-                return res
+        return self
 
     def get(
         self,
         return_bytes: bool = False,
         read_until: t.Optional[str] = None,
         strip: bool = True,
+        timeout: t.Optional[float] = None,
     ) -> t.Optional[t.Union[bytes, str]]:
         """Gets first response after this method is called.
 
@@ -98,6 +83,8 @@ class Connection(BaseConnection):
             If None, the it will return the entire string. Defaults to None.
             strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
             If False, returns the processed string in its entirety. Defaults to True.
+            timeout (float, None, optional): The longest time, in seconds, to wait. \
+            If None, uses the `timeout` of the connection. Defaults to None.
 
         Raises:
             ConnectException: If serial port not connected, this exception will be raised.
@@ -110,128 +97,58 @@ class Connection(BaseConnection):
         if not self.connected:
             raise ConnectException("No connection established")
 
-        call_time = time.time()  # time that the function was called
-
-        r: t.Optional[t.Tuple[float, t.Union[bytes, str]]] = None
-        if return_bytes:
-            r = self.receive()
-        else:
-            r = self.receive_str(read_until=read_until, strip=strip)
+        # for timeout
+        deadline = time.time() + (self._timeout if timeout is None else timeout)
 
-        st_t = time.time()  # for timeout
-
-        # wait for r to not be None or for received time to be greater than call time
-        while r is None or r[0] < call_time:
-            if time.time() - st_t > self._timeout:
+        # wait for data with a sequence number greater than the most recent one when called
+        seq = self._rcv_queue.last_seq
+        while True:
+            last_seq, new = self._wait_for_rcv(seq, deadline)
+            if not new:
                 # timeout reached
                 return None
 
-            if return_bytes:
-                r = self.receive()
-            else:
-                r = self.receive_str(read_until=read_until, strip=strip)
-            time.sleep(0.01)
-
-        # r received
-        return r[1]
-
-    def all_rcv(
-        self,
-        return_bytes: bool = False,
-        read_until: t.Optional[str] = None,
-        strip: bool = True,
-    ) -> t.Union[t.List[t.Tuple[float, str]], t.List[t.Tuple[float, bytes]]]:
-        """Returns entire receive queue
-
-        Args:
-            return_bytes (bool, optional): Will return bytes if True and string if False. If true, other args will be ignored. Defaults to False.
-            read_until (bytes, None, optional): All strings in the list will terminate with `read_until` without the `read_until` character. \
-            For example, if a string in the list was `"abcdefg123456]"`, and `read_until` is `]`, then the string will become `"abcdefg123456"`. \
-            If None, the it will return the entire string. Defaults to None.
-            strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
-            If False, returns the processed string in its entirety. Defaults to True.
-
-        Raises:
-            ConnectException: If serial port not connected, this exception will be raised.
-
-        Returns:
-            Union[List[Tuple[float, str]], List[Tuple[float, bytes]]]: A list of tuples indicating the timestamp received and the converted string from bytes if `return_bytes` \
-                is false, otherwise a list of tuples indicating the timestamp received and bytes object from serial port.
-        """
-
-        if not self.connected:
-            raise ConnectException("No connection established")
-
-        with self._lock:
-            _rq = copy.deepcopy(self._rcv_queue)
-
-        # _rq is a copy of receive queue, meaning that it is in bytes
-        if return_bytes:
-            return _rq
-
-        ret: t.List[t.Tuple[float, str]] = []
-
-        for ts, rcv in _rq:
-            to_str = self.conv_bytes_to_str(rcv, read_until=read_until, strip=strip)
-            assert to_str  # mypy
+            res = self._first_new_rcv(last_seq, new, return_bytes, read_until, strip)
+            if res is not None:
+                return res
 
-            ret.append((ts, to_str))
+            seq = last_seq
 
-        return ret
+    def receive_next(
+        self, cursor: int, wait: float = 0.0, limit: t.Optional[int] = None
+    ) -> t.Tuple[int, t.List[t.Tuple[int, float, bytes]]]:
+        """Returns the objects received after a cursor, waiting for new objects if there are none
 
-    def receive_str(
-        self,
-        num_before: int = 0,
-        read_until: t.Optional[str] = None,
-        strip: bool = True,
-    ) -> t.Optional[t.Tuple[float, str]]:
-        """Returns the most recently received object as a processed string.
+        A cursor is the sequence number of the last object that was already read, so a client can
+        read everything received, without missing or repeating objects, by passing the cursor
+        returned by the previous call. If there are objects after `cursor`, then they are returned
+        immediately. Otherwise, this waits up to `wait` seconds for new objects, returning as soon
+        as something is received (the IO thread wakes it up instead of it checking every so often).
 
-        To get the bytes object, use `Connection.receive()`.
-
-        The IO thread will continuously detect data from the serial port and put the `bytes` objects in the `rcv_queue`.
-        If there are no parameters, the method will return the most recent received data.
-        If `num_before` is greater than 0, then will return `num_before`th previous data.
-            - Note: Must be less than the current size of the queue and greater or equal to 0
-                - If not, returns None (no data)
-            - Example:
-                - 0 will return the most recent received data
-                - 1 will return the 2nd most recent received data
-                - ...
+        If `cursor` is greater than the most recent sequence number, for example because
+        the program restarted, then it is treated as the most recent sequence number,
+        so only objects received from now on are returned.
 
         Args:
-            num_before (int, optional): The position in the receive queue to return data from. Defaults to 0.
-            read_until (bytes, None, optional): Will return a string that terminates with `read_until`, excluding `read_until`. \
-            For example, if the string is `"abcdefg123456]"`, and `read_until` is `]`, then it will return `"abcdefg123456"`. \
-            If there are multiple occurrences of `read_until`, then it will return the string that terminates with the first one. \
-            If None, the it will return the entire string. Defaults to None.
-            strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
-            If False, returns the processed string in its entirety. Defaults to True.
+            cursor (int): The sequence number of the last object that was already read, or 0 to read from the start.
+            wait (float, optional): The maximum time, in seconds, to wait for new objects. Defaults to 0.
+            limit (int, None, optional): The maximum number of objects to return, oldest first. \
+            If None, there is no limit. Defaults to None.
 
         Raises:
             ConnectException: If serial port not connected, this exception will be raised.
+            ValueError: If `wait` or `limit` is negative.
 
         Returns:
-            Optional[Tuple[float, str]]: A `tuple` representing `(timestamp received, string data)` and None if no data was found
+            Tuple[int, List[Tuple[int, float, bytes]]]: The cursor to pass next time (the sequence number of the \
+                last object returned, or `cursor` if nothing was received) and a list of tuples indicating the sequence \
+                number, timestamp received, and bytes object from serial port, oldest first.
         """
 
-        if not self.connected:
-            raise ConnectException("No connection established")
-
-        rcv_tuple = self.receive(num_before=num_before)
-        if rcv_tuple is None:
-            # return if None
-            return None
+        cursor = self._check_cursor(cursor, wait, limit)
+        self._wait_for_seq(cursor, time.time() + wait)
 
-        str_data = self.conv_bytes_to_str(
-            rcv_tuple[1], read_until=read_until, strip=strip
-        )
-
-        if not str_data:
-            # mypy
-            return None
-
-        return (rcv_tuple[0], str_data)
+        return self._after_cursor(cursor, limit)
 
     def get_first_response(
         self,
@@ -283,6 +200,7 @@ class Connection(BaseConnection):
         after_timestamp: float = -1.0,
         read_until: t.Optional[str] = None,
         strip: bool = True,
+        timeout: t.Optional[float] = None,
     ) -> bool:
         """Waits until the connection receives a given response.
 
@@ -302,6 +220,8 @@ class Connection(BaseConnection):
             If None, the it will return the entire string. Defaults to None.
             strip (bool, optional): If True, then strips spaces and newlines from either side of the processed string before returning. \
             If False, returns the processed string in its entirety. Defaults to True.
+            timeout (float, None, optional): The longest time, in seconds, to wait. \
+            If None, uses the `timeout` of the connection. Defaults to None.
 
         Raises:
             ConnectException: If serial port not connected, this exception will be raised.
@@ -322,31 +242,32 @@ class Connection(BaseConnection):
         if not isinstance(response, bytes):
             response = str(response)
 
-        call_time = time.time()  # for timeout
-
-        r: t.Optional[t.Tuple[float, t.Union[bytes, str]]] = None
-        if isinstance(response, bytes):
-            r = self.receive()
-        else:
-            r = self.receive_str(read_until=read_until, strip=strip)
-
-        # continue searching until receive object has timestamp greater than after_timestamp
-        # and response matches
-        while r is None or r[0] < after_timestamp or r[1] != response:
-            # timestamp needs to be greater than start of method and response needs to match
-            if time.time() - call_time > self._timeout:
-                # timeout reached
-                return False
+        # for timeout
+        deadline = time.time() + (self._timeout if timeout is None else timeout)
 
-            if isinstance(response, bytes):
-                r = self.receive()
-            else:
-                r = self.receive_str(read_until=read_until, strip=strip)
-
-            time.sleep(0.01)
+        # check everything received since the most recent object when called
+        # (including that object) until a receive object has a timestamp
+        # greater than after_timestamp and the response matches
+        seq = self._rcv_queue.last_seq - 1
+        while True:
+            last_seq, new = self._wait_for_rcv(seq, deadline)
+            if not new:
+                if last_seq == seq:
+                    # timeout reached
+                    return False
+
+                # the receive queue did not have the most recent object when called
+                # (for example, it was empty), so wait for the next one
+                seq = last_seq
+                continue
+
+            if self._response_in_rcv(
+                last_seq, new, response, after_timestamp, read_until, strip
+            ):
+                # correct response has been received
+                return True
 
-        # correct response has been received
-        return True
+            seq = last_seq
 
     def send_for_response(
         self,
@@ -407,8 +328,6 @@ class Connection(BaseConnection):
             ):
                 return True
 
-            time.sleep(0.01)
-
     def reconnect(self, timeout: t.Optional[float] = None) -> bool:
         """Attempts to reconnect the serial port.
 
@@ -472,11 +391,9 @@ class Connection(BaseConnection):
 
         What the IO thread will do now is:
 
-        1. Check if anything is using (reading from/writing to) the variables
-        2. If not, copy the variables into a `SendQueue` and `ReceiveQueue` object.
-        3. Call the `custom_io_thread` function (if none, calls the default cycle)
-        4. Copy the results from the function back into the send queue and receive queue.
-        5. Rest for 0.01 seconds to rest the CPU
+        1. Wrap the shared send queue and receive queue in a `SendQueue` and `ReceiveQueue` object (nothing is copied).
+        2. Call the `custom_io_thread` function (if none, calls the default cycle)
+        3. Rest for 0.01 seconds to rest the CPU
 
         The cycle should be in a function that this decorator will be on top of.
         The function should accept three parameters:
@@ -523,23 +440,37 @@ class Connection(BaseConnection):
         This is the default "cycle" of the IO thread, described here:
 
         1. Checks if there is any data to be received
-        2. If there is, reads all the data and puts the `bytes` received into the receive queue
-        3. Tries to send everything in the send queue; breaks when 0.5 seconds is reached (will continue if send queue is empty)
+        2. If there is, reads all the data until the line is quiet (or, with a framer, all the data already there) and puts the `bytes` received into the receive queue \
+        (split into complete frames if there is a framer)
+        3. Tries to send everything in the send queue; breaks when 0.5 seconds is reached (will continue if send queue is empty). \
+        If `coalesce_bytes` is positive, then instead joins the front of the send queue into one write of up to `coalesce_bytes` bytes. \
+        If `pace_writes` is True, then instead writes as much of the send queue as the wire can take (see `pace_writes`).
         """
 
-        # flush buffers
-        conn.flush()
-
         # keep on trying to poll data as long as connection is still alive
         if conn.in_waiting:
             # read everything from serial buffer
-            incoming = b""
-            while conn.in_waiting:
-                incoming += conn.read()
-                time.sleep(0.001)
+            incoming = self._read_all(conn)
+
+            # add to queue, each frame as its own item
+            rcv_queue.pushitems(*self._frames(incoming))
+
+        if self._pace_writes:
+            # sending data (as much as the wire can take)
+            chunk = self._take_paced_chunk(send_queue)
+            if chunk:
+                conn.write(chunk)
+
+            return
+
+        if self._coalesce_bytes > 0:
+            # sending data (as much as possible in one write); flushing waits until it has been sent,
+            # so it is only done after writing, and never when pacing, which avoids waiting
+            if len(send_queue) > 0:
+                conn.write(self._join_send_queue(send_queue))
+                conn.flush()
 
-            # add to queue
-            rcv_queue.pushitems(incoming)
+            return
 
         # sending data (send one at a time in queue for 0.5 seconds)
         st_t = time.time()  # start time
@@ -553,36 +484,130 @@ class Connection(BaseConnection):
                 break
             time.sleep(0.01)
 
+    def _read_all(self, conn: serial.Serial) -> bytes:
+        """
+        Reads everything in the serial buffer into the preallocated read buffer
+        until nothing new arrives for two character times.
+        With a framer, stops as soon as the serial buffer is empty instead, since the framer
+        keeps a partial frame until the rest of it arrives.
+        """
+
+        gap = 20 / self._baud  # 10 bits per character
+        filled = 0
+
+        while True:
+            waiting = conn.in_waiting
+            if not waiting:
+                if self._framer is not None:
+                    break
+
+                # wait for the rest of the message before deciding that it ended
+                time.sleep(gap)
+                waiting = conn.in_waiting
+                if not waiting:
+                    break
+
+            if filled + waiting > len(self._read_buf):
+                # grow buffer so that the whole message fits
+                self._read_buf.extend(
+                    bytes(max(filled + waiting - len(self._read_buf), READ_BUFFER_SIZE))
+                )
+
+            with memoryview(self._read_buf) as view:
+                filled += conn.readinto(view[filled : filled + waiting])
+
+        with memoryview(self._read_buf) as view:
+            return bytes(view[:filled])
+
     def _cyc(self) -> None:
         """
         Each cycle of the IO thread
         """
-        # make sure other threads cannot read/write variables
-        # copy the variables to temporary ones so the locks don't block for so long
-        with self._lock:
-            _rcv_queue = ReceiveQueue(self._rcv_queue.copy(), self._queue_size)
-            _send_queue = SendQueue(self._to_send.copy())
+        # nothing is copied: the receive queue holds the lock only while
+        # items are being pushed (and then notifies waiting threads), and the IO thread is the only thread that
+        # removes from the send queue (deque appends/pops are atomic)
+        self._release_paced()  # data held back by the rate limiter that is due now
 
-        # find number of objects to send; important for pruning send queue later
-        _num_to_send_i = len(_send_queue)
+        _rcv_queue = ReceiveQueue(self._rcv_queue, self._queue_size)
+        _send_queue = SendQueue(self._to_send)
 
         self._cyc_func(self._conn, _rcv_queue, _send_queue)
 
-        # find length of send queue after
-        _num_to_send_f = len(_send_queue)
+        if self._rest_cpu and self._io_mode == constants.IO_MODE_POLL:
+            time.sleep(0.01)  # rest CPU
 
-        # make sure other threads cannot read/write variables
-        with self._lock:
-            # copy the variables back
-            self._rcv_queue = _rcv_queue.copy()
+    def _wake_io_thread(self) -> None:
+        """
+        Wakes up the IO thread by writing to its wakeup pipe if it is waiting in `IO_MODE_SELECT`
+        """
 
-            # delete the first element of send queue attribute for every object that was sent
-            # as those elements were the ones that were sent and are not needed anymore
-            for _ in range(_num_to_send_i - _num_to_send_f):
-                self._to_send.pop(0)
+        with self._wake_lock:
+            if self._wake_w is None:
+                return
 
-        if self._rest_cpu:
-            time.sleep(0.01)  # rest CPU
+            try:
+                os.write(self._wake_w, b"\0")
+            except OSError:
+                # pipe is full, so the IO thread will wake up anyway
+                pass
+
+    def _open_selector(self) -> None:
+        """
+        Creates the selector and wakeup pipe used in `IO_MODE_SELECT`
+        """
+
+        assert self._conn is not None  # mypy
+
+        wake_r, wake_w = os.pipe()
+        os.set_blocking(wake_r, False)
+        os.set_blocking(wake_w, False)
+
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._conn.fileno(), selectors.EVENT_READ)
+        self._selector.register(wake_r, selectors.EVENT_READ)
+
+        with self._wake_lock:
+            self._wake_r, self._wake_w = wake_r, wake_w
+
+    def _close_selector(self) -> None:
+        """
+        Closes the selector and wakeup pipe used in `IO_MODE_SELECT`
+        """
+
+        with self._wake_lock:
+            if self._selector is not None:
+                self._selector.close()
+            if self._wake_r is not None:
+                os.close(self._wake_r)
+            if self._wake_w is not None:
+                os.close(self._wake_w)
+
+            self._selector = None
+            self._wake_r = self._wake_w = None
+
+    def _wait_for_io(self) -> None:
+        """
+        Blocks until the serial port is readable, the IO thread is woken up, or `SELECT_TIMEOUT` is reached
+        """
+
+        assert self._selector is not None  # mypy
+
+        # don't block for long if the last cycle could not send everything
+        timeout = 0.01 if len(self._to_send) > 0 or self._write_rest else SELECT_TIMEOUT
+
+        with self._lock:
+            if len(self._paced) > 0:
+                # wake up when the rate limiter allows the next data to be sent
+                timeout = min(timeout, max(self._paced[0][0] - time.time(), 0))
+
+        for key, _ in self._selector.select(timeout):
+            if key.fd == self._wake_r:
+                # empty the pipe so that the next select() blocks again
+                try:
+                    while os.read(key.fd, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
 
     def _io_thread(self) -> None:
         """Thread that interacts with the serial port.
@@ -592,13 +617,13 @@ class Connection(BaseConnection):
         Override of the IO thread.
 
         Calls a function for executing a cycle rather than execute the default cycle itself.
-        1. Check that the receive and send queues are not being read from or written to.
-        2. If so, then copy the receive and send queues to another variable; if not,
-        then wait for them to stop being used.
-        3. Execute the cycle function.
-        4. Check that the receive and send queues are not being read from or written to.
-        5. If so, then copy the temporary receive/send queues back to the receive queue and send
-        queue attributes; if not, then wait for them to stop being used.
+        1. Move data held back by the rate limiter that is due into the send queue, then
+        wrap the shared receive and send queues in `ReceiveQueue` and `SendQueue` objects.
+        2. Execute the cycle function. The `ReceiveQueue` takes the lock only while pushing items.
+        3. Rest the CPU or wait for IO depending on `io_mode`.
+
+        If `io_mode` is `IO_MODE_SELECT`, then instead of resting between cycles, the thread
+        waits until the serial port has data, `send()` is called, or `SELECT_TIMEOUT` is reached.
         """
 
         # try to see if cycle function exists
@@ -608,47 +633,56 @@ class Connection(BaseConnection):
         except AttributeError:
             self._cyc_func = self._default_cycle
 
-        while self._conn is not None:
-            if os.name == "posix":
-                # may raise termios.error, not on Windows
+        if self._io_mode == constants.IO_MODE_SELECT:
+            self._open_selector()
 
-                try:
-                    self._cyc()
-                except (
-                    ConnectException,
-                    OSError,
-                    serial.SerialException,
-                    termios.error,
-                ):
-                    # Disconnected, as all of the self.conn (pyserial) operations will raise
-                    # an exception if the port is not connected.
-
-                    # reset connection and IO variables
-                    self._conn = None
-                    self._reset()
-
-                    if self._exit_on_disconnect:
-                        os.kill(os.getpid(), signal.SIGTERM)
-
-                    # exit thread
-                    return
-            else:
-                try:
-                    self._cyc()
-                except (
-                    ConnectException,
-                    OSError,
-                    serial.SerialException,
-                ):
-                    # Disconnected, as all of the self.conn (pyserial) operations will raise
-                    # an exception if the port is not connected.
-
-                    # reset connection and IO variables
-                    self._conn = None
-                    self._reset()
-
-                    if self._exit_on_disconnect:
-                        os.kill(os.getpid(), signal.SIGTERM)
-
-                    # exit thread
-                    return
+        try:
+            while self._conn is not None:
+                if os.name == "posix":
+                    # may raise termios.error, not on Windows
+
+                    try:
+                        self._cyc()
+
+                        if self._selector is not None:
+                            self._wait_for_io()
+                    except (
+                        ConnectException,
+                        OSError,
+                        serial.SerialException,
+                        termios.error,
+                    ):
+                        # Disconnected, as all of the self.conn (pyserial) operations will raise
+                        # an exception if the port is not connected.
+
+                        # reset connection and IO variables
+                        self._conn = None
+                        self._reset()
+
+                        if self._exit_on_disconnect:
+                            os.kill(os.getpid(), signal.SIGTERM)
+
+                        # exit thread
+                        return
+                else:
+                    try:
+                        self._cyc()
+                    except (
+                        ConnectException,
+                        OSError,
+                        serial.SerialException,
+                    ):
+                        # Disconnected, as all of the self.conn (pyserial) operations will raise
+                        # an exception if the port is not connected.
+
+                        # reset connection and IO variables
+                        self._conn = None
+                        self._reset()
+
+                        if self._exit_on_disconnect:
+                            os.kill(os.getpid(), signal.SIGTERM)
+
+                        # exit thread
+                        return
+        finally:
+            self._close_selector()
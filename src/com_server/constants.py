@@ -21,8 +21,26 @@ RCV_QUEUE_SIZE_NORMAL = 256
 RCV_QUEUE_SIZE_LARGE = 512
 RCV_QUEUE_SIZE_XLARGE = 1024
 
+# IO thread modes
+IO_MODE_POLL = "poll"
+IO_MODE_SELECT = "select"
+
 # server
 DEFAULT_HOST = "0.0.0.0"
 DEFAULT_PORT = 8080
 
+# how ConnectionRoutes locks the connection for a resource
+ACCESS_EXCLUSIVE = "exclusive"  # one at a time
+ACCESS_SHARED = "shared"  # along with other shared resources
+ACCESS_UNLOCKED = "unlocked"  # not locked at all
+
+# waiting for the connection in ConnectionRoutes and RestApiHandler
+ROUTE_MAX_WAIT = 10.0  # longest time, in seconds, that a request waits by default
+ROUTE_MAX_WAITING = 16  # most requests waiting at once by default
+ROUTE_MAX_STREAMS = 8  # most streams and long polls open at once by default
+
+# each request that waits or streams takes a server thread for as long as it lasts, so start_app()
+# serves with enough threads for every ConnectionRoutes to reach its limits, plus these
+SERVER_SPARE_THREADS = 4
+
 SUPPORTED_HTTP_METHODS = ("get", "post", "put", "patch", "delete", "options", "head")
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contains framers, which split the bytes read from the serial port into frames.
+
+Pass a framer to `Connection` using the `framer` argument. The default IO cycle then puts
+each complete frame into the receive queue as its own item (with its own timestamp),
+instead of putting everything that was read at once into one item. Incomplete frames
+are kept by the framer until the rest of the frame is read.
+"""
+
+import abc
+import typing as t
+
+FRAME_MAX_SIZE = 65536
+
+
+class BaseFramer(abc.ABC):
+    """The base class of all framers.
+
+    Subclasses implement `feed()`, which takes the bytes that were just read and returns the
+    frames that were completed by them. Data that is not part of a complete frame yet is kept
+    in `self._buf`. If the incomplete frame grows larger than `max_size` bytes, it is
+    discarded so that a corrupted stream cannot use up all of the memory.
+
+    A framer keeps state, so each connection needs its own framer object.
+    """
+
+    def __init__(self, max_size: int = FRAME_MAX_SIZE) -> None:
+        """Constructor for framers.
+
+        Args:
+            max_size (int, optional): The largest size, in bytes, of an incomplete frame. Defaults to 65536.
+
+        Raises:
+            ValueError: If `max_size` is not positive.
+        """
+
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+
+        self._max_size = max_size
+        self._buf = bytearray()
+
+    @abc.abstractmethod
+    def feed(self, data: bytes) -> t.List[bytes]:
+        """Adds bytes read from the serial port and returns the frames completed by them.
+
+        Args:
+            data (bytes): The bytes that were read.
+
+        Returns:
+            List[bytes]: The complete frames, oldest first.
+        """
+
+        pass  # pragma: no cover
+
+    def reset(self) -> None:
+        """
+        Discards any incomplete frame. Called when the serial port is disconnected.
+        """
+
+        self._buf = bytearray()
+
+    def _check_size(self) -> None:
+        """
+        Discards the incomplete frame if it is larger than `max_size`
+        """
+
+        if len(self._buf) > self._max_size:
+            self._buf = bytearray()
+
+
+class DelimiterFramer(BaseFramer):
+    """Splits data into frames that end with a delimiter, such as lines.
+
+    ```py
+    # each item in the receive queue is one line
+    conn = Connection(115200, "/dev/ttyUSB0", framer=DelimiterFramer(b"\\n"))
+    ```
+    """
+
+    def __init__(
+        self,
+        delimiter: bytes = b"\n",
+        keep_delimiter: bool = True,
+        max_size: int = FRAME_MAX_SIZE,
+    ) -> None:
+        """Constructor for delimiter framer.
+
+        Args:
+            delimiter (bytes, optional): The bytes that end each frame. Defaults to `b"\\n"`.
+            keep_delimiter (bool, optional): If True, frames end with the delimiter. \
+            Otherwise, the delimiter is removed. Defaults to True.
+            max_size (int, optional): The largest size, in bytes, of an incomplete frame. Defaults to 65536.
+
+        Raises:
+            ValueError: If `delimiter` is empty or `max_size` is not positive.
+        """
+
+        super().__init__(max_size)
+
+        if not delimiter:
+            raise ValueError("delimiter must not be empty")
+
+        self._delimiter = bytes(delimiter)
+        self._keep_delimiter = keep_delimiter
+
+    def feed(self, data: bytes) -> t.List[bytes]:
+        # only search the new data (and the end of the old data, in case the delimiter was split)
+        search = max(len(self._buf) - len(self._delimiter) + 1, 0)
+        self._buf += data
+
+        frames: t.List[bytes] = []
+        start = 0
+
+        while True:
+            found = self._buf.find(self._delimiter, max(search, start))
+            if found < 0:
+                break
+
+            end = found + len(self._delimiter)
+            frames.append(
+                bytes(self._buf[start : end if self._keep_delimiter else found])
+            )
+            start = end
+
+        del self._buf[:start]
+        self._check_size()
+
+        return frames
+
+
+class FixedLengthFramer(BaseFramer):
+    """
+    Splits data into frames that all have the same length.
+    """
+
+    def __init__(self, length: int) -> None:
+        """Constructor for fixed length framer.
+
+        Args:
+            length (int): The length of each frame, in bytes.
+
+        Raises:
+            ValueError: If `length` is not positive.
+        """
+
+        if length <= 0:
+            raise ValueError("length must be positive")
+
+        super().__init__(length)
+
+        self._length = length
+
+    def feed(self, data: bytes) -> t.List[bytes]:
+        self._buf += data
+
+        count = len(self._buf) // self._length
+        frames = [
+            bytes(self._buf[i * self._length : (i + 1) * self._length])
+            for i in range(count)
+        ]
+
+        del self._buf[: count * self._length]
+
+        return frames
+
+
+class LengthPrefixFramer(BaseFramer):
+    """Splits data into frames that start with their length.
+
+    The length is an unsigned integer of `prefix_size` bytes that does not count the prefix itself.
+    If the length is greater than `max_size`, then the stream is assumed to be corrupted
+    and all data that was not read yet is discarded.
+    """
+
+    def __init__(
+        self,
+        prefix_size: int = 2,
+        byteorder: str = "big",
+        include_prefix: bool = False,
+        max_size: int = FRAME_MAX_SIZE,
+    ) -> None:
+        """Constructor for length prefix framer.
+
+        Args:
+            prefix_size (int, optional): The size of the length prefix, in bytes. Defaults to 2.
+            byteorder (str, optional): The byte order of the length prefix, either "big" or "little". Defaults to "big".
+            include_prefix (bool, optional): If True, frames start with the length prefix. \
+            Otherwise, the prefix is removed. Defaults to False.
+            max_size (int, optional): The largest length, in bytes, of a frame. Defaults to 65536.
+
+        Raises:
+            ValueError: If `prefix_size` or `max_size` is not positive or `byteorder` is not "big" or "little".
+        """
+
+        super().__init__(max_size)
+
+        if prefix_size <= 0:
+            raise ValueError("prefix_size must be positive")
+
+        if byteorder not in ("big", "little"):
+            raise ValueError('byteorder must be "big" or "little"')
+
+        self._prefix_size = prefix_size
+        self._byteorder = byteorder
+        self._include_prefix = include_prefix
+
+    def feed(self, data: bytes) -> t.List[bytes]:
+        self._buf += data
+
+        frames: t.List[bytes] = []
+        start = 0
+
+        while len(self._buf) - start >= self._prefix_size:
+            length = int.from_bytes(
+                self._buf[start : start + self._prefix_size],
+                self._byteorder,  # type: ignore[arg-type]
+            )
+
+            if length > self._max_size:
+                # corrupted; nothing after this can be trusted
+                self._buf = bytearray()
+                return frames
+
+            end = start + self._prefix_size + length
+            if end > len(self._buf):
+                # rest of frame not read yet
+                break
+
+            begin = start if self._include_prefix else start + self._prefix_size
+            frames.append(bytes(self._buf[begin:end]))
+            start = end
+
+        del self._buf[:start]
+
+        return frames
+
+
+class _SeparatorFramer(BaseFramer):
+    """
+    Base class for framers where frames are separated by one byte and decoded
+    """
+
+    _SEPARATOR = 0
+
+    def feed(self, data: bytes) -> t.List[bytes]:
+        self._buf += data
+
+        frames: t.List[bytes] = []
+        start = 0
+
+        while True:
+            found = self._buf.find(self._SEPARATOR, start)
+            if found < 0:
+                break
+
+            if found > start:
+                # empty frames are skipped
+                frame = self._decode(bytes(self._buf[start:found]))
+                if frame is not None:
+                    frames.append(frame)
+
+            start = found + 1
+
+        del self._buf[:start]
+        self._check_size()
+
+        return frames
+
+    @abc.abstractmethod
+    def _decode(self, encoded: bytes) -> t.Optional[bytes]:
+        """
+        Decodes a frame, returning None if it is invalid
+        """
+
+        pass  # pragma: no cover
+
+
+class SlipFramer(_SeparatorFramer):
+    """Splits and decodes SLIP frames ([RFC 1055](https://datatracker.ietf.org/doc/html/rfc1055)).
+
+    Frames are separated by `0xC0` bytes. Empty frames are skipped,
+    and frames with invalid escape sequences are discarded.
+    """
+
+    _SEPARATOR = 0xC0
+    _ESC = 0xDB
+    _ESC_END = 0xDC
+    _ESC_ESC = 0xDD
+
+    def _decode(self, encoded: bytes) -> t.Optional[bytes]:
+        if self._ESC not in encoded:
+            return encoded
+
+        out = bytearray()
+        escaped = False
+
+        for byte in encoded:
+            if escaped:
+                if byte == self._ESC_END:
+                    out.append(self._SEPARATOR)
+                elif byte == self._ESC_ESC:
+                    out.append(self._ESC)
+                else:
+                    return None
+
+                escaped = False
+            elif byte == self._ESC:
+                escaped = True
+            else:
+                out.append(byte)
+
+        return None if escaped else bytes(out)
+
+
+class CobsFramer(_SeparatorFramer):
+    """Splits and decodes COBS frames (Consistent Overhead Byte Stuffing).
+
+    Frames are separated by `0x00` bytes. Empty frames are skipped,
+    and frames that are not valid COBS are discarded.
+    """
+
+    _SEPARATOR = 0x00
+
+    def _decode(self, encoded: bytes) -> t.Optional[bytes]:
+        out = bytearray()
+        i = 0
+
+        while i < len(encoded):
+            code = encoded[i]
+            end = i + code
+
+            if code == 0 or end > len(encoded):
+                return None
+
+            out += encoded[i + 1 : end]
+            i = end
+
+            if code < 0xFF and i < len(encoded):
+                out.append(0)
+
+        return bytes(out)
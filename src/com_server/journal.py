@@ -0,0 +1,602 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contains implementation of the receive journal, which keeps received data on disk.
+"""
+
+import bisect
+import mmap
+import os
+import struct
+import threading
+import typing as t
+
+# timestamp, sequence number, offset in data file, size
+INDEX_RECORD = struct.Struct("<dQQQ")
+
+JOURNAL_SEGMENT_SIZE = 16 * 1024 * 1024
+
+# files of the segment being written to are grown to at least this size, then doubled each time
+# they are full, so that readers rarely have to memory map them again
+JOURNAL_PREALLOCATE = 64 * 1024
+
+# most items read while holding the lock, so that reading a long range does not hold up writing
+JOURNAL_READ_CHUNK = 1024
+
+
+class _Segment:
+    """
+    One segment of the journal: a data file with the received bytes joined together,
+    and an index file with an `INDEX_RECORD` for each item. Files are read with `mmap`.
+    """
+
+    def __init__(self, directory: str, first_seq: int) -> None:
+        self.first_seq = first_seq
+        self.dat_path = os.path.join(directory, f"{first_seq:020d}.dat")
+        self.idx_path = os.path.join(directory, f"{first_seq:020d}.idx")
+
+        self.count = 0  # number of items
+        self.size = 0  # size of data file
+        self.first_ts = 0.0
+        self.last_seq = first_seq - 1
+
+        self._maps: t.Dict[str, t.Optional[mmap.mmap]] = {
+            self.dat_path: None,
+            self.idx_path: None,
+        }
+
+    def load(self) -> None:
+        """
+        Reads the sizes of existing files, dropping anything after the last complete item
+        """
+
+        count = self._written_count(os.path.getsize(self.idx_path) // INDEX_RECORD.size)
+        size = 0
+
+        if count > 0:
+            _, _, offset, length = self._read_record(count - 1)
+            size = offset + length
+
+            if os.path.getsize(self.dat_path) < size:
+                # index written but not data; drop last item
+                count -= 1
+                size = offset
+
+        # remove partial writes and preallocated space; the file must not be mapped meanwhile
+        self.close()
+        os.truncate(self.idx_path, count * INDEX_RECORD.size)
+        os.truncate(self.dat_path, size)
+
+        self.count = count
+        self.size = size
+
+        if count > 0:
+            self.first_ts = self.record(0)[0]
+            self.last_seq = self.record(count - 1)[1]
+
+    def record(self, index: int) -> t.Tuple[float, int, int, int]:
+        """
+        Returns the index record of the item at `index` in the segment
+        """
+
+        mm = self._map(self.idx_path, (index + 1) * INDEX_RECORD.size)
+        return INDEX_RECORD.unpack_from(mm, index * INDEX_RECORD.size)
+
+    def data(self, offset: int, length: int) -> bytes:
+        """
+        Returns `length` bytes of the data file starting at `offset`
+        """
+
+        if length == 0:
+            return b""
+
+        mm = self._map(self.dat_path, offset + length)
+        return mm[offset : offset + length]
+
+    def item(self, index: int) -> t.Tuple[int, float, bytes]:
+        """
+        Returns `(seq, timestamp, bytes)` of the item at `index` in the segment
+        """
+
+        timestamp, seq, offset, length = self.record(index)
+        return seq, timestamp, self.data(offset, length)
+
+    def close(self) -> None:
+        """
+        Closes the memory maps
+        """
+
+        for path, mm in self._maps.items():
+            if mm is not None:
+                mm.close()
+            self._maps[path] = None
+
+    def _map(self, path: str, needed: int) -> mmap.mmap:
+        """
+        Returns a memory map of `path` that is at least `needed` bytes long, mapping it again if the file grew
+        """
+
+        mm = self._maps[path]
+        if mm is None or len(mm) < needed:
+            if mm is not None:
+                mm.close()
+
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            self._maps[path] = mm
+
+        return mm
+
+    def _written_count(self, count: int) -> int:
+        """
+        Returns the number of items written to the first `count` index records. Space that was preallocated
+        but not written (if the journal was not closed) is zeros, and sequence numbers start from 1.
+        """
+
+        low, high = 0, count
+        while low < high:
+            mid = (low + high) // 2
+            if self._read_record(mid)[1] == 0:
+                high = mid
+            else:
+                low = mid + 1
+
+        return low
+
+    def _read_record(self, index: int) -> t.Tuple[float, int, int, int]:
+        """
+        Reads an index record without memory mapping the index file
+        """
+
+        with open(self.idx_path, "rb") as f:
+            f.seek(index * INDEX_RECORD.size)
+            return INDEX_RECORD.unpack(f.read(INDEX_RECORD.size))
+
+
+class _Column:
+    """
+    One field of the index records of a segment as a sequence, so that it can be searched with `bisect`
+    """
+
+    def __init__(self, segment: _Segment, field: int) -> None:
+        self._segment = segment
+        self._field = field
+
+    def __len__(self) -> int:
+        return self._segment.count
+
+    def __getitem__(self, index: int) -> t.Union[float, int]:
+        return self._segment.record(index)[self._field]
+
+
+class ReceiveJournal:
+    """An append-only journal of everything received, kept on disk.
+
+    Every item added to the receive queue is also written to the journal with its
+    sequence number and timestamp, so data that is removed from the receive queue
+    (because `queue_size` is exceeded or the serial port disconnected) can still be read.
+    The journal is stored in `directory` as segments of about `segment_size` bytes each.
+    Each segment is a data file with the received bytes joined together and an index
+    file with the timestamp, sequence number, and position of each item.
+
+    Files are read with `mmap`, so the data is only in memory while it is being read,
+    and items are found by sequence number or timestamp with a binary search of the index.
+    If the journal already has items (for example, from before the program was restarted),
+    then the receive queue continues from the last sequence number in the journal.
+
+    ```py
+    conn = Connection(115200, "/dev/ttyUSB0", journal=ReceiveJournal("./serial-journal"))
+    ```
+
+    A journal can only be used by one connection at a time.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = JOURNAL_SEGMENT_SIZE,
+        max_size: t.Optional[int] = None,
+    ) -> None:
+        """Constructor for receive journal object.
+
+        Opens the journal in `directory`, creating the directory if it does not exist.
+
+        Args:
+            directory (str): The directory to keep the journal in.
+            segment_size (int, optional): The size, in bytes, of received data after which a new segment is started. Defaults to 16 MiB.
+            max_size (int, None, optional): The maximum total size, in bytes, of the journal on disk. \
+            When it is exceeded, the oldest segments are deleted (the segment being written to is always kept). \
+            If None, nothing is deleted. Defaults to None.
+
+        Raises:
+            ValueError: If `segment_size` or `max_size` is not positive.
+        """
+
+        if segment_size <= 0:
+            raise ValueError("segment_size must be positive")
+
+        if max_size is not None and max_size <= 0:
+            raise ValueError("max_size must be positive")
+
+        self._directory = directory
+        self._segment_size = segment_size
+        self._max_size = max_size
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._segments: t.List[_Segment] = []
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".idx"):
+                continue
+
+            segment = _Segment(directory, int(name[:-4]))
+            if not os.path.exists(segment.dat_path):
+                open(segment.dat_path, "wb").close()
+
+            segment.load()
+
+            if self._segments and self._segments[-1].count == 0:
+                # empty segment that is not the most recent one
+                self._delete(self._segments.pop())
+
+            self._segments.append(segment)
+
+        # for binary searching the segments
+        self._first_seqs = [s.first_seq for s in self._segments]
+        self._first_tss = [s.first_ts for s in self._segments]
+
+        self._dat_file: t.Optional[t.BinaryIO] = None
+        self._idx_file: t.Optional[t.BinaryIO] = None
+
+    def __len__(self) -> int:
+        """
+        Returns the number of items in the journal.
+        """
+
+        with self._lock:
+            return sum(s.count for s in self._segments)
+
+    def __repr__(self) -> str:
+        """
+        String representation of journal.
+        """
+
+        return f"ReceiveJournal<directory={self._directory!r}, first_seq={self.first_seq}, last_seq={self.last_seq}>"
+
+    @property
+    def directory(self) -> str:
+        """
+        The directory that the journal is kept in.
+        """
+
+        return self._directory
+
+    @property
+    def first_seq(self) -> int:
+        """
+        The sequence number of the oldest item in the journal.
+
+        If the journal is empty, this is `last_seq + 1`.
+        """
+
+        with self._lock:
+            for segment in self._segments:
+                if segment.count > 0:
+                    return segment.first_seq
+
+            return self.last_seq + 1
+
+    @property
+    def last_seq(self) -> int:
+        """
+        The sequence number of the most recent item in the journal, or 0 if it is empty.
+        """
+
+        with self._lock:
+            for segment in reversed(self._segments):
+                if segment.count > 0:
+                    return segment.last_seq
+
+            return 0
+
+    @property
+    def disk_size(self) -> int:
+        """
+        The total size, in bytes, of the journal's files.
+        """
+
+        with self._lock:
+            return sum(s.size + s.count * INDEX_RECORD.size for s in self._segments)
+
+    def append(self, *items: t.Tuple[int, float, bytes]) -> None:
+        """Adds items to the journal.
+
+        Called by the receive queue whenever it receives items; do not call directly.
+
+        Args:
+            *items (Tuple[int, float, bytes]): `(seq, timestamp, bytes)` for each item. \
+            Sequence numbers must be greater than `last_seq`.
+        """
+
+        with self._lock:
+            data = bytearray()
+            index = bytearray()
+
+            for seq, timestamp, rcv in items:
+                segment = self._writable_segment(seq)
+
+                if segment.count == 0:
+                    segment.first_ts = timestamp
+                    self._first_tss[-1] = timestamp
+
+                index += INDEX_RECORD.pack(timestamp, seq, segment.size, len(rcv))
+                data += rcv
+
+                segment.count += 1
+                segment.size += len(rcv)
+                segment.last_seq = seq
+
+                if segment.size >= self._segment_size:
+                    # write what this segment has, then start a new one next time
+                    self._write(data, index)
+                    data, index = bytearray(), bytearray()
+                    self._close_files()
+
+            self._write(data, index)
+            self._remove_old_segments()
+
+    def get_seq(self, seq: int) -> t.Optional[t.Tuple[float, bytes]]:
+        """Returns the item with sequence number `seq`.
+
+        Args:
+            seq (int): The sequence number.
+
+        Returns:
+            Union[Tuple[float, bytes], None]: A tuple indicating the timestamp received and bytes object received, \
+                or None if it is not in the journal.
+        """
+
+        with self._lock:
+            pos = self._find_seq(seq)
+            if pos is None:
+                return None
+
+            segment, index = pos
+            if index >= segment.count:
+                return None
+
+            found_seq, timestamp, rcv = segment.item(index)
+            return (timestamp, rcv) if found_seq == seq else None
+
+    def seq_at_time(self, timestamp: float) -> int:
+        """Finds the first item received at or after `timestamp`.
+
+        Args:
+            timestamp (float): The time (from `time.time()`).
+
+        Returns:
+            int: The sequence number of the first item received at or after `timestamp`, \
+                or `last_seq + 1` if there is none.
+        """
+
+        with self._lock:
+            i = max(bisect.bisect_right(self._first_tss, timestamp) - 1, 0)
+
+            for segment in self._segments[i:]:
+                index = bisect.bisect_left(_Column(segment, 0), timestamp)
+                if index < segment.count:
+                    return segment.record(index)[1]
+
+            return self.last_seq + 1
+
+    def entries(
+        self,
+        start_seq: t.Optional[int] = None,
+        end_seq: t.Optional[int] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[t.Tuple[int, float, bytes]]:
+        """Returns the items with sequence numbers from `start_seq` to `end_seq`.
+
+        Args:
+            start_seq (int, None, optional): The sequence number of the first item, inclusive. \
+            If None, starts from the oldest item. Defaults to None.
+            end_seq (int, None, optional): The sequence number of the last item, inclusive. \
+            If None, ends at the most recent item. Defaults to None.
+            limit (int, None, optional): The maximum number of items to return. If None, there is no limit. Defaults to None.
+
+        Returns:
+            List[Tuple[int, float, bytes]]: A list of tuples indicating the sequence number, timestamp received, \
+                and bytes object received, oldest first.
+        """
+
+        ret: t.List[t.Tuple[int, float, bytes]] = []
+        seq = self.first_seq if start_seq is None else start_seq
+
+        while limit is None or len(ret) < limit:
+            count = JOURNAL_READ_CHUNK
+            if limit is not None:
+                count = min(count, limit - len(ret))
+
+            # the lock is released between chunks, so that items can be added meanwhile
+            with self._lock:
+                chunk = self._entries(seq, end_seq, count)
+
+            ret.extend(chunk)
+            if len(chunk) < count:
+                break
+
+            seq = chunk[-1][0] + 1
+
+        return ret
+
+    def close(self) -> None:
+        """
+        Closes the journal's files. Items added afterwards open them again.
+        """
+
+        with self._lock:
+            self._close_files()
+
+            for segment in self._segments:
+                segment.close()
+
+    def _entries(
+        self, start_seq: int, end_seq: t.Optional[int], count: int
+    ) -> t.List[t.Tuple[int, float, bytes]]:
+        """
+        Returns up to `count` items with sequence numbers from `start_seq` to `end_seq`
+        """
+
+        ret: t.List[t.Tuple[int, float, bytes]] = []
+
+        pos = self._find_seq(start_seq)
+        if pos is None:
+            return ret
+
+        segment, index = pos
+        for segment in self._segments[self._segments.index(segment) :]:
+            while index < segment.count:
+                if len(ret) >= count:
+                    return ret
+
+                item = segment.item(index)
+                if end_seq is not None and item[0] > end_seq:
+                    return ret
+
+                ret.append(item)
+                index += 1
+
+            index = 0
+
+        return ret
+
+    def _find_seq(self, seq: int) -> t.Optional[t.Tuple[_Segment, int]]:
+        """
+        Returns the segment and index in it of the first item with a sequence number of at least `seq`
+        """
+
+        if not self._segments:
+            return None
+
+        i = max(bisect.bisect_right(self._first_seqs, seq) - 1, 0)
+        segment = self._segments[i]
+        index = bisect.bisect_left(_Column(segment, 1), seq)
+
+        if index >= segment.count and i + 1 < len(self._segments):
+            return self._segments[i + 1], 0
+
+        return segment, index
+
+    def _writable_segment(self, seq: int) -> _Segment:
+        """
+        Returns the segment to add the item with sequence number `seq` to, starting a new one if needed
+        """
+
+        if self._dat_file is not None:
+            # files are closed as soon as a segment is full
+            return self._segments[-1]
+
+        if self._segments and self._segments[-1].size < self._segment_size:
+            # continue the most recent segment (for example, after reopening the journal)
+            segment = self._segments[-1]
+        else:
+            segment = _Segment(self._directory, seq)
+            self._segments.append(segment)
+            self._first_seqs.append(seq)
+            self._first_tss.append(0.0)
+
+        for path in (segment.dat_path, segment.idx_path):
+            # create if needed
+            open(path, "ab").close()
+
+        # opened for writing at the end of the items, since the files are preallocated
+        self._dat_file = open(segment.dat_path, "r+b")
+        self._dat_file.seek(segment.size)
+        self._idx_file = open(segment.idx_path, "r+b")
+        self._idx_file.seek(segment.count * INDEX_RECORD.size)
+
+        return segment
+
+    def _write(self, data: bytearray, index: bytearray) -> None:
+        """
+        Writes to the files of the segment being written to; data first so that the index never points past it
+        """
+
+        if self._dat_file is None or self._idx_file is None:
+            return
+
+        # a data file does not need more than a segment's worth of space
+        self._preallocate(self._dat_file, len(data), self._segment_size)
+        self._dat_file.write(data)
+        self._dat_file.flush()
+        self._preallocate(self._idx_file, len(index))
+        self._idx_file.write(index)
+        self._idx_file.flush()
+
+    def _preallocate(
+        self, f: t.BinaryIO, length: int, limit: t.Optional[int] = None
+    ) -> None:
+        """
+        Grows a file of the segment being written to so that `length` more bytes fit at its position,
+        doubling its size (starting from `JOURNAL_PREALLOCATE`, up to `limit`) instead of growing it by each write
+        """
+
+        needed = f.tell() + length
+        size = os.fstat(f.fileno()).st_size
+
+        if size < needed:
+            grown = max(2 * size, JOURNAL_PREALLOCATE)
+            if limit is not None:
+                grown = min(grown, limit)
+
+            f.truncate(max(needed, grown))
+
+    def _close_files(self) -> None:
+        """
+        Closes the files of the segment being written to, removing the space that was preallocated but not used
+        """
+
+        if self._dat_file is None or self._idx_file is None:
+            return
+
+        segment = self._segments[-1]
+
+        # memory maps cannot be longer than their files
+        segment.close()
+
+        self._dat_file.truncate(segment.size)
+        self._idx_file.truncate(segment.count * INDEX_RECORD.size)
+
+        for f in (self._dat_file, self._idx_file):
+            f.close()
+
+        self._dat_file = self._idx_file = None
+
+    def _remove_old_segments(self) -> None:
+        """
+        Deletes the oldest segments while the journal is larger than `max_size`
+        """
+
+        if self._max_size is None:
+            return
+
+        while len(self._segments) > 1 and self.disk_size > self._max_size:
+            self._delete(self._segments.pop(0))
+            self._first_seqs.pop(0)
+            self._first_tss.pop(0)
+
+    def _delete(self, segment: _Segment) -> None:
+        """
+        Deletes the files of a segment
+        """
+
+        segment.close()
+
+        for path in (segment.dat_path, segment.idx_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contains macros, which are named sequences of steps that send to and wait for responses from the serial port.
+
+Register macros with `ConnectionRoutes.add_macro()` and run them with the V1
+`/macros/<name>` endpoint, so that a whole sequence runs on the server next to the
+serial port instead of taking an HTTP round trip for each step.
+"""
+
+import re
+import string
+import time
+import typing as t
+
+from .connection import Connection
+
+
+class MacroStep:
+    """One step of a `Macro`: sends something, waits for a response, or both.
+
+    `send` is a template that is filled in with the parameters of the macro using
+    `str.format()` syntax, for example `"RATE {rate}"`. Use `{{` and `}}` for literal braces.
+    `expect` is a regular expression; the step waits for a received object that contains
+    a match (after it is decoded and stripped), and the groups of the match are returned.
+    Only objects received after the step started are checked.
+    """
+
+    def __init__(
+        self,
+        send: t.Optional[str] = None,
+        expect: t.Optional[str] = None,
+        timeout: t.Optional[float] = None,
+        ending: str = "\r\n",
+    ) -> None:
+        """Constructor for macro steps.
+
+        Args:
+            send (str, None, optional): The template of the data to send. If None, nothing is sent. Defaults to None.
+            expect (str, None, optional): The regular expression that a response has to match. \
+            If None, the step does not wait for a response. Defaults to None.
+            timeout (float, None, optional): The longest time, in seconds, that the step takes, including \
+            waiting for the send interval. If None, uses the `timeout` of the connection. Defaults to None.
+            ending (str, optional): The ending added to the sent data. Defaults to "\\r\\n".
+
+        Raises:
+            ValueError: If both `send` and `expect` are None, `timeout` is negative, `send` has \
+            fields that are not names, or `expect` is not a valid regular expression.
+        """
+
+        if send is None and expect is None:
+            raise ValueError("a step has to send or expect something")
+
+        if timeout is not None and timeout < 0:
+            raise ValueError("timeout must be nonnegative")
+
+        self._send = send
+        self._timeout = timeout
+        self._ending = ending
+        self._params: t.Set[str] = set()
+
+        if send is not None:
+            for _, field, _, _ in string.Formatter().parse(send):
+                if field is None:
+                    continue
+
+                # only plain names, so parameters cannot read attributes or indexes
+                if not field.isidentifier():
+                    raise ValueError(f"invalid parameter in send template: {field!r}")
+
+                self._params.add(field)
+
+        try:
+            self._expect = re.compile(expect) if expect is not None else None
+        except re.error as e:
+            raise ValueError(f"invalid regular expression: {e}") from None
+
+    def __repr__(self) -> str:
+        """
+        String representation of macro step.
+        """
+
+        expect = None if self._expect is None else self._expect.pattern
+        return f"MacroStep<send={self._send!r}, expect={expect!r}, timeout={self._timeout}>"
+
+    @property
+    def params(self) -> t.Set[str]:
+        """
+        The names of the parameters used by `send`.
+        """
+
+        return set(self._params)
+
+    def run(
+        self, conn: Connection, params: t.Mapping[str, t.Any]
+    ) -> t.Dict[str, t.Any]:
+        """Runs the step.
+
+        Args:
+            conn (Connection): The connection to send to and receive from.
+            params (Mapping[str, Any]): The values of the parameters.
+
+        Raises:
+            ConnectException: If serial port not connected.
+            KeyError: If a parameter used by `send` is not in `params`.
+
+        Returns:
+            Dict[str, Any]: `message` (`OK`, `Failed to send`, or `Nothing received`), \
+                `sent` (the data sent, or None), and if `expect` was given and matched, \
+                `data` (the received string) and `groups` (the groups of the match).
+        """
+
+        deadline = time.time() + (
+            conn.timeout if self._timeout is None else self._timeout
+        )
+
+        # responses to what is sent have larger sequence numbers than this
+        cursor = conn.snapshot().last_seq
+
+        sent = None
+        if self._send is not None:
+            sent = self._send.format_map(params)
+
+            dispatch_at = conn.queue_bytes(
+                (sent + self._ending).encode("utf-8"), max(deadline - time.time(), 0)
+            )
+            if dispatch_at is None:
+                return {"message": "Failed to send", "sent": sent}
+
+        if self._expect is None:
+            return {"message": "OK", "sent": sent}
+
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return {"message": "Nothing received", "sent": sent}
+
+            cursor, rcv = conn.receive_next(cursor, wait=remaining)
+
+            for _, _, data in rcv:
+                res = conn.conv_bytes_to_str(data) or ""
+                match = self._expect.search(res)
+
+                if match is not None:
+                    return {
+                        "message": "OK",
+                        "sent": sent,
+                        "data": res,
+                        "groups": list(match.groups()),
+                    }
+
+
+class Macro:
+    """A named sequence of steps, run one after another on the server.
+
+    ```py
+    init = Macro(
+        MacroStep(send="MODE {mode}", expect="^OK$", timeout=1),
+        MacroStep(send="RATE {rate}", expect="^OK$", timeout=1),
+        MacroStep(send="READ TEMP", expect=r"^TEMP (\\S+)$", timeout=2),
+    )
+    routes.add_macro("init", init)
+    ```
+
+    The steps stop at the first one that fails (its send was not accepted or its
+    expected response was not received within its timeout).
+    """
+
+    def __init__(self, *steps: MacroStep, description: str = "") -> None:
+        """Constructor for macros.
+
+        Args:
+            *steps (MacroStep): The steps, in order. Must have at least one.
+            description (str, optional): What the macro does. Defaults to "".
+
+        Raises:
+            TypeError: If a step is not a `MacroStep`.
+            ValueError: If there are no steps.
+        """
+
+        if not steps:
+            raise ValueError("a macro has to have at least one step")
+
+        for step in steps:
+            if not isinstance(step, MacroStep):
+                raise TypeError("steps must be MacroStep objects")
+
+        self._steps = steps
+        self._description = description
+
+    def __repr__(self) -> str:
+        """
+        String representation of macro.
+        """
+
+        return f"Macro<params={sorted(self.params)}>{list(self._steps)}"
+
+    @property
+    def steps(self) -> t.Tuple[MacroStep, ...]:
+        """
+        The steps of the macro.
+        """
+
+        return self._steps
+
+    @property
+    def description(self) -> str:
+        """
+        What the macro does.
+        """
+
+        return self._description
+
+    @property
+    def params(self) -> t.Set[str]:
+        """
+        The names of all parameters used by the steps.
+        """
+
+        return set().union(*(step.params for step in self._steps))
+
+    def run(
+        self, conn: Connection, params: t.Optional[t.Mapping[str, t.Any]] = None
+    ) -> t.List[t.Dict[str, t.Any]]:
+        """Runs the steps in order, stopping at the first one that fails.
+
+        Args:
+            conn (Connection): The connection to send to and receive from.
+            params (Mapping[str, Any], None, optional): The values of the parameters. Defaults to None.
+
+        Raises:
+            ConnectException: If serial port not connected.
+            TypeError: If `conn` is not a `Connection`.
+            ValueError: If a parameter is missing.
+
+        Returns:
+            List[Dict[str, Any]]: The results of the steps that ran (see `MacroStep.run()`).
+        """
+
+        if not isinstance(conn, Connection):
+            raise TypeError("conn must be a Connection")
+
+        params = {} if params is None else params
+
+        missing = self.params - set(params)
+        if missing:
+            raise ValueError(f"missing parameters: {', '.join(sorted(missing))}")
+
+        results = []
+
+        for step in self._steps:
+            res = step.run(conn, params)
+            results.append(res)
+
+            if res["message"] != "OK":
+                break
+
+        return results
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contains poll jobs, which send a command every so often and cache the latest response.
+
+Many clients asking for the same reading (for example, by each sending "READ TEMP"
+every second) multiply the traffic on the serial port by the number of clients.
+A `Poller` sends each command once per period instead, and clients read the cached
+response, for example from the V1 `/polls/<name>` endpoint, without using the serial port.
+"""
+
+import threading
+import time
+import typing as t
+
+from .base_connection import ConnectException
+from .connection import Connection
+from .macro import MacroStep
+from .tools import LockQueueFullException, ReadWriteLock
+
+
+class PollJob:
+    """A command that is sent every `interval` seconds, with the latest response cached.
+
+    The response is the first object received after the command was sent that
+    contains a match of the regular expression `expect`; by default, any object.
+    """
+
+    def __init__(
+        self,
+        command: str,
+        interval: float,
+        expect: str = "",
+        timeout: t.Optional[float] = None,
+        ending: str = "\r\n",
+    ) -> None:
+        """Constructor for poll jobs.
+
+        Args:
+            command (str): The data to send.
+            interval (float): The time, in seconds, between sending the command.
+            expect (str, optional): The regular expression that the response has to match. Defaults to "", which matches anything.
+            timeout (float, None, optional): The longest time, in seconds, to wait for the response. \
+            If None, uses a quarter of `interval`, so that a device that stops answering does not keep \
+            the serial port busy for most of the time. Defaults to None.
+            ending (str, optional): The ending added to the command. Defaults to "\\r\\n".
+
+        Raises:
+            ValueError: If `interval` is not positive, `timeout` is negative, or `expect` is not a valid regular expression.
+        """
+
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        # braces are doubled so that the command is not treated as a template
+        self._step = MacroStep(
+            send=command.replace("{", "{{").replace("}", "}}"),
+            expect=expect,
+            timeout=interval / 4 if timeout is None else timeout,
+            ending=ending,
+        )
+
+        self._command = command
+        self._interval = interval
+        self._latest: t.Optional[t.Dict[str, t.Any]] = None
+        self._failures = 0
+        self._skipped = 0
+
+    def __repr__(self) -> str:
+        """
+        String representation of poll job.
+        """
+
+        return f"PollJob<command={self._command!r}, interval={self._interval}>"
+
+    @property
+    def command(self) -> str:
+        """
+        The data that is sent.
+        """
+
+        return self._command
+
+    @property
+    def interval(self) -> float:
+        """
+        The time, in seconds, between sending the command.
+        """
+
+        return self._interval
+
+    @property
+    def latest(self) -> t.Optional[t.Dict[str, t.Any]]:
+        """
+        The latest response, as a dictionary with `data` (the received string), `groups`
+        (the groups of the match of `expect`), and `timestamp` (when the command was sent),
+        or None if there has not been a response yet.
+        """
+
+        return self._latest
+
+    @property
+    def failures(self) -> int:
+        """
+        The number of times in a row that there was no response, since the latest response.
+        """
+
+        return self._failures
+
+    @property
+    def skipped(self) -> int:
+        """
+        The number of periods where the command was not sent because the connection was
+        disconnected or used by something else for the whole period.
+        """
+
+        return self._skipped
+
+    def poll(self, conn: Connection) -> bool:
+        """Sends the command once and waits for the response, caching it.
+
+        Args:
+            conn (Connection): The connection to send to and receive from.
+
+        Raises:
+            ConnectException: If serial port not connected.
+
+        Returns:
+            bool: True if there was a response, False otherwise.
+        """
+
+        sent_at = time.time()
+        res = self._step.run(conn, {})
+
+        if res["message"] != "OK":
+            self._failures += 1
+            return False
+
+        # replaced as a whole, so readers never see half of an update
+        self._latest = {
+            "data": res["data"],
+            "groups": res["groups"],
+            "timestamp": sent_at,
+        }
+        self._failures = 0
+
+        return True
+
+    def skip(self) -> None:
+        """
+        Counts a period where the command was not sent (see `skipped`).
+        """
+
+        self._skipped += 1
+
+
+class Poller:
+    """Runs poll jobs on a `Connection` in one thread.
+
+    ```py
+    poller = Poller(conn)
+    poller.add("temp", PollJob("READ TEMP", 1))
+    poller.start()
+    ...
+    poller.jobs["temp"].latest  # {"data": ..., "groups": [...], "timestamp": ...}
+    ```
+
+    If `lock` is given, each poll holds it exclusively, so a poll never runs in between
+    the steps of something else that holds it. `ConnectionRoutes` passes its own lock,
+    so polls do not mix with endpoints that use the serial port. Polls that give up
+    waiting for the lock are not counted in its `rejected` and `timed_out` statistics.
+    Jobs are run one at a time, each as close to once per its interval as the other jobs allow.
+    """
+
+    def __init__(
+        self, conn: Connection, lock: t.Optional[ReadWriteLock] = None
+    ) -> None:
+        """Constructor for pollers.
+
+        Args:
+            conn (Connection): The connection to poll.
+            lock (ReadWriteLock, None, optional): A lock held exclusively during each poll. Defaults to None.
+
+        Raises:
+            TypeError: If `conn` is not a `Connection` or `lock` is not a `ReadWriteLock`.
+        """
+
+        if not isinstance(conn, Connection):
+            raise TypeError("conn must be a Connection")
+
+        if lock is not None and not isinstance(lock, ReadWriteLock):
+            raise TypeError("lock must be a ReadWriteLock")
+
+        self._conn = conn
+        self._lock = lock
+        self._jobs: t.Dict[str, PollJob] = dict()
+        self._stop = threading.Event()
+        self._thread: t.Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        """
+        String representation of poller.
+        """
+
+        return f"Poller<jobs={self._jobs}>{{Connection={self._conn}}}"
+
+    @property
+    def jobs(self) -> t.Dict[str, PollJob]:
+        """
+        Returns a dictionary of job names mapped to jobs.
+        """
+
+        return self._jobs
+
+    @property
+    def running(self) -> bool:
+        """
+        If the polling thread is running.
+        """
+
+        return self._thread is not None
+
+    def add(self, name: str, job: PollJob) -> None:
+        """Adds a job. Jobs can be added while the poller is running.
+
+        Args:
+            name (str): The name of the job.
+            job (PollJob): The job.
+
+        Raises:
+            TypeError: If `job` is not a `PollJob`.
+            ValueError: If a job with the same name was already added.
+        """
+
+        if not isinstance(job, PollJob):
+            raise TypeError("job must be a PollJob")
+
+        if name in self._jobs:
+            raise ValueError(f'Poll job "{name}" already exists')
+
+        self._jobs[name] = job
+
+    def start(self) -> None:
+        """Starts polling in a new thread.
+
+        Raises:
+            RuntimeError: If the poller was already started.
+        """
+
+        if self._thread is not None:
+            raise RuntimeError("poller already started")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops polling, waiting for a poll that is running to finish.
+        """
+
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        """
+        Runs the job that is due next until stopped
+        """
+
+        next_at: t.Dict[str, float] = dict()
+
+        while not self._stop.is_set():
+            now = time.time()
+
+            # copied, since jobs can be added from other threads
+            for name in list(self._jobs):
+                # new jobs run right away
+                next_at.setdefault(name, now)
+
+            if not next_at:
+                self._stop.wait(0.1)
+                continue
+
+            name = min(next_at, key=lambda n: next_at[n])
+            if next_at[name] > now:
+                self._stop.wait(next_at[name] - now)
+                continue
+
+            job = self._jobs[name]
+            self._poll(job)
+
+            # once per interval; a late poll moves the schedule instead of running twice to catch up
+            next_at[name] = max(next_at[name] + job.interval, time.time())
+
+    def _poll(self, job: PollJob) -> None:
+        """
+        Polls once, skipping the period if the connection cannot be used during it
+        """
+
+        if not self._conn.connected:
+            job.skip()
+            return
+
+        if self._lock is not None:
+            try:
+                acquired = self._lock.acquire(timeout=job.interval, count=False)
+            except LockQueueFullException:
+                acquired = False
+
+            if not acquired:
+                job.skip()
+                return
+
+        try:
+            job.poll(self._conn)
+        except ConnectException:
+            job.skip()
+        finally:
+            if self._lock is not None:
+                self._lock.release()
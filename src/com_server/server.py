@@ -15,11 +15,24 @@ import waitress
 from flask import Flask
 from flask_restful import Api, abort
 
-from .api_server import ConnectionResource
+from .api_server import ConnectionResource, acquire_or_abort
 from .base_connection import ConnectException
 from .connection import Connection
-from .constants import SUPPORTED_HTTP_METHODS
+from .constants import (
+    ACCESS_EXCLUSIVE,
+    ACCESS_SHARED,
+    ACCESS_UNLOCKED,
+    ROUTE_MAX_STREAMS,
+    ROUTE_MAX_WAIT,
+    ROUTE_MAX_WAITING,
+    SERVER_SPARE_THREADS,
+    SUPPORTED_HTTP_METHODS,
+)
 from .disconnect import MultiReconnector
+from .macro import Macro
+from .poll import Poller, PollJob
+from .tools import ReadWriteLock
+from .websocket import WebSocketServer
 
 
 class DuplicatePortException(Exception):
@@ -37,13 +50,27 @@ class ConnectionRoutes:
     A thread will detect this event and will try to reconnect the serial port.
     Note that this will cause the send and receive queues to **reset**.
 
-    If a resource is accessed while it is being used by another process,
-    then it will respond with `503 Service Unavailable`.
+    Resources that only read share the connection, and resources that use the serial port
+    get it to themselves (see `ConnectionResource.access`). If a resource cannot get the
+    connection right away, the request waits in line, first come, first served, for up to
+    `max_wait` seconds before responding with `503 Service Unavailable`. If `max_waiting`
+    requests are already waiting, it responds with `503 Service Unavailable` and a
+    `Retry-After` header right away instead of joining the line.
+
+    Resources that stay open for a long time without the lock, such as the V1 `/stream`
+    and `/receive/next` endpoints, take one of `max_streams` slots with `open_stream()`
+    and respond with `503 Service Unavailable` when all of them are taken.
 
     More information on [Flask](https://flask.palletsprojects.com/en/2.0.x/) and [flask-restful](https://flask-restful.readthedocs.io/en/latest/).
     """
 
-    def __init__(self, conn: Connection) -> None:
+    def __init__(
+        self,
+        conn: Connection,
+        max_wait: float = ROUTE_MAX_WAIT,
+        max_waiting: t.Optional[int] = ROUTE_MAX_WAITING,
+        max_streams: int = ROUTE_MAX_STREAMS,
+    ) -> None:
         """Constructor
 
         There should only be one `ConnectionRoutes` object that wraps each `Connection` object.
@@ -54,15 +81,48 @@ class ConnectionRoutes:
 
         Args:
             conn (Connection): The `Connection` object the API is going to be associated with.
+            max_wait (float, optional): The longest time, in seconds, that a request waits for another \
+            resource to finish using the connection before responding with `503 Service Unavailable`. \
+            If 0, responds with 503 right away. Defaults to 10.
+            max_waiting (int, None, optional): The most requests that can wait for the connection at once; \
+            more requests respond with 503 right away. If None, there is no limit. Defaults to 16. \
+            Each waiting request takes a server thread; `start_app()` serves with enough threads for this limit.
+            max_streams (int, optional): The most streams and long polls that can be open at once; \
+            more respond with 503 right away. Each also takes a server thread. Defaults to 8.
+
+        Raises:
+            TypeError: If `conn` is not a `Connection`.
+            ValueError: If `max_wait`, `max_waiting`, or `max_streams` is negative.
         """
 
+        if not isinstance(conn, Connection):
+            raise TypeError("conn must be a Connection")
+
+        if max_wait < 0:
+            raise ValueError("max_wait must be nonnegative")
+
+        if max_streams < 0:
+            raise ValueError("max_streams must be nonnegative")
+
         self._conn = conn
+        self._max_wait = max_wait
+        self._max_streams = max_streams
+
+        # number of streams open right now
+        self._streams = 0
+        self._streams_lock = threading.Lock()
 
         # dictionary of all resource paths mapped to resource classes
         self._all_resources: t.Dict[str, t.Type[ConnectionResource]] = dict()
 
-        # for making sure only one thread is accessing Connection obj at a time
-        self._lock = threading.Lock()
+        # dictionary of macro names mapped to macros
+        self._macros: t.Dict[str, Macro] = dict()
+
+        # shared by resources that only read, held alone by resources that use the serial port
+        self._lock = ReadWriteLock(max_waiting)
+
+        # runs poll jobs, holding the lock like resources that use the serial port
+        self._poller = Poller(conn, self._lock)
 
     def __repr__(self) -> str:
         """Printing `ConnectionRoutes`"""
@@ -84,9 +144,11 @@ class ConnectionRoutes:
         attributes that can be used in the resource.
 
         Unlike a resource added using `Api.add_resource()`,
-        if a process accesses this resource while it is
-        currently being used by another process, then it will
-        respond with `503 Service Unavailable`.
+        the connection is locked while the resource runs, depending
+        on its `access`. If another process is using the connection,
+        then the request waits up to `max_wait` seconds and then
+        responds with `503 Service Unavailable`, or responds with
+        it right away if `max_waiting` requests are already waiting.
 
         Currently, supported methods are:
 
@@ -102,6 +164,10 @@ class ConnectionRoutes:
 
         Args:
             endpoint (str): The endpoint to the resource.
+
+        Raises:
+            TypeError: If the class does not extend `ConnectionResource`.
+            ValueError: If the `access` of the class is not one of `ACCESS_EXCLUSIVE`, `ACCESS_SHARED`, or `ACCESS_UNLOCKED`.
         """
 
         # outer wrapper
@@ -113,26 +179,41 @@ class ConnectionRoutes:
             if not issubclass(resource_cls, ConnectionResource):
                 raise TypeError("resource has to extend com_server.ConnectionResource")
 
+            if resource_cls.access not in (
+                ACCESS_EXCLUSIVE,
+                ACCESS_SHARED,
+                ACCESS_UNLOCKED,
+            ):
+                raise ValueError(
+                    "access has to be ACCESS_EXCLUSIVE, ACCESS_SHARED, or ACCESS_UNLOCKED"
+                )
+
             # assign connection obj
             resource_cls.conn = self._conn
+            resource_cls.routes = self
 
             # req methods; _self is needed as these will be part of class functions
             def _dec(func: t.Callable) -> t.Callable:
                 def _inner(_self, *args: t.Any, **kwargs: t.Any) -> t.Any:
-                    if self._lock.locked():
-                        # if another endpoint is currently being used
-                        abort(
-                            503,
-                            message="An endpoint is currently in use by another process.",
-                        )
-                    elif not _self.conn.connected:
-                        # if not connected
-                        abort(500, message="Serial port disconnected.")
-                    else:
-                        with self._lock:
-                            val = func(_self, *args, **kwargs)
-
-                    return val
+                    if _self.access == ACCESS_UNLOCKED:
+                        # does not need the lock
+                        if not _self.conn.connected:
+                            abort(500, message="Serial port disconnected.")
+
+                        return func(_self, *args, **kwargs)
+
+                    shared = _self.access == ACCESS_SHARED
+
+                    acquire_or_abort(self._lock, shared, self._max_wait)
+
+                    try:
+                        if not _self.conn.connected:
+                            # if not connected
+                            abort(500, message="Serial port disconnected.")
+
+                        return func(_self, *args, **kwargs)
+                    finally:
+                        self._lock.release(shared)
 
                 return _inner
 
@@ -148,6 +229,98 @@ class ConnectionRoutes:
 
         return _outer
 
+    def open_stream(self) -> None:
+        """Takes a slot for a request that stays open without the lock, such as a stream
+
+        Each open stream takes a server thread until it is closed with `close_stream()`,
+        so the number open at once is limited to `max_streams`.
+
+        Raises:
+            HTTPException: `503 Service Unavailable` if `max_streams` streams are already open.
+        """
+
+        with self._streams_lock:
+            if self._streams >= self._max_streams:
+                abort(503, message="Too many streams open.")
+
+            self._streams += 1
+
+    def close_stream(self) -> None:
+        """Gives back a slot taken with `open_stream()`"""
+
+        with self._streams_lock:
+            self._streams -= 1
+
+    def add_macro(self, name: str, macro: Macro) -> None:
+        """Adds a macro that can be run with the V1 `/macros/<name>` endpoint
+
+        Args:
+            name (str): The name of the macro.
+            macro (Macro): The macro.
+
+        Raises:
+            TypeError: If `macro` is not a `Macro`.
+            ValueError: If a macro with the same name was already added.
+        """
+
+        if not isinstance(macro, Macro):
+            raise TypeError("macro must be a Macro")
+
+        if name in self._macros:
+            raise ValueError(f'Macro "{name}" already exists')
+
+        self._macros[name] = macro
+
+    def add_poll(self, name: str, job: PollJob) -> None:
+        """Adds a poll job that can be read with the V1 `/polls/<name>` endpoint
+
+        Polling starts in `start_conns()` (or `start_app()`), or right away if it was already called.
+
+        Args:
+            name (str): The name of the job.
+            job (PollJob): The job.
+
+        Raises:
+            TypeError: If `job` is not a `PollJob`.
+            ValueError: If a job with the same name was already added.
+        """
+
+        self._poller.add(name, job)
+
+    @property
+    def polls(self) -> t.Dict[str, PollJob]:
+        """
+        Returns a dictionary of poll job names mapped to poll jobs.
+        """
+
+        return self._poller.jobs
+
+    @property
+    def macros(self) -> t.Dict[str, Macro]:
+        """
+        Returns a dictionary of macro names mapped to macros.
+        """
+
+        return self._macros
+
+    @property
+    def wait_stats(self) -> t.Dict[str, t.Optional[int]]:
+        """
+        Numbers about requests waiting for the connection: `waiting` (waiting right now),
+        `holders` (running right now), `max_waiting`, `rejected` (responded with 503
+        because too many were waiting), and `timed_out` (responded with 503 after `max_wait`).
+        Also includes `streams` (streams open right now) and `max_streams`.
+        """
+
+        with self._streams_lock:
+            streams = self._streams
+
+        return {
+            **self._lock.stats(),
+            "streams": streams,
+            "max_streams": self._max_streams,
+        }
+
     @property
     def all_resources(self) -> t.Dict[str, t.Type]:
         """
@@ -225,6 +398,11 @@ def start_conns(
     # start disconnect/reconnect thread
     reconnector.start()
 
+    # start polling; jobs added later are picked up by the running thread
+    for route in routes:
+        if not route._poller.running:
+            route._poller.start()
+
 
 def disconnect_conns(*routes: ConnectionRoutes) -> None:
     """Disconnects all `Connection` objects in provided `ConnectionRoutes` objects
@@ -239,6 +417,7 @@ def disconnect_conns(*routes: ConnectionRoutes) -> None:
     """
 
     for route in routes:
+        route._poller.stop()
         route._conn.disconnect()
 
     sys.exit()
@@ -252,6 +431,8 @@ def start_app(
     host: str = "0.0.0.0",
     port: int = 8080,
     cleanup: t.Optional[t.Callable] = None,
+    websocket_port: t.Optional[int] = None,
+    threads: t.Optional[int] = None,
     **kwargs: t.Any,
 ) -> None:
     """Starts a waitress production server that serves the app
@@ -279,8 +460,33 @@ def start_app(
         host (str, optional): The host of the server (e.g. 0.0.0.0 or 127.0.0.1). Defaults to "0.0.0.0".
         port (int, optional): The port to host the server on (e.g. 8080, 8000, 5000). Defaults to 8080.
         cleanup (Callable, optional): Cleanup function to be called after waitress is done serving app. Defaults to None.
+        websocket_port (int, None, optional): If given, also starts a `WebSocketServer` for the connection on this port. \
+        Only one `ConnectionRoutes` can be given if this is used. Defaults to None.
+        threads (int, None, optional): The number of threads that serve requests. Each waiting request and each \
+        open stream takes a thread, so this has to be at least the `max_waiting` plus the `max_streams` of every \
+        `ConnectionRoutes`, plus 4 for everything else. If None, it is exactly that. Defaults to None.
         **kwargs (Any): will be passed to `waitress.serve()`
+
+    Raises:
+        ValueError: If `websocket_port` is given with more than one `ConnectionRoutes`, \
+        or if `threads` is too few for the limits of the `ConnectionRoutes`.
     """
+
+    if websocket_port is not None and len(routes) != 1:
+        raise ValueError("websocket_port can only be used with one ConnectionRoutes")
+
+    # requests past these limits respond with 503 instead of taking a thread
+    needed = SERVER_SPARE_THREADS + sum(
+        (route._lock.max_waiting or 0) + route._max_streams for route in routes
+    )
+
+    if threads is None:
+        threads = needed
+    elif threads < needed:
+        raise ValueError(
+            f"threads must be at least {needed} for the max_waiting and max_streams of the routes"
+        )
+
     # initialize app by adding resources and staring connections and disconnect handlers
     add_resources(api, *routes)
 
@@ -288,8 +494,16 @@ def start_app(
     _logger = logging.getLogger("waitress")
     start_conns(_logger, *routes, logfile=logfile)
 
+    ws = None
+    if websocket_port is not None:
+        ws = WebSocketServer(routes[0]._conn, host, websocket_port)
+        ws.start()
+
     # serve on waitress
-    waitress.serve(app, host=host, port=port, **kwargs)
+    waitress.serve(app, host=host, port=port, threads=threads, **kwargs)
+
+    if ws is not None:
+        ws.shutdown()
 
     # call cleanup function
     if cleanup:
@@ -5,12 +5,19 @@
 Provides a set of functions that could be generally useful.
 """
 
+import array
+import bisect
+import collections
 import copy
+import threading
 import time
 import typing as t
 
 from serial.tools.list_ports import comports
 
+if t.TYPE_CHECKING:
+    from .journal import ReceiveJournal
+
 
 def all_ports(**kwargs: t.Any) -> t.Any:
     """Gets all ports from serial interface.
@@ -22,6 +29,33 @@ def all_ports(**kwargs: t.Any) -> t.Any:
     return comports(**kwargs)
 
 
+def wire_time(
+    size: int,
+    baud: int,
+    bytesize: int = 8,
+    parity: str = "N",
+    stopbits: float = 1,
+) -> float:
+    """Calculates how long it takes to send bytes through a serial port.
+
+    Each byte is sent as a start bit, `bytesize` data bits, a parity bit
+    (unless `parity` is "N"), and `stopbits` stop bits.
+
+    Args:
+        size (int): The number of bytes.
+        baud (int): The baud rate, in bits per second.
+        bytesize (int, optional): The number of data bits per byte. Defaults to 8.
+        parity (str, optional): The parity, using pyserial's constants ("N", "E", "O", "M", or "S"). Defaults to "N".
+        stopbits (float, optional): The number of stop bits (1, 1.5, or 2). Defaults to 1.
+
+    Returns:
+        float: The time, in seconds.
+    """
+
+    bits = 1 + bytesize + (0 if parity == "N" else 1) + stopbits
+    return size * bits / baud
+
+
 class SendQueue:
     """The send queue object
 
@@ -33,16 +67,25 @@ class SendQueue:
 
     Makes sure the user only reads and pops from send queue
     and does not directly add or delete anything from the queue.
+
+    Internally, this is a `collections.deque`, so `front()` and
+    `pop()` take constant time no matter how large the queue is.
     """
 
-    def __init__(self, send_queue: t.List[bytes]) -> None:
+    def __init__(self, send_queue: t.Iterable[bytes]) -> None:
         """Constructor for send queue object
 
         Args:
-            send_queue (List[bytes]): The list that will act as the send queue
+            send_queue (Iterable[bytes]): The items that the send queue starts with. \
+            If this is a `deque`, then it will be used as the send queue directly.
         """
 
-        self._send_queue = send_queue
+        self._send_queue: t.Deque[bytes]
+
+        if isinstance(send_queue, collections.deque):
+            self._send_queue = send_queue
+        else:
+            self._send_queue = collections.deque(send_queue)
 
     def __len__(self) -> int:
         """
@@ -56,7 +99,7 @@ class SendQueue:
         String representation of queue
         """
 
-        return f"SendQueue{self._send_queue}"
+        return f"SendQueue{list(self._send_queue)}"
 
     def front(self) -> bytes:
         """Returns the first element of the send queue
@@ -77,7 +120,7 @@ class SendQueue:
             IndexError: If length of send queue is 0
         """
 
-        self._send_queue.pop(0)
+        self._send_queue.popleft()
 
     def copy(self) -> t.List[bytes]:
         """Returns a shallow copy of the send queue list
@@ -91,7 +134,7 @@ class SendQueue:
             List[bytes]: A shallow copy of the send queue.
         """
 
-        return self._send_queue.copy()
+        return list(self._send_queue)
 
     def deepcopy(self) -> t.List[bytes]:
         """Returns a deepcopy of the send queue list
@@ -104,7 +147,963 @@ class SendQueue:
             List[bytes]: A deep copy of the send queue.
         """
 
-        return copy.deepcopy(self._send_queue)
+        return copy.deepcopy(list(self._send_queue))
+
+
+class TokenBucket:
+    """A token bucket.
+
+    Tokens are added at `rate` tokens per second, up to `capacity` tokens.
+    Taking tokens that are not there yet is allowed: the number of tokens becomes
+    negative, and later takers have to wait until it is refilled. This reserves
+    a time for every taker instead of turning them away.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Constructor for token bucket object. The bucket starts full.
+
+        Args:
+            rate (float): The number of tokens added per second.
+            capacity (float): The maximum number of tokens.
+
+        Raises:
+            ValueError: If `rate` or `capacity` is not positive.
+        """
+
+        if rate <= 0 or capacity <= 0:
+            raise ValueError("rate and capacity must be positive")
+
+        self._rate = float(rate)
+        self._capacity = float(capacity)
+        self._tokens = self._capacity
+        self._last: t.Optional[float] = None  # time of the last refill
+
+    def reset(self) -> None:
+        """
+        Fills the bucket.
+        """
+
+        self._tokens = self._capacity
+        self._last = None
+
+    def ready_at(self, amount: float, now: float) -> float:
+        """
+        Returns the time when `amount` tokens will be available, which is `now` if they are available now.
+        """
+
+        self._refill(now)
+
+        if self._tokens >= amount:
+            return now
+
+        return now + (amount - self._tokens) / self._rate
+
+    def take(self, amount: float, now: float) -> None:
+        """
+        Takes `amount` tokens at time `now`, even if there are not enough.
+        """
+
+        self._refill(now)
+        self._tokens -= amount
+
+    def _refill(self, now: float) -> None:
+        """
+        Adds the tokens for the time since the last refill
+        """
+
+        if self._last is None:
+            self._last = now
+        elif now > self._last:
+            self._tokens = min(
+                self._capacity, self._tokens + (now - self._last) * self._rate
+            )
+            self._last = now
+
+
+class SendRateLimiter:
+    """Limits how fast a connection sends by messages per second, bytes per second, or both.
+
+    Uses a token bucket for each limit. A burst of up to `message_burst` messages
+    (and `byte_burst` bytes) is sent right away, and the rest are held back and
+    sent at the given rates instead of being rejected.
+
+    ```py
+    # at most 20 messages per second, bursts of up to 5
+    conn = Connection(115200, "/dev/ttyUSB0", rate_limiter=SendRateLimiter(20, message_burst=5))
+    ```
+
+    A rate limiter keeps state, so each connection needs its own rate limiter object.
+    """
+
+    def __init__(
+        self,
+        messages_per_sec: t.Optional[float] = None,
+        bytes_per_sec: t.Optional[float] = None,
+        message_burst: float = 1,
+        byte_burst: t.Optional[float] = None,
+    ) -> None:
+        """Constructor for send rate limiter object.
+
+        Args:
+            messages_per_sec (float, None, optional): The number of messages that can be sent per second. \
+            If None, the number of messages is not limited. Defaults to None.
+            bytes_per_sec (float, None, optional): The number of bytes that can be sent per second. \
+            If None, the number of bytes is not limited. Defaults to None.
+            message_burst (float, optional): The number of messages that can be sent at once. Defaults to 1.
+            byte_burst (float, None, optional): The number of bytes that can be sent at once. \
+            If None, it is the same as `bytes_per_sec`. Defaults to None.
+
+        Raises:
+            ValueError: If both `messages_per_sec` and `bytes_per_sec` are None, or if any of the arguments are not positive.
+        """
+
+        if messages_per_sec is None and bytes_per_sec is None:
+            raise ValueError("messages_per_sec or bytes_per_sec must be given")
+
+        self._lock = threading.Lock()
+        self._buckets: t.List[t.Tuple[TokenBucket, bool]] = []  # (bucket, counts bytes)
+
+        if messages_per_sec is not None:
+            self._buckets.append((TokenBucket(messages_per_sec, message_burst), False))
+
+        if bytes_per_sec is not None:
+            byte_capacity = bytes_per_sec if byte_burst is None else byte_burst
+            self._buckets.append((TokenBucket(bytes_per_sec, byte_capacity), True))
+
+    def reserve(self, size: int, now: t.Optional[float] = None) -> float:
+        """Reserves a time to send a message.
+
+        Args:
+            size (int): The size of the message, in bytes.
+            now (float, None, optional): The current time. If None, uses `time.time()`. Defaults to None.
+
+        Returns:
+            float: The time when the message can be sent (from `time.time()`), which is `now` if it can be sent right away.
+        """
+
+        if now is None:
+            now = time.time()
+
+        with self._lock:
+            # send when every bucket has enough, then take from all of them
+            dispatch_at = max(
+                bucket.ready_at(size if is_bytes else 1, now)
+                for bucket, is_bytes in self._buckets
+            )
+
+            for bucket, is_bytes in self._buckets:
+                bucket.take(size if is_bytes else 1, now)
+
+            return dispatch_at
+
+    def reset(self) -> None:
+        """
+        Allows a full burst again. Called when the serial port is disconnected.
+        """
+
+        with self._lock:
+            for bucket, _ in self._buckets:
+                bucket.reset()
+
+
+class LockQueueFullException(Exception):
+    """
+    Raised by `ReadWriteLock.acquire()` when too many threads are already waiting.
+    """
+
+    pass
+
+
+class _Waiter:
+    """
+    A thread waiting for a `ReadWriteLock`; compared by identity
+    """
+
+    __slots__ = ("shared",)
+
+    def __init__(self, shared: bool) -> None:
+        self.shared = shared
+
+
+class ReadWriteLock:
+    """A reader/writer lock that is acquired in the order threads ask for it.
+
+    Any number of threads can hold it shared at once, or one thread can hold it exclusively.
+    Threads wait in one first-in, first-out queue: a thread asking for shared access waits
+    behind any thread that asked for exclusive access before it, so a steady stream of shared
+    requests cannot keep an exclusive request waiting forever, and the other way around.
+    Consecutive shared requests at the front of the queue all get the lock together.
+
+    If `max_waiting` is given, the queue is bounded: a thread that would have to wait
+    while `max_waiting` threads are already waiting raises `LockQueueFullException`
+    instead of joining the queue.
+    """
+
+    def __init__(self, max_waiting: t.Optional[int] = None) -> None:
+        """Constructor
+
+        Args:
+            max_waiting (int, None, optional): The most threads that can wait for the lock at once. \
+            If None, there is no limit. Defaults to None.
+
+        Raises:
+            ValueError: If `max_waiting` is negative.
+        """
+
+        if max_waiting is not None and max_waiting < 0:
+            raise ValueError("max_waiting must be nonnegative")
+
+        self._max_waiting = max_waiting
+        self._cond = threading.Condition(threading.Lock())
+        self._queue: t.Deque[_Waiter] = collections.deque()
+        self._readers = 0  # number of threads holding it shared
+        self._writer = False  # if a thread holds it exclusively
+
+        # counters for monitoring
+        self._rejected = 0
+        self._timed_out = 0
+
+    @property
+    def max_waiting(self) -> t.Optional[int]:
+        """
+        The most threads that can wait for the lock at once, or None if there is no limit.
+        """
+
+        return self._max_waiting
+
+    @property
+    def waiting(self) -> int:
+        """
+        The number of threads waiting for the lock.
+        """
+
+        return len(self._queue)
+
+    @property
+    def holders(self) -> int:
+        """
+        The number of threads holding the lock.
+        """
+
+        return 1 if self._writer else self._readers
+
+    @property
+    def rejected(self) -> int:
+        """
+        The number of times `acquire()` raised `LockQueueFullException`.
+        """
+
+        return self._rejected
+
+    @property
+    def timed_out(self) -> int:
+        """
+        The number of times `acquire()` returned False because its timeout was reached.
+        """
+
+        return self._timed_out
+
+    def stats(self) -> t.Dict[str, t.Optional[int]]:
+        """Returns the numbers used for monitoring the lock.
+
+        Returns:
+            Dict[str, Optional[int]]: `waiting`, `holders`, `max_waiting`, `rejected`, and `timed_out`, \
+            the same as the properties with those names.
+        """
+
+        with self._cond:
+            return {
+                "waiting": len(self._queue),
+                "holders": 1 if self._writer else self._readers,
+                "max_waiting": self._max_waiting,
+                "rejected": self._rejected,
+                "timed_out": self._timed_out,
+            }
+
+    def acquire(
+        self,
+        shared: bool = False,
+        timeout: t.Optional[float] = None,
+        count: bool = True,
+    ) -> bool:
+        """Waits for the lock.
+
+        Args:
+            shared (bool, optional): If True, waits for shared access. Otherwise, waits for exclusive access. Defaults to False.
+            timeout (float, None, optional): The longest time, in seconds, to wait. If None, waits forever. Defaults to None.
+            count (bool, optional): If False, a rejection or timeout is not counted in `rejected` and `timed_out`, \
+            for background work that gives up on purpose. Defaults to True.
+
+        Raises:
+            LockQueueFullException: If the lock cannot be acquired right away and `max_waiting` threads are already waiting.
+
+        Returns:
+            bool: True if the lock was acquired, False if `timeout` was reached first.
+        """
+
+        waiter = _Waiter(shared)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        with self._cond:
+            if (
+                self._max_waiting is not None
+                and len(self._queue) >= self._max_waiting
+                and not self._can_enter(waiter, waiting=False)
+            ):
+                if count:
+                    self._rejected += 1
+                raise LockQueueFullException("too many threads waiting for the lock")
+
+            self._queue.append(waiter)
+
+            while not self._can_enter(waiter):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._queue.remove(waiter)
+                    if count:
+                        self._timed_out += 1
+                    # threads behind this one may be able to go now
+                    self._cond.notify_all()
+                    return False
+
+                self._cond.wait(remaining)
+
+            self._queue.remove(waiter)
+
+            if shared:
+                self._readers += 1
+            else:
+                self._writer = True
+
+            # the next shared waiters may be able to go too
+            self._cond.notify_all()
+
+            return True
+
+    def release(self, shared: bool = False) -> None:
+        """Releases the lock.
+
+        Args:
+            shared (bool, optional): Must be the same as what was passed to `acquire()`. Defaults to False.
+        """
+
+        with self._cond:
+            if shared:
+                self._readers -= 1
+            else:
+                self._writer = False
+
+            self._cond.notify_all()
+
+    def _can_enter(self, waiter: _Waiter, waiting: bool = True) -> bool:
+        """
+        Checks if `waiter` is allowed to take the lock; if `waiting` is False, checks
+        if it could take it right away without joining the queue
+        """
+
+        if self._writer:
+            return False
+
+        if not waiting:
+            # has to be first in line, or behind only shared waiters if it is shared too
+            if not waiter.shared:
+                return self._readers == 0 and not self._queue
+
+            return all(other.shared for other in self._queue)
+
+        if not waiter.shared:
+            return self._readers == 0 and self._queue[0] is waiter
+
+        # only shared waiters in front of it
+        for other in self._queue:
+            if other is waiter:
+                return True
+            if not other.shared:
+                return False
+
+        return False
+
+
+class _ReceiveStore:
+    """
+    Append-only storage of received items. Timestamps are kept in an `array("d")`, and the
+    bytes objects are joined together in one `bytearray` with an `array("Q")` of where each
+    one ends, which takes much less memory than a `(float, bytes)` tuple for each item.
+    Items are never changed or removed once added, so views of them stay valid.
+    """
+
+    def __init__(self) -> None:
+        self.timestamps = array.array("d")
+        self.ends = array.array("Q")
+        self.data = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, data: bytes) -> None:
+        self.data += data
+        self.ends.append(len(self.data))
+        self.timestamps.append(timestamp)
+
+    def start(self, index: int) -> int:
+        """
+        Returns where the bytes object of the item at `index` starts in `data`
+        """
+
+        return self.ends[index - 1] if index > 0 else 0
+
+    def size(self, index: int) -> int:
+        """
+        Returns the size of the bytes object of the item at `index`
+        """
+
+        return self.ends[index] - self.start(index)
+
+    def item(self, index: int) -> t.Tuple[float, bytes]:
+        """
+        Returns the item at `index` as a `(timestamp, bytes)` tuple
+        """
+
+        return (
+            self.timestamps[index],
+            bytes(self.data[self.start(index) : self.ends[index]]),
+        )
+
+    def items(self, start: int, end: int) -> t.List[t.Tuple[float, bytes]]:
+        """
+        Returns the items from `start` to `end` (exclusive) as `(timestamp, bytes)` tuples
+        """
+
+        return [self.item(i) for i in range(start, end)]
+
+    def tail(self, start: int) -> "_ReceiveStore":
+        """
+        Returns a new store with the items from `start` onwards
+        """
+
+        base = self.start(start) if start < len(self) else len(self.data)
+
+        new = _ReceiveStore()
+        new.timestamps = self.timestamps[start:]
+        new.ends = array.array("Q", [end - base for end in self.ends[start:]])
+        new.data = self.data[base:]
+
+        return new
+
+
+class ReceiveSnapshot:
+    """A read-only view of the receive queue at one point in time.
+
+    Refers to the storage of the receive queue instead of copying it, so taking a snapshot
+    takes the same amount of time no matter how large the receive queue is. This is safe
+    because the receive queue never changes the part of its storage that a snapshot refers to:
+    new items are added after it, and removing old items or clearing the queue
+    makes the queue use new storage. `(timestamp, bytes)` tuples are created when items are accessed.
+
+    Supports `len()`, iteration, and indexing by position, where 0 is the oldest item.
+    Slicing with a step of 1 and `seq_range()` return another snapshot
+    without copying anything. Use `list()` to get a list of the items.
+    """
+
+    def __init__(
+        self,
+        store: _ReceiveStore,
+        start: int,
+        end: int,
+        first_seq: int,
+    ) -> None:
+        """Constructor for receive snapshot object.
+
+        Not meant to be called directly; use `Connection.snapshot()` instead.
+
+        Args:
+            store (_ReceiveStore): The storage that contains the items.
+            start (int): The index in `store` of the oldest item in the snapshot.
+            end (int): One more than the index in `store` of the most recent item in the snapshot.
+            first_seq (int): The sequence number of the oldest item in the snapshot.
+        """
+
+        self._store = store
+        self._start = start
+        self._end = max(start, end)
+        self._first_seq = first_seq
+
+    def __len__(self) -> int:
+        """
+        Returns the number of items in the snapshot.
+        """
+
+        return self._end - self._start
+
+    @t.overload
+    def __getitem__(self, index: int) -> t.Tuple[float, bytes]: ...
+
+    @t.overload
+    def __getitem__(
+        self, index: slice
+    ) -> t.Union["ReceiveSnapshot", t.List[t.Tuple[float, bytes]]]: ...
+
+    def __getitem__(
+        self, index: t.Union[int, slice]
+    ) -> t.Union[
+        t.Tuple[float, bytes], "ReceiveSnapshot", t.List[t.Tuple[float, bytes]]
+    ]:
+        """
+        Returns the item at `index`, where 0 is the oldest and -1 is the most recent item.
+
+        If `index` is a slice with a step of 1, then returns a snapshot of those items.
+        If it is a slice with any other step, then returns a list of those items.
+        """
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+
+            return ReceiveSnapshot(
+                self._store,
+                self._start + start,
+                self._start + stop,
+                self._first_seq + start,
+            )
+
+        size = len(self)
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError("receive snapshot index out of range")
+
+        return self._store.item(self._start + index)
+
+    def __iter__(self) -> t.Iterator[t.Tuple[float, bytes]]:
+        """
+        Iterates through the items, oldest first.
+        """
+
+        for i in range(self._start, self._end):
+            yield self._store.item(i)
+
+    def __repr__(self) -> str:
+        """
+        String representation of snapshot.
+        """
+
+        return f"ReceiveSnapshot{list(self)}"
+
+    @property
+    def first_seq(self) -> int:
+        """
+        The sequence number of the oldest item in the snapshot.
+
+        If the snapshot is empty, this is `last_seq + 1`.
+        """
+
+        return self._first_seq
+
+    @property
+    def last_seq(self) -> int:
+        """
+        The sequence number of the most recent item in the snapshot.
+        """
+
+        return self._first_seq + len(self) - 1
+
+    def get_seq(self, seq: int) -> t.Optional[t.Tuple[float, bytes]]:
+        """
+        Returns the item with sequence number `seq`, or None if it is not in the snapshot.
+        """
+
+        if seq < self._first_seq or seq > self.last_seq:
+            return None
+
+        return self._store.item(self._start + seq - self._first_seq)
+
+    def seq_range(
+        self, start_seq: t.Optional[int] = None, end_seq: t.Optional[int] = None
+    ) -> "ReceiveSnapshot":
+        """Returns a snapshot of the items with sequence numbers from `start_seq` to `end_seq`.
+
+        Args:
+            start_seq (int, None, optional): The sequence number of the first item, inclusive. \
+            If None, starts from the oldest item. Defaults to None.
+            end_seq (int, None, optional): The sequence number of the last item, inclusive. \
+            If None, ends at the most recent item. Defaults to None.
+
+        Returns:
+            ReceiveSnapshot: The items in the range that are in this snapshot.
+        """
+
+        start = 0 if start_seq is None else start_seq - self._first_seq
+        stop = len(self) if end_seq is None else end_seq - self._first_seq + 1
+
+        start = min(max(start, 0), len(self))
+        stop = min(max(stop, start), len(self))
+
+        return ReceiveSnapshot(
+            self._store,
+            self._start + start,
+            self._start + stop,
+            self._first_seq + start,
+        )
+
+    def time_range(
+        self, start_ts: t.Optional[float] = None, end_ts: t.Optional[float] = None
+    ) -> "ReceiveSnapshot":
+        """Returns a snapshot of the items received from `start_ts` to `end_ts`.
+
+        Items are found with a binary search of the timestamps, which are in the order
+        the items were received (unless the system clock was changed while receiving).
+
+        Args:
+            start_ts (float, None, optional): The earliest timestamp, inclusive. \
+            If None, starts from the oldest item. Defaults to None.
+            end_ts (float, None, optional): The latest timestamp, inclusive. \
+            If None, ends at the most recent item. Defaults to None.
+
+        Returns:
+            ReceiveSnapshot: The items in the time range that are in this snapshot.
+        """
+
+        timestamps = self._store.timestamps
+
+        start = (
+            self._start
+            if start_ts is None
+            else bisect.bisect_left(timestamps, start_ts, self._start, self._end)
+        )
+        stop = (
+            self._end
+            if end_ts is None
+            else bisect.bisect_right(timestamps, end_ts, start, self._end)
+        )
+
+        return ReceiveSnapshot(
+            self._store, start, stop, self._first_seq + start - self._start
+        )
+
+
+class ReceiveBuffer:
+    """The storage behind the receive queue.
+
+    Holds the `(timestamp, bytes)` items that were received, oldest first, up to
+    `queue_size` of them. If `max_bytes` is given, then the oldest items are also removed
+    while the total size of the bytes objects is greater than `max_bytes`, except for
+    the most recent item, which is always kept. Every item gets a sequence number that is one greater than
+    the sequence number of the item before it, starting from 1. Sequence numbers
+    keep increasing when items are removed or when the buffer is cleared, so the
+    position of an item can be found with arithmetic on sequence numbers.
+
+    Items are stored compactly: timestamps in an `array`, and the bytes objects joined
+    together in one `bytearray`. `(timestamp, bytes)` tuples are only created when
+    items are read. Removing the oldest item only moves a start index, and the storage
+    is copied without the removed items once they take up as much space as `queue_size`
+    (or their bytes take up `max_bytes`), so up to about twice `max_bytes` may be in memory at once.
+    Adding, removing, and indexing all take constant (amortized) time.
+
+    All methods hold `lock`. This is not meant to be used directly; use
+    `ReceiveQueue` in custom IO threads and `Connection` methods otherwise.
+    """
+
+    def __init__(
+        self,
+        queue_size: int,
+        lock: t.Optional[t.Union[threading.Lock, threading.Condition]] = None,
+        max_bytes: t.Optional[int] = None,
+        journal: t.Optional["ReceiveJournal"] = None,
+    ) -> None:
+        """Constructor for receive buffer object.
+
+        Args:
+            queue_size (int): The maximum number of items in the buffer.
+            lock (Lock, Condition, None, optional): The lock to hold while reading from or writing to the buffer. \
+            If it is a `Condition`, then all threads waiting on it are notified after items are pushed. \
+            If None, a new lock is created. Defaults to None.
+            max_bytes (int, None, optional): The maximum total size of the bytes objects in the buffer. \
+            If None, only the number of items is limited. Defaults to None.
+            journal (ReceiveJournal, None, optional): If given, every item pushed is also added to the journal, \
+            and sequence numbers continue from the last one in the journal. Defaults to None.
+        """
+
+        self._queue_size = queue_size
+        self._max_bytes = max_bytes
+        self._journal = journal
+        self._lock = lock if lock is not None else threading.Lock()
+
+        self._store = _ReceiveStore()
+        self._head = 0  # index in _store of the oldest item
+        self._last_seq = (
+            journal.last_seq if journal is not None else 0
+        )  # sequence number of the most recent item
+        self._nbytes = 0  # total size of the bytes objects in the buffer
+        self._removed_nbytes = 0  # total size of the bytes objects before _head
+
+        # `(seq, timestamp, bytes)` of pushed items that are not in the journal yet, oldest first
+        self._unjournaled: t.Deque[t.Tuple[int, float, bytes]] = collections.deque()
+
+        # held while writing to the journal, so that items are written in order when several threads push
+        self._journal_write_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        """
+        Returns the number of items in the buffer.
+        """
+
+        with self._lock:
+            return len(self._store) - self._head
+
+    def __getitem__(self, index: int) -> t.Tuple[float, bytes]:
+        """
+        Returns the item at `index`, where 0 is the oldest and -1 is the most recent item.
+        """
+
+        with self._lock:
+            size = len(self._store) - self._head
+            if index < 0:
+                index += size
+            if index < 0 or index >= size:
+                raise IndexError("receive buffer index out of range")
+
+            return self._store.item(self._head + index)
+
+    @property
+    def lock(self) -> t.Union[threading.Lock, threading.Condition]:
+        """
+        The lock that is held while reading from or writing to the buffer.
+        """
+
+        return self._lock
+
+    @property
+    def nbytes(self) -> int:
+        """
+        The total size of the bytes objects in the buffer.
+        """
+
+        return self._nbytes
+
+    @property
+    def max_bytes(self) -> t.Optional[int]:
+        """
+        The maximum total size of the bytes objects in the buffer, or None if it is not limited.
+        """
+
+        return self._max_bytes
+
+    @property
+    def journal(self) -> t.Optional["ReceiveJournal"]:
+        """
+        The journal that pushed items are added to, or None.
+        """
+
+        return self._journal
+
+    @property
+    def last_seq(self) -> int:
+        """
+        The sequence number of the most recent item, or 0 if nothing has been pushed.
+        """
+
+        return self._last_seq
+
+    @property
+    def first_seq(self) -> int:
+        """
+        The sequence number of the oldest item in the buffer.
+
+        If the buffer is empty, this is `last_seq + 1`.
+        """
+
+        with self._lock:
+            return self._last_seq - (len(self._store) - self._head) + 1
+
+    def get_seq(self, seq: int) -> t.Optional[t.Tuple[float, bytes]]:
+        """
+        Returns the item with sequence number `seq`, or None if it is not in the buffer.
+        """
+
+        with self._lock:
+            index = len(self._store) - 1 - (self._last_seq - seq)
+            if index < self._head or seq > self._last_seq:
+                return None
+
+            return self._store.item(index)
+
+    def since(self, seq: int) -> t.List[t.Tuple[float, bytes]]:
+        """
+        Returns the items that have sequence numbers greater than `seq`, oldest first.
+        """
+
+        with self._lock:
+            new = min(max(self._last_seq - seq, 0), len(self._store) - self._head)
+            return self._store.items(len(self._store) - new, len(self._store))
+
+    def push(self, *args: t.Tuple[float, bytes]) -> None:
+        """
+        Adds `(timestamp, bytes)` tuples to the buffer, removing the oldest items
+        if the size exceeds `queue_size` or the total size of the bytes objects exceeds `max_bytes`.
+        """
+
+        journal = self._journal
+
+        with self._lock:
+            for timestamp, data in args:
+                self._store.append(timestamp, data)
+                self._last_seq += 1
+                self._nbytes += len(data)
+
+                if len(self._store) - self._head > self._queue_size:
+                    self._remove_oldest()
+
+                if self._max_bytes is not None:
+                    # always keep the most recent item
+                    while (
+                        self._nbytes > self._max_bytes
+                        and len(self._store) - self._head > 1
+                    ):
+                        self._remove_oldest()
+
+            if journal is not None:
+                # read from here until they are written, in case they already left the buffer
+                self._unjournaled.extend(
+                    (self._last_seq - len(args) + 1 + i, timestamp, data)
+                    for i, (timestamp, data) in enumerate(args)
+                )
+
+            if self._head >= max(self._queue_size, 1) or (
+                self._max_bytes is not None and self._removed_nbytes >= self._max_bytes
+            ):
+                # copy without removed items; new storage so that removing is O(1) amortized
+                # and so that snapshots of the old storage stay valid
+                self._store = self._store.tail(self._head)
+                self._head = 0
+                self._removed_nbytes = 0
+
+            if isinstance(self._lock, threading.Condition):
+                # wake up threads waiting for new data
+                self._lock.notify_all()
+
+        if journal is not None and args:
+            # written to disk after the buffer is unlocked, so that nothing waits on the disk
+            self._write_journal(journal)
+
+    def journal_entries(
+        self,
+        start_seq: int,
+        end_seq: t.Optional[int] = None,
+        limit: t.Optional[int] = None,
+    ) -> t.List[t.Tuple[int, float, bytes]]:
+        """
+        Same as `ReceiveJournal.entries()`, but also returns items that were pushed and are still being written
+        to the journal. Returns an empty list if there is no journal.
+        """
+
+        if self._journal is None:
+            return []
+
+        with self._lock:
+            pending = list(self._unjournaled)
+
+        # everything before the pending items was written before they were copied
+        journal_end = end_seq
+        if pending:
+            journal_end = pending[0][0] - 1
+            if end_seq is not None:
+                journal_end = min(journal_end, end_seq)
+
+        ret = self._journal.entries(start_seq, journal_end, limit)
+        ret.extend(
+            item
+            for item in pending
+            if item[0] >= start_seq and (end_seq is None or item[0] <= end_seq)
+        )
+
+        return ret if limit is None else ret[:limit]
+
+    def journal_seq_at_time(self, timestamp: float) -> int:
+        """
+        Same as `ReceiveJournal.seq_at_time()`, but also finds items that were pushed and are still being written
+        to the journal. Returns `last_seq + 1` if there is no journal.
+        """
+
+        if self._journal is None:
+            return self._last_seq + 1
+
+        with self._lock:
+            pending = list(self._unjournaled)
+
+        seq = self._journal.seq_at_time(timestamp)
+        if not pending or seq < pending[0][0]:
+            return seq
+
+        for item in pending:
+            if item[1] >= timestamp:
+                return item[0]
+
+        return pending[-1][0] + 1
+
+    def clear(self) -> None:
+        """
+        Removes all items from the buffer. Sequence numbers are not reset.
+        """
+
+        with self._lock:
+            self._store = _ReceiveStore()
+            self._head = 0
+            self._nbytes = 0
+            self._removed_nbytes = 0
+
+            if isinstance(self._lock, threading.Condition):
+                # wake up waiting threads so they can check if they should stop waiting
+                self._lock.notify_all()
+
+    def _write_journal(self, journal: "ReceiveJournal") -> None:
+        """
+        Writes the items that are not in the journal yet, then stops reading them from memory
+        """
+
+        with self._journal_write_lock:
+            with self._lock:
+                items = list(self._unjournaled)
+
+            if not items:
+                # another thread wrote them
+                return
+
+            journal.append(*items)
+
+            with self._lock:
+                for _ in items:
+                    self._unjournaled.popleft()
+
+    def _remove_oldest(self) -> None:
+        """
+        Removes the oldest item by moving the start index
+        """
+
+        size = self._store.size(self._head)
+        self._nbytes -= size
+        self._removed_nbytes += size
+        self._head += 1
+
+    def copy(self) -> t.List[t.Tuple[float, bytes]]:
+        """
+        Returns a list of all the items in the buffer, oldest first.
+        """
+
+        with self._lock:
+            return self._store.items(self._head, len(self._store))
+
+    def snapshot(self) -> ReceiveSnapshot:
+        """
+        Returns a `ReceiveSnapshot` of all the items in the buffer without copying them.
+        """
+
+        with self._lock:
+            size = len(self._store) - self._head
+            return ReceiveSnapshot(
+                self._store, self._head, len(self._store), self._last_seq - size + 1
+            )
 
 
 class ReceiveQueue:
@@ -115,17 +1114,39 @@ class ReceiveQueue:
 
     Makes sure the user does not directly add,
     delete, or modify the queue.
+
+    Internally, this is a `ReceiveBuffer` with a capacity of `queue_size`,
+    so adding an item and removing the oldest item both take constant time.
     """
 
-    def __init__(self, rcv_queue: list, queue_size: int) -> None:
-        """Constructor for send queue object.
+    def __init__(
+        self,
+        rcv_queue: t.Union[t.Iterable[t.Tuple[float, bytes]], ReceiveBuffer],
+        queue_size: int,
+        lock: t.Optional[t.Union[threading.Lock, threading.Condition]] = None,
+        max_bytes: t.Optional[int] = None,
+    ) -> None:
+        """Constructor for receive queue object.
 
         Args:
-            rcv_queue (list): The list that willa ct as the receive queue.
+            rcv_queue (Iterable[Tuple[float, bytes]], ReceiveBuffer): The items that the receive queue starts with. \
+            If this is a `ReceiveBuffer`, then it will be used as the receive queue directly.
             queue_size (int): The maximum size of the receive queue.
+            lock (Lock, Condition, None, optional): The lock to hold while adding to or copying the receive queue. \
+            If it is a `Condition`, then all threads waiting on it are notified after items are pushed. \
+            If None, a new lock is created. Ignored if `rcv_queue` is a `ReceiveBuffer`. Defaults to None.
+            max_bytes (int, None, optional): The maximum total size of the bytes objects in the receive queue. \
+            If None, only the number of items is limited. Ignored if `rcv_queue` is a `ReceiveBuffer`. Defaults to None.
         """
 
-        self._rcv_queue = rcv_queue
+        self._rcv_queue: ReceiveBuffer
+
+        if isinstance(rcv_queue, ReceiveBuffer):
+            self._rcv_queue = rcv_queue
+        else:
+            self._rcv_queue = ReceiveBuffer(queue_size, lock, max_bytes)
+            self._rcv_queue.push(*rcv_queue)
+
         self._queue_size = queue_size
 
     def __len__(self) -> int:
@@ -140,17 +1161,19 @@ class ReceiveQueue:
         String representation of queue.
         """
 
-        return f"ReceiveQueue{self._rcv_queue}"
+        return f"ReceiveQueue{self._rcv_queue.copy()}"
 
     def pushitems(self, *args: bytes) -> None:
         """Adds a list of items to the receive queue
 
-        If the size exceeds `queue_size` when adding, then
+        If the size exceeds `queue_size` (or the total size of the
+        bytes objects exceeds `max_bytes`) when adding, then
         it will pop the front of the queue.
 
         A tuple (timestamp, bytes) will be added. The timestamp
         will be regenerated for each iteration of the for loop
-        so they will be in order when binary searching.
+        so they will be in order. Each item also gets the next
+        sequence number.
 
         Args:
             *args (bytes): The bytes objects to add
@@ -163,12 +1186,9 @@ class ReceiveQueue:
             if not isinstance(obj, bytes):
                 raise TypeError("Every argument must be a bytes object")
 
-            # add timestamp, obj to queue
-            self._rcv_queue.append((time.time(), obj))
-
-            if len(self._rcv_queue) > self._queue_size:
-                # if greater than queue size, then pop first element
-                self._rcv_queue.pop(0)
+        # add timestamp, obj to queue; the oldest elements are
+        # removed automatically if greater than queue size
+        self._rcv_queue.push(*[(time.time(), obj) for obj in args])
 
     def copy(self) -> t.List[t.Tuple[float, bytes]]:
         """Returns a shallow copy of the receive queue list
@@ -201,4 +1221,4 @@ class ReceiveQueue:
             List[Tuple[float, bytes]]: A deep copy of the receive queue
         """
 
-        return copy.deepcopy(self._rcv_queue)
+        return copy.deepcopy(self.copy())
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Contains a WebSocket server that connects clients directly to a `Connection`.
+
+Waitress cannot upgrade HTTP connections to WebSockets, so the WebSocket server listens
+on its own port. Only the parts of [RFC 6455](https://datatracker.ietf.org/doc/html/rfc6455)
+needed for a bidirectional channel are implemented, with the standard library only.
+"""
+
+import base64
+import hashlib
+import json
+import socket
+import socketserver
+import struct
+import threading
+import typing as t
+
+from .base_connection import ConnectException
+from .connection import Connection
+from .constants import DEFAULT_HOST
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+# largest message, in bytes, that a client can send
+WEBSOCKET_MAX_MESSAGE_SIZE = 1024 * 1024
+
+# how often, in seconds, the thread sending received data checks if the client is gone
+WEBSOCKET_CHECK_INTERVAL = 1.0
+
+# most objects read from the receive queue at once
+WEBSOCKET_BATCH_SIZE = 256
+
+# opcodes
+_OP_CONTINUATION = 0x0
+_OP_TEXT = 0x1
+_OP_BINARY = 0x2
+_OP_CLOSE = 0x8
+_OP_PING = 0x9
+_OP_PONG = 0xA
+
+# close codes
+_CLOSE_NORMAL = 1000
+_CLOSE_PROTOCOL_ERROR = 1002
+_CLOSE_TOO_BIG = 1009
+_CLOSE_INTERNAL_ERROR = 1011
+
+# longest request line or header in the handshake
+_MAX_LINE = 8192
+
+
+def _encode_frame(opcode: int, payload: bytes) -> bytes:
+    """
+    Returns a single unmasked frame, which is how the server sends messages
+    """
+
+    size = len(payload)
+
+    if size < 126:
+        header = struct.pack("!BB", 0x80 | opcode, size)
+    elif size < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, size)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, size)
+
+    return header + payload
+
+
+def _unmask(payload: bytes, mask: bytes) -> bytes:
+    """
+    Unmasks a payload sent by a client; XORs it as one big integer, which is much faster than byte by byte
+    """
+
+    size = len(payload)
+    if size == 0:
+        return payload
+
+    key = (mask * (size // 4 + 1))[:size]
+    return (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(
+        size, "big"
+    )
+
+
+class WebSocketServer:
+    """A WebSocket server that connects clients directly to a `Connection`.
+
+    Each message that a client sends (text or binary) is put into the send queue
+    as is, without an ending or any conversion. Each object received from the
+    serial port is sent to every client as a binary message as soon as it is received,
+    so a round trip takes one message each way instead of two HTTP requests.
+    If the send queue does not accept a message (because `send_interval` was not reached
+    or the queue is full), then the client gets a text message with
+    `{"message": "Failed to send"}`.
+
+    The server runs in its own thread, and each client uses two threads: one reading
+    messages and one waiting for received data. It does not lock the connection like
+    `ConnectionRoutes`, so it can be used along with the HTTP endpoints. Clients are
+    disconnected with close code 1011 when the serial port disconnects.
+
+    ```py
+    ws = WebSocketServer(conn, port=8081)
+    ws.start()  # clients connect to ws://<host>:8081/
+    ...
+    ws.shutdown()
+    ```
+
+    It can also be started with the `websocket_port` argument of `start_app()`.
+    """
+
+    def __init__(
+        self, conn: Connection, host: str = DEFAULT_HOST, port: int = 8081
+    ) -> None:
+        """Constructor for WebSocket server.
+
+        Binds to the address immediately, but does not accept clients until `start()` is called.
+
+        Args:
+            conn (Connection): The `Connection` object that clients send to and receive from.
+            host (str, optional): The host to listen on. Defaults to "0.0.0.0".
+            port (int, optional): The port to listen on; 0 picks a free port. Defaults to 8081.
+
+        Raises:
+            TypeError: If `conn` is not a `Connection`, such as an `AsyncConnection`.
+        """
+
+        if not isinstance(conn, Connection):
+            raise TypeError("conn must be a Connection")
+
+        self._server = _TCPServer((host, port), _Handler)
+        self._server.conn = conn
+        self._thread: t.Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        """
+        String representation of WebSocket server.
+        """
+
+        host, port = self.address
+        return f"WebSocketServer<host={host}, port={port}>{{Connection={self._server.conn}}}"
+
+    @property
+    def address(self) -> t.Tuple[str, int]:
+        """
+        The host and port that the server is listening on.
+        """
+
+        host, port = self._server.socket.getsockname()[:2]
+        return host, port
+
+    def start(self) -> None:
+        """Starts accepting clients in a new thread.
+
+        Raises:
+            RuntimeError: If the server was already started.
+        """
+
+        if self._thread is not None:
+            raise RuntimeError("server already started")
+
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        """
+        Stops accepting clients and closes the listening socket. Clients that are
+        already connected are closed when the serial port disconnects or the program exits.
+        """
+
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+
+        self._server.server_close()
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    """
+    Threaded TCP server that holds the connection for the handlers
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    conn: Connection
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    Handles one WebSocket client
+    """
+
+    server: _TCPServer
+
+    def setup(self) -> None:
+        super().setup()
+
+        # small messages should not wait to be joined together
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self._send_lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def handle(self) -> None:
+        if not self._handshake():
+            return
+
+        forwarder = threading.Thread(target=self._forward_received, daemon=True)
+        forwarder.start()
+
+        try:
+            self._read_messages()
+        except OSError:
+            pass
+        finally:
+            self._closed.set()
+            forwarder.join()
+
+    def _handshake(self) -> bool:
+        """
+        Reads the opening handshake and accepts it. Responds with an HTTP error and returns False if it is invalid
+        """
+
+        request_line = self.rfile.readline(_MAX_LINE)
+        headers: t.Dict[str, str] = {}
+
+        while True:
+            line = self.rfile.readline(_MAX_LINE)
+            if line in (b"\r\n", b"\n", b""):
+                break
+
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+            if len(headers) > 100:
+                break
+
+        if not self.server.conn.connected:
+            self._http_error("503 Service Unavailable")
+            return False
+
+        key = headers.get("sec-websocket-key")
+        if (
+            not request_line.startswith(b"GET ")
+            or headers.get("upgrade", "").lower() != "websocket"
+            or "upgrade" not in headers.get("connection", "").lower()
+            or headers.get("sec-websocket-version") != "13"
+            or not key
+        ):
+            self._http_error("400 Bad Request")
+            return False
+
+        accept = base64.b64encode(
+            hashlib.sha1((key + WEBSOCKET_GUID).encode("latin-1")).digest()
+        ).decode("ascii")
+
+        self.wfile.write(
+            (
+                "HTTP/1.1 101 Switching Protocols\r\n"
+                "Upgrade: websocket\r\n"
+                "Connection: Upgrade\r\n"
+                f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+            ).encode("latin-1")
+        )
+
+        return True
+
+    def _http_error(self, status: str) -> None:
+        """
+        Responds to the handshake with an HTTP error
+        """
+
+        self.wfile.write(
+            (
+                f"HTTP/1.1 {status}\r\n"
+                "Sec-WebSocket-Version: 13\r\n"
+                "Content-Length: 0\r\n"
+                "Connection: close\r\n\r\n"
+            ).encode("latin-1")
+        )
+
+    def _read_messages(self) -> None:
+        """
+        Reads messages from the client and puts them into the send queue until the client closes
+        """
+
+        message = bytearray()
+        message_opcode: t.Optional[int] = None
+
+        while not self._closed.is_set():
+            frame = self._read_frame()
+            if frame is None:
+                return
+
+            fin, opcode, payload = frame
+
+            if opcode == _OP_CLOSE:
+                # echo the close code back
+                self._close(
+                    struct.unpack("!H", payload[:2])[0]
+                    if len(payload) >= 2
+                    else _CLOSE_NORMAL
+                )
+                return
+            elif opcode == _OP_PING:
+                self._send(_encode_frame(_OP_PONG, payload))
+            elif opcode == _OP_PONG:
+                continue
+            elif opcode in (_OP_TEXT, _OP_BINARY, _OP_CONTINUATION):
+                if (opcode == _OP_CONTINUATION) != (message_opcode is not None):
+                    # continuation without a start, or a new message before the last one ended
+                    self._close(_CLOSE_PROTOCOL_ERROR)
+                    return
+
+                message_opcode = opcode if message_opcode is None else message_opcode
+                message += payload
+
+                if len(message) > WEBSOCKET_MAX_MESSAGE_SIZE:
+                    self._close(_CLOSE_TOO_BIG)
+                    return
+
+                if fin:
+                    if not self._send_to_serial(bytes(message)):
+                        return
+
+                    message = bytearray()
+                    message_opcode = None
+            else:
+                self._close(_CLOSE_PROTOCOL_ERROR)
+                return
+
+    def _read_frame(self) -> t.Optional[t.Tuple[bool, int, bytes]]:
+        """
+        Reads one frame and returns whether it is the last frame of the message, its opcode,
+        and its unmasked payload. Returns None if the client is gone or broke the protocol.
+        """
+
+        header = self.rfile.read(2)
+        if len(header) < 2:
+            return None
+
+        fin = bool(header[0] & 0x80)
+        opcode = header[0] & 0x0F
+        size = header[1] & 0x7F
+
+        if not header[1] & 0x80:
+            # clients always have to mask their frames
+            self._close(_CLOSE_PROTOCOL_ERROR)
+            return None
+
+        if size in (126, 127):
+            fmt = "!H" if size == 126 else "!Q"
+            extended = self.rfile.read(struct.calcsize(fmt))
+            if len(extended) < struct.calcsize(fmt):
+                return None
+
+            size = struct.unpack(fmt, extended)[0]
+
+        if size > WEBSOCKET_MAX_MESSAGE_SIZE:
+            self._close(_CLOSE_TOO_BIG)
+            return None
+
+        mask = self.rfile.read(4)
+        payload = self.rfile.read(size)
+        if len(mask) < 4 or len(payload) < size:
+            return None
+
+        return fin, opcode, _unmask(payload, mask)
+
+    def _send_to_serial(self, data: bytes) -> bool:
+        """
+        Puts a message into the send queue, telling the client if it was not accepted.
+        Returns False if the serial port is disconnected.
+        """
+
+        try:
+            dispatch_at = self.server.conn.queue_bytes(data)
+        except ConnectException:
+            self._close(_CLOSE_INTERNAL_ERROR, "Serial port disconnected.")
+            return False
+
+        if dispatch_at is None:
+            self._send(
+                _encode_frame(
+                    _OP_TEXT, json.dumps({"message": "Failed to send"}).encode("utf-8")
+                )
+            )
+
+        return True
+
+    def _forward_received(self) -> None:
+        """
+        Sends everything received from the serial port to the client until the client is gone
+        """
+
+        conn = self.server.conn
+
+        try:
+            cursor = conn.snapshot().last_seq
+
+            while not self._closed.is_set():
+                cursor, rcv = conn.receive_next(
+                    cursor, wait=WEBSOCKET_CHECK_INTERVAL, limit=WEBSOCKET_BATCH_SIZE
+                )
+
+                if rcv:
+                    self._send(
+                        b"".join(_encode_frame(_OP_BINARY, data) for _, _, data in rcv)
+                    )
+        except ConnectException:
+            self._close(_CLOSE_INTERNAL_ERROR, "Serial port disconnected.")
+        except OSError:
+            self._closed.set()
+
+    def _send(self, data: bytes) -> None:
+        """
+        Writes frames to the client; both threads write, so writes are not mixed together
+        """
+
+        with self._send_lock:
+            self.wfile.write(data)
+
+    def _close(self, code: int, reason: str = "") -> None:
+        """
+        Sends a close frame and shuts down the socket, which also stops the other thread
+        """
+
+        if self._closed.is_set():
+            return
+
+        self._closed.set()
+
+        try:
+            self._send(
+                _encode_frame(
+                    _OP_CLOSE, struct.pack("!H", code) + reason.encode("utf-8")
+                )
+            )
+            self.request.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+A stand-in for `serial.Serial` that returns scripted data, for testing IO cycles without a serial port.
+"""
+
+import collections
+import typing as t
+
+
+class FakeSerial:
+    """
+    Each time `in_waiting` is checked while nothing is waiting, the next chunk in `chunks` arrives;
+    a None chunk means that nothing arrived that time. Everything written is kept in `written`.
+    """
+
+    def __init__(self, chunks: t.Iterable[t.Optional[bytes]] = ()) -> None:
+        self.chunks: t.Deque[t.Optional[bytes]] = collections.deque(chunks)
+        self.buffer = bytearray()
+        self.written: t.List[bytes] = []
+        self.reads: t.List[int] = []  # size of each readinto()
+        self.flushes = 0
+
+    @property
+    def in_waiting(self) -> int:
+        if not self.buffer and self.chunks:
+            chunk = self.chunks.popleft()
+            if chunk is not None:
+                self.buffer += chunk
+
+        return len(self.buffer)
+
+    def readinto(self, view: memoryview) -> int:
+        size = min(len(view), len(self.buffer))
+        view[:size] = self.buffer[:size]
+        del self.buffer[:size]
+        self.reads.append(size)
+
+        return size
+
+    def write(self, data: bytes) -> int:
+        self.written.append(bytes(data))
+
+        return len(data)
+
+    def flush(self) -> None:
+        self.flushes += 1
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the parts of `AsyncConnection` that do not need a serial port
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+from com_server import (
+    AsyncConnection,
+    ConnectException,
+    Connection,
+    ConnectionRoutes,
+    Macro,
+    MacroStep,
+    Poller,
+)
+from com_server.base_connection import RCV_WAIT_INTERVAL
+from fake_serial import FakeSerial
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="AsyncConnection is POSIX only")
+
+
+def test_async_not_connected() -> None:
+    """
+    Should not be connected before `connect()` is awaited
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0")
+    assert not conn.connected
+
+
+def test_async_sync_context_manager() -> None:
+    """
+    Using `with` instead of `async with` should raise TypeError
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0")
+
+    with pytest.raises(TypeError):
+        with conn:
+            pass
+
+
+def test_async_custom_io_thread() -> None:
+    """
+    Custom IO threads should raise TypeError
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0")
+
+    with pytest.raises(TypeError):
+        conn.custom_io_thread(lambda conn, rcv_queue, send_queue: None)
+
+
+def test_async_not_a_connection() -> None:
+    """
+    An AsyncConnection should not be accepted where a Connection is expected, since its methods are coroutines
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0")
+    assert not isinstance(conn, Connection)
+
+    with pytest.raises(TypeError):
+        ConnectionRoutes(conn)  # type: ignore
+
+    with pytest.raises(TypeError):
+        Poller(conn)  # type: ignore
+
+    with pytest.raises(TypeError):
+        Macro(MacroStep(send="hello")).run(conn)  # type: ignore
+
+
+def test_async_get_not_connected() -> None:
+    """
+    Coroutines should raise ConnectException if not connected
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0")
+
+    with pytest.raises(ConnectException):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(conn.get())
+        finally:
+            loop.close()
+
+
+def test_async_push_wakes_waiters() -> None:
+    """
+    Pushing received data should wake up coroutines waiting in `get()` and `receive_next()` right away
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0", timeout=5)
+    conn._conn = FakeSerial()
+
+    async def _run() -> None:
+        conn._loop = asyncio.get_running_loop()
+        cursor = conn._rcv_queue.last_seq
+
+        get = asyncio.ensure_future(conn.get())
+        nxt = asyncio.ensure_future(conn.receive_next(cursor, wait=5))
+        await asyncio.sleep(0.05)
+        assert not get.done() and not nxt.done()
+
+        st = time.time()
+        conn._incoming += b"hello\n"
+        conn._push_incoming()
+
+        assert await asyncio.wait_for(get, RCV_WAIT_INTERVAL / 2) == "hello"
+        assert (await asyncio.wait_for(nxt, RCV_WAIT_INTERVAL / 2))[1][0][
+            2
+        ] == b"hello\n"
+        assert time.time() - st < RCV_WAIT_INTERVAL / 10
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_run())
+    finally:
+        conn._conn = None
+        loop.close()
+
+
+def test_async_write_pending() -> None:
+    """
+    `_write_pending()` should write everything in the send queue, in order, and leave it empty
+    """
+
+    conn = AsyncConnection(115200, "/dev/ttyUSB0", send_interval=0)
+    ser = FakeSerial()
+    conn._conn = ser
+
+    async def _run() -> None:
+        conn._loop = asyncio.get_running_loop()
+        conn._to_send.extend([b"a\n", b"b\n", b"c\n"])
+
+        conn._write_pending()
+
+        deadline = time.time() + 2
+        while len(conn._to_send) > 0 and time.time() < deadline:
+            await asyncio.sleep(0.01)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(_run())
+    finally:
+        conn._conn = None
+        loop.close()
+
+    assert ser.written == [b"a\n", b"b\n", b"c\n"]
+    assert len(conn._to_send) == 0
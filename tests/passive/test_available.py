@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests sequence numbers in the receive queue, `available`, and exception thrown when available is called while disconnected
+"""
+
+import pytest
+from com_server import Connection, ConnectException
+from com_server.tools import ReceiveBuffer
+
+
+def test_seq_increasing() -> None:
+    """
+    Sequence numbers should keep increasing when items are removed or cleared
+    """
+
+    buf = ReceiveBuffer(4)
+    assert buf.last_seq == 0
+    assert buf.first_seq == 1
+
+    buf.push(*[(float(i), str(i).encode()) for i in range(10)])
+    assert buf.last_seq == 10
+    assert buf.first_seq == 7
+    assert len(buf) == 4
+
+    assert buf.get_seq(10) == (9.0, b"9")
+    assert buf.get_seq(7) == (6.0, b"6")
+    assert buf.get_seq(6) is None
+    assert buf.get_seq(11) is None
+
+    assert buf.since(8) == [(8.0, b"8"), (9.0, b"9")]
+    assert buf.since(0) == buf.copy()
+    assert buf.since(10) == []
+
+    buf.clear()
+    assert len(buf) == 0
+    assert buf.last_seq == 10
+
+    buf.push((10.0, b"10"))
+    assert buf.last_seq == 11
+    assert buf[-1] == (10.0, b"10")
+
+
+def test_available_same_timestamp() -> None:
+    """
+    Tests that available counts correctly even when items have the same timestamp
+    """
+
+    b = Connection(port="test", baud=123)
+    b._conn = True  # pretend to be connected
+
+    b._rcv_queue.push(*[(1636911273.8617, b"")] * 5)
+    assert b.available == 5
+
+    b.receive(num_before=2)
+    assert b.available == 2
+
+    b.receive()
+    assert b.available == 0
+
+    # last received item removed from queue, everything is new
+    b._rcv_queue.push(*[(1636911273.8617, b"")] * 300)
+    assert b.available == len(b._rcv_queue)
+
+    b._conn = None
+
+
+def test_available_exception() -> None:
+    """
+    Tests that calling available while not connected will raise exception
+    """
+
+    b = Connection(port="test", baud=123)
+    with pytest.raises(ConnectException):
+        b.available
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests if framers split and decode frames correctly.
+"""
+
+import pytest
+from com_server import (
+    CobsFramer,
+    Connection,
+    DelimiterFramer,
+    FixedLengthFramer,
+    LengthPrefixFramer,
+    SlipFramer,
+)
+
+
+def test_delimiter_split() -> None:
+    """
+    Lines split across reads should be joined, and partial lines kept
+    """
+
+    f = DelimiterFramer(b"\r\n")
+
+    assert f.feed(b"ab\r\ncd\r") == [b"ab\r\n"]
+    assert f.feed(b"\nef") == [b"cd\r\n"]
+    assert f.feed(b"\r\n\r\n") == [b"ef\r\n", b"\r\n"]
+
+
+def test_delimiter_remove() -> None:
+    """
+    Delimiter should be removed if keep_delimiter is False
+    """
+
+    f = DelimiterFramer(b"\n", keep_delimiter=False)
+    assert f.feed(b"a\nb\n") == [b"a", b"b"]
+
+
+def test_delimiter_max_size() -> None:
+    """
+    Incomplete frames larger than max_size should be discarded
+    """
+
+    f = DelimiterFramer(b"\n", max_size=4)
+
+    assert f.feed(b"abcdef") == []
+    assert f.feed(b"gh\n") == [b"gh\n"]
+
+
+def test_delimiter_reset() -> None:
+    """
+    reset() should discard the incomplete frame
+    """
+
+    f = DelimiterFramer()
+    f.feed(b"abc")
+    f.reset()
+
+    assert f.feed(b"d\n") == [b"d\n"]
+
+
+def test_fixed_length() -> None:
+    """
+    Should split into frames of the same length
+    """
+
+    f = FixedLengthFramer(3)
+
+    assert f.feed(b"abcdefg") == [b"abc", b"def"]
+    assert f.feed(b"hi") == [b"ghi"]
+
+
+def test_length_prefix() -> None:
+    """
+    Should split by length prefix and discard everything on a corrupted length
+    """
+
+    f = LengthPrefixFramer(prefix_size=2, max_size=16)
+
+    assert f.feed(b"\x00\x03abc\x00\x02d") == [b"abc"]
+    assert f.feed(b"e") == [b"de"]
+    assert f.feed(b"\xff\xffabc") == []
+    assert f.feed(b"\x00\x01z") == [b"z"]
+
+    g = LengthPrefixFramer(prefix_size=1, include_prefix=True)
+    assert g.feed(b"\x02ab") == [b"\x02ab"]
+
+
+def test_slip() -> None:
+    """
+    Should decode SLIP frames and discard invalid ones
+    """
+
+    f = SlipFramer()
+
+    assert f.feed(b"\xc0a\xdb\xdcb\xdb\xddc\xc0\xc0") == [b"a\xc0b\xdbc"]
+    assert f.feed(b"bad\xdbx\xc0ok\xc0") == [b"ok"]
+
+
+def test_cobs() -> None:
+    """
+    Should decode COBS frames and discard invalid ones
+    """
+
+    f = CobsFramer()
+
+    assert f.feed(b"\x03\x11\x22\x02\x33\x00") == [b"\x11\x22\x00\x33"]
+    assert f.feed(b"\x01\x01\x00") == [b"\x00"]
+    assert f.feed(b"\x05ab\x00\x02c\x00") == [b"c"]
+
+    # frame with 254 non-zero bytes has no trailing zero
+    data = bytes(range(1, 255))
+    assert f.feed(b"\xff" + data + b"\x00") == [data]
+
+
+def test_invalid_args() -> None:
+    """
+    Invalid arguments should raise errors
+    """
+
+    with pytest.raises(ValueError):
+        DelimiterFramer(b"")
+
+    with pytest.raises(ValueError):
+        FixedLengthFramer(0)
+
+    with pytest.raises(ValueError):
+        LengthPrefixFramer(byteorder="middle")
+
+    with pytest.raises(TypeError):
+        Connection(115200, "/dev/ttyUSB0", framer=b"\n")  # type: ignore
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests reading the receive history by time range and sequence number.
+"""
+
+import threading
+import time
+
+import pytest
+from com_server import Connection, ConnectException, ReceiveJournal
+from com_server.tools import ReceiveBuffer
+
+RCV_LIST_TEST = [(float(i), str(i).encode()) for i in range(10)]
+
+
+def test_snapshot_time_range() -> None:
+    """
+    Time ranges should be inclusive and keep sequence numbers
+    """
+
+    buf = ReceiveBuffer(8)
+    buf.push(*RCV_LIST_TEST)  # seqs 3 to 10, timestamps 2.0 to 9.0
+    snap = buf.snapshot()
+
+    rng = snap.time_range(3.5, 6.0)
+    assert list(rng) == RCV_LIST_TEST[4:7]
+    assert (rng.first_seq, rng.last_seq) == (5, 7)
+
+    assert list(snap.time_range(start_ts=8.0)) == RCV_LIST_TEST[8:]
+    assert list(snap.time_range(end_ts=2.0)) == RCV_LIST_TEST[2:3]
+    assert len(snap.time_range(6.0, 5.0)) == 0
+    assert len(snap.time_range(100.0)) == 0
+    assert list(snap[2:].time_range(0.0, 4.0)) == RCV_LIST_TEST[4:5]
+
+
+def _connection(**kwargs) -> Connection:
+    conn = Connection(115200, "/dev/ttyUSB0", queue_size=4, **kwargs)
+    conn._conn = True  # pretend to be connected
+    conn._rcv_queue.push(*RCV_LIST_TEST)  # seqs 7 to 10 left
+
+    return conn
+
+
+def test_receive_since_range() -> None:
+    """
+    Should return sequence numbers, timestamps, and bytes from the receive queue
+    """
+
+    conn = _connection()
+
+    assert conn.receive_since(8) == [(9, 8.0, b"8"), (10, 9.0, b"9")]
+    assert [seq for seq, _, _ in conn.receive_since(0)] == [7, 8, 9, 10]
+    assert conn.receive_since(10) == []
+    assert conn.receive_since(0, limit=1) == [(7, 6.0, b"6")]
+
+    assert conn.receive_range(7.0, 8.5) == [(8, 7.0, b"7"), (9, 8.0, b"8")]
+    assert conn.receive_range(0.0, 5.0) == []
+    assert [seq for seq, _, _ in conn.receive_range(limit=2)] == [7, 8]
+
+    with pytest.raises(ValueError):
+        conn.receive_since(0, limit=-1)
+
+    conn._conn = None
+
+    with pytest.raises(ConnectException):
+        conn.receive_range()
+
+
+def test_receive_history_journal(tmp_path) -> None:
+    """
+    Items removed from the receive queue should be read from the journal
+    """
+
+    conn = _connection(journal=ReceiveJournal(str(tmp_path)))
+
+    assert [seq for seq, _, _ in conn.receive_since(2)] == list(range(3, 11))
+    assert conn.receive_since(2, limit=2) == [(3, 2.0, b"2"), (4, 3.0, b"3")]
+
+    assert conn.receive_range(1.0, 7.0) == [
+        (i + 1, float(i), str(i).encode()) for i in range(1, 8)
+    ]
+    assert conn.receive_range(1.5, 2.5) == [(3, 2.0, b"2")]
+    assert [seq for seq, _, _ in conn.receive_range()] == list(range(1, 11))
+    assert [seq for seq, _, _ in conn.receive_range(8.0)] == [9, 10]
+
+    # nothing left in the receive queue
+    conn._rcv_queue.clear()
+    assert [seq for seq, _, _ in conn.receive_range(5.0)] == [6, 7, 8, 9, 10]
+    assert conn.receive_since(9) == [(10, 9.0, b"9")]
+
+    conn.journal.close()
+
+
+def test_receive_next() -> None:
+    """
+    Should return new data immediately, or wait for it, and return the new cursor
+    """
+
+    conn = _connection()
+
+    assert conn.receive_next(8) == (10, [(9, 8.0, b"8"), (10, 9.0, b"9")])
+    assert conn.receive_next(0, limit=1) == (7, [(7, 6.0, b"6")])
+
+    # nothing new
+    st = time.time()
+    assert conn.receive_next(10, wait=0.1) == (10, [])
+    assert time.time() - st >= 0.1
+
+    # woken up when data is received
+    timer = threading.Timer(0.05, conn._rcv_queue.push, [(10.0, b"10")])
+    timer.start()
+
+    st = time.time()
+    assert conn.receive_next(10, wait=5) == (11, [(11, 10.0, b"10")])
+    assert time.time() - st < 1
+
+    # cursor from before a restart reads from now on
+    assert conn.receive_next(1000) == (11, [])
+
+    with pytest.raises(ValueError):
+        conn.receive_next(0, wait=-1)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the `io_mode` argument of `Connection` and how the IO thread reads
+"""
+
+import os
+import statistics
+import time
+
+import pytest
+from com_server import IO_MODE_POLL, IO_MODE_SELECT, Connection, DelimiterFramer, tools
+from com_server.connection import READ_BUFFER_SIZE
+from fake_serial import FakeSerial
+
+
+def test_io_mode_default() -> None:
+    """
+    Default IO mode should be polling
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    assert conn._io_mode == IO_MODE_POLL
+
+
+def test_io_mode_invalid() -> None:
+    """
+    Unknown IO mode should raise ValueError
+    """
+
+    with pytest.raises(ValueError):
+        Connection(115200, "/dev/ttyUSB0", io_mode="abc")
+
+
+@pytest.mark.skipif(os.name == "nt", reason="IO_MODE_SELECT is POSIX only")
+def test_io_mode_select() -> None:
+    """
+    Select mode should be accepted on POSIX
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", io_mode=IO_MODE_SELECT)
+    assert conn._io_mode == IO_MODE_SELECT
+
+
+@pytest.mark.skipif(os.name == "nt", reason="IO_MODE_SELECT and ptys are POSIX only")
+@pytest.mark.parametrize("framer", [DelimiterFramer(b"\n"), None])
+def test_io_mode_select_wakes_up(monkeypatch, framer) -> None:
+    """
+    In select mode, data written to the port should reach the receive queue right away,
+    without waiting out a poll interval, and with a framer, without waiting out the quiet gap either
+    """
+
+    import tty  # POSIX only
+
+    master, slave = os.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    port = os.ttyname(slave)
+
+    conn = Connection(115200, port, io_mode=IO_MODE_SELECT, framer=framer)
+
+    with monkeypatch.context() as m:
+        m.setattr(tools, "all_ports", lambda **kwargs: [(port, "", "")])
+        # skip waiting for the other end to start up
+        sleep = time.sleep
+        m.setattr(time, "sleep", lambda s: None if s == 2 else sleep(s))
+        conn.connect()
+
+    try:
+        latencies = []
+        for _ in range(10):
+            cursor = conn.snapshot().last_seq
+
+            st = time.time()
+            os.write(master, b"ping\n")
+            _, rcv = conn.receive_next(cursor, wait=2)
+            latencies.append(time.time() - st)
+
+            assert [data for _, _, data in rcv] == [b"ping\n"]
+
+        # polling would take about 10 ms; the quiet gap is 0.17 ms at 115200 baud
+        assert statistics.median(latencies) < 0.005
+    finally:
+        conn.disconnect()
+        os.close(master)
+        os.close(slave)
+
+
+def test_read_all_framer_no_gap() -> None:
+    """
+    With a framer, reading should stop when the serial buffer is empty instead of waiting for a quiet line
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", framer=DelimiterFramer(b"\n"))
+    ser = FakeSerial([b"ab", None, b"cd\n"])
+
+    assert conn._read_all(ser) == b"ab"
+    assert conn._read_all(ser) == b"cd\n"
+
+    # without a framer, data that arrives within the quiet gap is part of the same read
+    conn = Connection(115200, "/dev/ttyUSB0")
+    ser = FakeSerial([b"ab", None, b"cd\n"])
+
+    assert conn._read_all(ser) == b"abcd\n"
+
+
+def test_read_all_buffer() -> None:
+    """
+    Reads should go into the preallocated buffer, grow it for messages larger than it,
+    and group chunks until the line is quiet
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    buf = conn._read_buf
+    assert len(buf) == READ_BUFFER_SIZE
+
+    # chunks that arrive within the quiet gap are one message; two quiet checks end it
+    ser = FakeSerial([b"ab", b"cd", None, b"ef", None, None, b"gh"])
+    assert conn._read_all(ser) == b"abcdef"
+    assert ser.reads == [2, 2, 2]
+    assert conn._read_all(ser) == b"gh"
+
+    # read into the same buffer, not a new one
+    assert conn._read_buf is buf
+    assert len(buf) == READ_BUFFER_SIZE
+
+    # larger than the buffer
+    big = bytes(range(256)) * (READ_BUFFER_SIZE // 256) + b"tail"
+    ser = FakeSerial([big[:1000], big[1000:]])
+    assert conn._read_all(ser) == big
+    assert conn._read_buf is buf
+    assert len(buf) >= len(big)
+
+    # returned bytes do not change when the buffer is reused
+    first = conn._read_all(FakeSerial([b"first"]))
+    conn._read_all(FakeSerial([b"XXXXX"]))
+    assert first == b"first"
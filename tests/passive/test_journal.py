@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the receive journal.
+"""
+
+import os
+import threading
+import time
+import typing as t
+
+import pytest
+from com_server import Connection, ReceiveJournal
+from com_server import journal as journal_module
+from com_server.journal import INDEX_RECORD, JOURNAL_PREALLOCATE
+from com_server.tools import ReceiveBuffer
+
+
+def _fill(journal: ReceiveJournal, count: int, start: int = 1) -> None:
+    journal.append(
+        *[(seq, float(seq), str(seq).encode()) for seq in range(start, start + count)]
+    )
+
+
+def test_journal_append_get(tmp_path) -> None:
+    """
+    Tests that items can be found by sequence number and time
+    """
+
+    journal = ReceiveJournal(str(tmp_path))
+    assert len(journal) == 0
+    assert journal.last_seq == 0
+    assert journal.first_seq == 1
+    assert journal.get_seq(1) is None
+
+    _fill(journal, 100)
+
+    assert len(journal) == 100
+    assert journal.first_seq == 1
+    assert journal.last_seq == 100
+    assert journal.get_seq(42) == (42.0, b"42")
+    assert journal.get_seq(101) is None
+
+    assert journal.seq_at_time(41.5) == 42
+    assert journal.seq_at_time(0.0) == 1
+    assert journal.seq_at_time(1000.0) == 101
+
+    assert journal.entries(10, 12) == [
+        (10, 10.0, b"10"),
+        (11, 11.0, b"11"),
+        (12, 12.0, b"12"),
+    ]
+    assert [seq for seq, _, _ in journal.entries(95)] == list(range(95, 101))
+    assert len(journal.entries(limit=5)) == 5
+
+    journal.close()
+
+
+def test_journal_segments(tmp_path) -> None:
+    """
+    Tests that the journal is split into segments and reads across them
+    """
+
+    journal = ReceiveJournal(str(tmp_path), segment_size=20)
+    _fill(journal, 100)
+
+    assert len([n for n in os.listdir(tmp_path) if n.endswith(".idx")]) > 1
+    assert [seq for seq, _, _ in journal.entries()] == list(range(1, 101))
+    assert journal.get_seq(57) == (57.0, b"57")
+    assert journal.seq_at_time(63.5) == 64
+
+    journal.close()
+
+
+def test_journal_max_size(tmp_path) -> None:
+    """
+    Tests that the oldest segments are deleted when the journal is too large
+    """
+
+    journal = ReceiveJournal(str(tmp_path), segment_size=20, max_size=500)
+    _fill(journal, 100)
+
+    assert journal.disk_size <= 500
+    assert journal.first_seq > 1
+    assert journal.last_seq == 100
+    assert journal.get_seq(1) is None
+    assert journal.entries()[0][0] == journal.first_seq
+
+    journal.close()
+
+    with pytest.raises(ValueError):
+        ReceiveJournal(str(tmp_path), max_size=0)
+
+
+def test_journal_reopen(tmp_path) -> None:
+    """
+    Tests that a journal continues from its files and removes partially written items
+    """
+
+    journal = ReceiveJournal(str(tmp_path))
+    _fill(journal, 10)
+    journal.close()
+
+    # index written, but not the data of the last item
+    (idx,) = [n for n in os.listdir(tmp_path) if n.endswith(".idx")]
+    dat = os.path.join(tmp_path, idx[:-4] + ".dat")
+    os.truncate(dat, os.path.getsize(dat) - 1)
+
+    with open(os.path.join(tmp_path, idx), "ab") as f:
+        f.write(b"\x00" * (INDEX_RECORD.size // 2))
+
+    journal = ReceiveJournal(str(tmp_path))
+    assert journal.last_seq == 9
+
+    _fill(journal, 5, start=10)
+    assert [seq for seq, _, _ in journal.entries()] == list(range(1, 15))
+    assert journal.get_seq(10) == (10.0, b"10")
+
+    journal.close()
+
+
+def test_receive_buffer_journal(tmp_path) -> None:
+    """
+    Tests that the receive buffer adds items to the journal and continues its sequence numbers
+    """
+
+    journal = ReceiveJournal(str(tmp_path))
+    buf = ReceiveBuffer(4, journal=journal)
+    buf.push(*[(float(i), b"x") for i in range(10)])
+
+    assert len(buf) == 4
+    assert journal.last_seq == 10
+    assert journal.get_seq(1) == (0.0, b"x")
+
+    buf.clear()
+    journal.close()
+
+    buf = ReceiveBuffer(4, journal=ReceiveJournal(str(tmp_path)))
+    assert buf.last_seq == 10
+
+    buf.push((11.0, b"y"))
+    assert buf.last_seq == 11
+    assert buf.journal is not None and buf.journal.get_seq(11) == (11.0, b"y")
+
+
+def test_journal_outside_buffer_lock(tmp_path) -> None:
+    """
+    Tests that the receive buffer is not locked while items are written to the journal,
+    and that the journal still has every item that left the buffer when it is read
+    """
+
+    class _SlowJournal(ReceiveJournal):
+        def append(self, *items: t.Tuple[int, float, bytes]) -> None:
+            time.sleep(0.3)
+            super().append(*items)
+
+    journal = _SlowJournal(str(tmp_path))
+    buf = ReceiveBuffer(1, lock=threading.Condition(), journal=journal)
+
+    pusher = threading.Thread(target=lambda: buf.push((1.0, b"a"), (2.0, b"b")))
+    pusher.start()
+
+    while buf.last_seq < 2:
+        time.sleep(0.001)
+
+    # readers of the buffer do not wait for the disk
+    st = time.time()
+    assert buf[-1] == (2.0, b"b")
+    assert time.time() - st < 0.2
+
+    # nor do readers of the history, which includes the items being written
+    st = time.time()
+    assert buf.journal_entries(1) == [(1, 1.0, b"a"), (2, 2.0, b"b")]
+    assert buf.journal_entries(1, 1) == [(1, 1.0, b"a")]
+    assert buf.journal_seq_at_time(1.5) == 2
+    assert time.time() - st < 0.2
+
+    pusher.join()
+    assert journal.get_seq(1) == (1.0, b"a")
+    assert buf.journal_entries(2) == [(2, 2.0, b"b")]
+
+    journal.close()
+
+
+def test_journal_read_chunks(tmp_path, monkeypatch) -> None:
+    """
+    Tests that long ranges are read from the journal a chunk at a time
+    """
+
+    monkeypatch.setattr(journal_module, "JOURNAL_READ_CHUNK", 3)
+
+    journal = ReceiveJournal(str(tmp_path), segment_size=8)
+    _fill(journal, 10)
+
+    assert [seq for seq, _, _ in journal.entries()] == list(range(1, 11))
+    assert [seq for seq, _, _ in journal.entries(2, 8)] == list(range(2, 9))
+    assert [seq for seq, _, _ in journal.entries(2, limit=7)] == list(range(2, 9))
+    assert [seq for seq, _, _ in journal.entries(4, limit=3)] == [4, 5, 6]
+
+    journal.close()
+
+
+def test_journal_preallocate(tmp_path) -> None:
+    """
+    Tests that the files being written to grow in large steps, are cut to size when closed,
+    and that the unused space is ignored if the journal was not closed
+    """
+
+    journal = ReceiveJournal(str(tmp_path))
+    _fill(journal, 10)
+
+    (idx,) = [n for n in os.listdir(tmp_path) if n.endswith(".idx")]
+    idx = os.path.join(tmp_path, idx)
+    dat = idx[:-4] + ".dat"
+    assert os.path.getsize(idx) == os.path.getsize(dat) == JOURNAL_PREALLOCATE
+
+    # not closed (as if the program stopped); only the items written are used
+    for f in (journal._dat_file, journal._idx_file):
+        f.close()
+
+    reopened = ReceiveJournal(str(tmp_path))
+    assert reopened.last_seq == 10
+    assert reopened.get_seq(10) == (10.0, b"10")
+    assert os.path.getsize(idx) == 10 * INDEX_RECORD.size
+
+    _fill(reopened, 5, start=11)
+    assert [seq for seq, _, _ in reopened.entries()] == list(range(1, 16))
+
+    reopened.close()
+    assert os.path.getsize(idx) == 15 * INDEX_RECORD.size
+    assert os.path.getsize(dat) == reopened.disk_size - os.path.getsize(idx)
+
+
+def test_connection_journal_type(tmp_path) -> None:
+    """
+    Tests that the journal argument is checked
+    """
+
+    journal = ReceiveJournal(str(tmp_path))
+    assert Connection(115200, "/dev/ttyUSB0", journal=journal).journal is journal
+
+    with pytest.raises(TypeError):
+        Connection(115200, "/dev/ttyUSB0", journal=str(tmp_path))
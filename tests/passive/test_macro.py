@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests macros.
+"""
+
+import threading
+import time
+
+import pytest
+from com_server import Connection, ConnectionRoutes, Macro, MacroStep
+
+
+def _connection(**kwargs) -> Connection:
+    conn = Connection(115200, "/dev/ttyUSB0", **kwargs)
+    conn._conn = True  # pretend to be connected
+
+    return conn
+
+
+def test_macro_params() -> None:
+    """
+    Tests that parameters are found in the send templates and checked
+    """
+
+    macro = Macro(
+        MacroStep(send="MODE {mode}", expect="OK"),
+        MacroStep(send="RATE {rate} {{raw}}"),
+        MacroStep(expect=r"^READY$"),
+    )
+
+    assert macro.params == {"mode", "rate"}
+    assert len(macro.steps) == 3
+
+    with pytest.raises(ValueError):
+        macro.run(_connection(), {"mode": "fast"})
+
+    with pytest.raises(ValueError):
+        MacroStep()
+
+    with pytest.raises(ValueError):
+        MacroStep(send="{mode.__class__}")
+
+    with pytest.raises(ValueError):
+        MacroStep(send="{0}")
+
+    with pytest.raises(ValueError):
+        MacroStep(expect="(")
+
+    with pytest.raises(ValueError):
+        MacroStep(send="x", timeout=-1)
+
+    with pytest.raises(ValueError):
+        Macro()
+
+    with pytest.raises(TypeError):
+        Macro("MODE fast")  # type: ignore
+
+
+def test_macro_run() -> None:
+    """
+    Tests that steps send, wait for their responses, and stop at the first failure
+    """
+
+    conn = _connection(send_interval=0.05)
+    conn._rcv_queue.push((1.0, b"OK\n"))  # received before the macro, so ignored
+
+    macro = Macro(
+        MacroStep(send="MODE {mode}", expect="^OK$", timeout=2),
+        MacroStep(send="READ {what}", expect=r"^TEMP (\S+)$", timeout=2, ending="\n"),
+        MacroStep(expect="never", timeout=0.05),
+        MacroStep(send="not sent"),
+    )
+
+    def _device() -> None:
+        while len(conn._to_send) < 1:
+            time.sleep(0.005)
+        conn._rcv_queue.push((2.0, b"OK\n"))
+
+        while len(conn._to_send) < 2:
+            time.sleep(0.005)
+        conn._rcv_queue.push((3.0, b"hello\n"), (3.0, b"TEMP 21.5\n"))
+
+    device = threading.Thread(target=_device)
+    device.start()
+
+    results = macro.run(conn, {"mode": "fast", "what": "TEMP"})
+    device.join()
+
+    assert results == [
+        {"message": "OK", "sent": "MODE fast", "data": "OK", "groups": []},
+        {"message": "OK", "sent": "READ TEMP", "data": "TEMP 21.5", "groups": ["21.5"]},
+        {"message": "Nothing received", "sent": None},
+    ]
+
+    # the second step waited for the send interval instead of failing
+    assert list(conn._to_send) == [b"MODE fast\r\n", b"READ TEMP\n"]
+
+
+def test_add_macro() -> None:
+    """
+    Tests adding macros to ConnectionRoutes
+    """
+
+    handler = ConnectionRoutes(_connection())
+    macro = Macro(MacroStep(send="PING", expect="PONG"))
+
+    handler.add_macro("ping", macro)
+    assert handler.macros == {"ping": macro}
+
+    with pytest.raises(ValueError):
+        handler.add_macro("ping", macro)
+
+    with pytest.raises(TypeError):
+        handler.add_macro("pong", "PING")  # type: ignore
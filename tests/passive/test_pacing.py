@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests if wire time is calculated correctly and writes are paced.
+"""
+
+import pytest
+from com_server import Connection
+from com_server.tools import SendQueue, wire_time
+
+
+def test_wire_time() -> None:
+    """
+    Should count start, data, parity, and stop bits
+    """
+
+    assert wire_time(960, 9600) == pytest.approx(1.0)
+    assert wire_time(800, 9600, bytesize=8, parity="E", stopbits=2) == pytest.approx(
+        1.0
+    )
+    assert wire_time(1, 9600, bytesize=7, stopbits=1.5) == pytest.approx(9.5 / 9600)
+
+
+def test_paced_chunk() -> None:
+    """
+    Should not write more than the device buffer size ahead of the wire
+    """
+
+    conn = Connection(9600, "/dev/ttyUSB0", pace_writes=True, device_buffer_size=10)
+    sq = SendQueue([b"abcdefgh", b"ijklmnop"])
+
+    assert conn._take_paced_chunk(sq) == b"abcdefghij"
+
+    # nothing has gone through the wire yet
+    assert conn._take_paced_chunk(sq) == b""
+
+    # pretend everything has gone through
+    conn._wire_free_at = 0.0
+    assert conn._take_paced_chunk(sq) == b"klmnop"
+    assert len(sq) == 0
+
+
+def test_paced_default_limit() -> None:
+    """
+    Without a device buffer size, should write about 0.05 seconds ahead
+    """
+
+    conn = Connection(9600, "/dev/ttyUSB0", pace_writes=True)
+    sq = SendQueue([b"a" * 1000])
+
+    assert len(conn._take_paced_chunk(sq)) == 48
+
+
+def test_device_buffer_size_invalid() -> None:
+    """
+    Should raise ValueError if device buffer size is not positive
+    """
+
+    with pytest.raises(ValueError):
+        Connection(9600, "/dev/ttyUSB0", pace_writes=True, device_buffer_size=0)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests poll jobs.
+"""
+
+import sys
+import threading
+import time
+
+import pytest
+from com_server import Connection, ConnectionRoutes, Poller, PollJob
+from com_server.tools import ReadWriteLock
+
+
+def _connection() -> Connection:
+    conn = Connection(115200, "/dev/ttyUSB0", send_interval=0)
+    conn._conn = True  # pretend to be connected
+
+    return conn
+
+
+def _device(conn: Connection, stop: threading.Event) -> threading.Thread:
+    """Answers every command in the send queue with "TEMP <number of commands>" """
+
+    def _run() -> None:
+        answered = 0
+        while not stop.is_set():
+            if len(conn._to_send) > answered:
+                answered += 1
+                conn._rcv_queue.push((time.time(), f"TEMP {answered}\n".encode()))
+
+            time.sleep(0.001)
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+
+    return thread
+
+
+def test_poll_job() -> None:
+    """
+    Tests that a poll caches the response and counts failures
+    """
+
+    conn = _connection()
+    job = PollJob("READ {TEMP}", 1, expect=r"^TEMP (\d+)$")
+
+    assert job.latest is None
+
+    stop = threading.Event()
+    device = _device(conn, stop)
+
+    st = time.time()
+    assert job.poll(conn)
+    stop.set()
+    device.join()
+
+    assert list(conn._to_send) == [b"READ {TEMP}\r\n"]
+    assert job.latest is not None
+    assert job.latest["data"] == "TEMP 1"
+    assert job.latest["groups"] == ["1"]
+    assert st <= job.latest["timestamp"] <= time.time()
+
+    # no response; the cached one is kept
+    job = PollJob("READ TEMP", 1, timeout=0.05)
+    assert not job.poll(conn)
+    assert job.failures == 1
+    assert job.latest is None
+
+    with pytest.raises(ValueError):
+        PollJob("READ TEMP", 0)
+
+    with pytest.raises(ValueError):
+        PollJob("READ TEMP", 1, timeout=-1)
+
+
+def test_poller() -> None:
+    """
+    Tests that jobs are sent once per interval and skipped while the lock is held
+    """
+
+    conn = _connection()
+    lock = ReadWriteLock()
+    poller = Poller(conn, lock)
+
+    job = PollJob("READ TEMP", 0.05, timeout=0.04)
+    poller.add("temp", job)
+
+    stop = threading.Event()
+    device = _device(conn, stop)
+
+    poller.start()
+    time.sleep(0.275)
+
+    # held by something else for longer than the interval
+    lock.acquire()
+    time.sleep(0.15)
+    lock.release()
+
+    poller.stop()
+    stop.set()
+    device.join()
+
+    assert 4 <= len(conn._to_send) <= 8
+    assert job.skipped >= 1
+
+    # skipped polls are not counted as rejected requests
+    assert lock.stats()["timed_out"] == 0
+    assert job.latest is not None and job.latest["data"].startswith("TEMP")
+    assert not poller.running
+
+    with pytest.raises(ValueError):
+        poller.add("temp", job)
+
+    with pytest.raises(TypeError):
+        poller.add("other", "READ TEMP")  # type: ignore
+
+    with pytest.raises(TypeError):
+        Poller("/dev/ttyUSB0")  # type: ignore
+
+
+def test_add_while_running() -> None:
+    """
+    Tests that jobs can be added while the poller is running
+    """
+
+    conn = Connection(
+        115200, "/dev/ttyUSB0"
+    )  # disconnected, so every poll is skipped right away
+    poller = Poller(conn)
+    poller.add("first", PollJob("READ", 0.001))
+    poller.start()
+
+    jobs = [PollJob(f"READ {i}", 0.001) for i in range(2000)]
+
+    # switch threads often, so that jobs are added while the poller goes through them
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for i, job in enumerate(jobs):
+            poller.add(str(i), job)
+    finally:
+        sys.setswitchinterval(interval)
+
+    deadline = time.time() + 5
+    while any(job.skipped == 0 for job in jobs) and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert poller._thread is not None and poller._thread.is_alive()
+    poller.stop()
+
+    assert all(job.skipped > 0 for job in jobs)
+
+
+def test_default_timeout() -> None:
+    """
+    Tests that a poll waits a quarter of the interval for a response by default
+    """
+
+    conn = _connection()
+    job = PollJob("READ TEMP", 0.4)
+
+    st = time.time()
+    assert not job.poll(conn)
+    assert 0.08 <= time.time() - st < 0.3
+
+
+def test_add_poll() -> None:
+    """
+    Tests adding poll jobs to ConnectionRoutes
+    """
+
+    handler = ConnectionRoutes(_connection())
+    job = PollJob("READ TEMP", 1)
+
+    handler.add_poll("temp", job)
+    assert handler.polls == {"temp": job}
+
+    with pytest.raises(ValueError):
+        handler.add_poll("temp", job)
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests if the send rate limiter schedules sends correctly.
+"""
+
+import pytest
+from com_server import Connection, SendRateLimiter
+
+
+def test_message_burst() -> None:
+    """
+    A burst should be sent right away and the rest paced at the message rate
+    """
+
+    rl = SendRateLimiter(10, message_burst=3)
+    times = [rl.reserve(1, now=100.0) for _ in range(5)]
+
+    assert times[:3] == [100.0, 100.0, 100.0]
+    assert times[3] == pytest.approx(100.1)
+    assert times[4] == pytest.approx(100.2)
+
+
+def test_byte_rate() -> None:
+    """
+    Large messages should wait for enough bytes
+    """
+
+    rl = SendRateLimiter(bytes_per_sec=100)
+
+    assert rl.reserve(100, now=0.0) == 0.0
+    assert rl.reserve(50, now=0.0) == pytest.approx(0.5)
+
+    # refilled after waiting
+    assert rl.reserve(50, now=10.0) == 10.0
+
+
+def test_both_limits() -> None:
+    """
+    The slower of the two limits should be used
+    """
+
+    rl = SendRateLimiter(100, bytes_per_sec=10, byte_burst=10)
+
+    assert rl.reserve(10, now=0.0) == 0.0
+    assert rl.reserve(10, now=0.0) == pytest.approx(1.0)
+
+
+def test_reset() -> None:
+    """
+    reset() should allow a full burst again
+    """
+
+    rl = SendRateLimiter(1)
+    rl.reserve(1)
+    rl.reserve(1)
+    rl.reset()
+
+    assert rl.reserve(1, now=0.0) == 0.0
+
+
+def test_invalid_args() -> None:
+    """
+    Invalid arguments should raise errors
+    """
+
+    with pytest.raises(ValueError):
+        SendRateLimiter()
+
+    with pytest.raises(ValueError):
+        SendRateLimiter(0)
+
+    with pytest.raises(TypeError):
+        Connection(115200, "/dev/ttyUSB0", rate_limiter=10)  # type: ignore
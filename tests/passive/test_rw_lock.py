@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the reader/writer lock used by `ConnectionRoutes`.
+"""
+
+import threading
+import time
+
+import pytest
+from com_server.tools import LockQueueFullException, ReadWriteLock
+
+
+def _acquire_later(lock: ReadWriteLock, shared: bool, order: list) -> threading.Thread:
+    """Acquires the lock in a new thread, adding to `order` when it gets it, then releases it"""
+
+    def _run() -> None:
+        lock.acquire(shared)
+        order.append("shared" if shared else "exclusive")
+        time.sleep(0.05)
+        lock.release(shared)
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+
+    return thread
+
+
+def test_shared_together() -> None:
+    """
+    Shared holders should not wait for each other
+    """
+
+    lock = ReadWriteLock()
+
+    assert lock.acquire(shared=True)
+    assert lock.acquire(shared=True, timeout=0)
+    assert lock.holders == 2
+    assert not lock.acquire(timeout=0.05)
+
+    lock.release(shared=True)
+    lock.release(shared=True)
+
+    assert lock.acquire(timeout=0)
+    assert not lock.acquire(shared=True, timeout=0.05)
+    assert lock.waiting == 0
+
+    lock.release()
+    assert lock.holders == 0
+
+
+def test_first_come_first_served() -> None:
+    """
+    A shared request should wait behind an exclusive request that came before it
+    """
+
+    lock = ReadWriteLock()
+    order: list = []
+
+    lock.acquire(shared=True)
+
+    writer = _acquire_later(lock, False, order)
+    while lock.waiting < 1:
+        time.sleep(0.001)
+
+    reader = _acquire_later(lock, True, order)
+    while lock.waiting < 2:
+        time.sleep(0.001)
+
+    # a shared holder does not let the later reader skip ahead of the writer
+    assert not lock.acquire(shared=True, timeout=0.05)
+
+    lock.release(shared=True)
+    writer.join()
+    reader.join()
+
+    assert order == ["exclusive", "shared"]
+    assert (lock.waiting, lock.holders) == (0, 0)
+
+
+def test_timeout_lets_others_go() -> None:
+    """
+    A waiter that times out should not block the ones behind it
+    """
+
+    lock = ReadWriteLock()
+    lock.acquire(shared=True)
+
+    # exclusive waiter in front gives up
+    result: list = []
+    thread = threading.Thread(target=lambda: result.append(lock.acquire(timeout=0.1)))
+    thread.start()
+
+    while lock.waiting < 1:
+        time.sleep(0.001)
+
+    st = time.time()
+    assert lock.acquire(shared=True, timeout=2)
+    assert time.time() - st < 1
+
+    thread.join()
+    assert result == [False]
+
+
+def test_max_waiting() -> None:
+    """
+    Should raise instead of waiting when the queue is full, and count rejections and timeouts
+    """
+
+    lock = ReadWriteLock(max_waiting=1)
+    assert lock.max_waiting == 1
+
+    lock.acquire()
+
+    thread = threading.Thread(target=lambda: lock.acquire(shared=True, timeout=0.2))
+    thread.start()
+
+    while lock.waiting < 1:
+        time.sleep(0.001)
+
+    with pytest.raises(LockQueueFullException):
+        lock.acquire(shared=True, timeout=5)
+
+    thread.join()
+
+    assert lock.stats() == {
+        "waiting": 0,
+        "holders": 1,
+        "max_waiting": 1,
+        "rejected": 1,
+        "timed_out": 1,
+    }
+
+    # not counted
+    assert not lock.acquire(timeout=0, count=False)
+    assert lock.timed_out == 1
+
+    lock.release()
+
+    # a full queue does not stop threads that do not have to wait
+    lock = ReadWriteLock(max_waiting=0)
+    assert lock.acquire(shared=True)
+    assert lock.acquire(shared=True)
+
+    with pytest.raises(LockQueueFullException):
+        lock.acquire(timeout=5)
+
+    with pytest.raises(LockQueueFullException):
+        lock.acquire(timeout=5, count=False)
+
+    assert lock.rejected == 1
+
+    with pytest.raises(ValueError):
+        ReadWriteLock(max_waiting=-1)
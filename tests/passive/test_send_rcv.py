@@ -5,8 +5,13 @@
 Tests if send queue and receive queue are working properly.
 """
 
+import time
+
 import pytest
+from com_server import Connection
+from com_server.base_connection import SEND_QUEUE_MAX_SIZE
 from com_server.tools import SendQueue, ReceiveQueue
+from fake_serial import FakeSerial
 
 SEND_LIST_TEST = [b"a\n", b"b\n", b"c\n", b"d\n"]
 RCV_LIST_TEST = [(0.0, b"a\n"), (0.1, b"b\n"), (0.2, b"c\n"), (0.3, b"d\n")]
@@ -145,3 +150,173 @@ def test_send_rcv_changed() -> None:
 
     assert len(sq) == len(sq_p) - 1
     assert len(rcv_q) == len(rcv_q_p) + 2
+
+
+def test_rcv_queue_keeps_newest() -> None:
+    """
+    Tests that the receive queue removes the oldest items when full
+    and keeps the newest items in order
+    """
+
+    rq = ReceiveQueue(RCV_LIST_TEST.copy(), TEST_QUEUE_SIZE)
+    rq.pushitems(*[str(i).encode() for i in range(100)])
+
+    items = rq.copy()
+
+    assert len(items) == TEST_QUEUE_SIZE
+    assert [data for _, data in items] == [
+        str(i).encode() for i in range(100 - TEST_QUEUE_SIZE, 100)
+    ]
+
+
+def test_rcv_queue_max_bytes() -> None:
+    """
+    Tests that the receive queue removes the oldest items when the
+    total size is too large, but always keeps the newest item
+    """
+
+    rq = ReceiveQueue([], TEST_QUEUE_SIZE, max_bytes=10)
+    rq.pushitems(b"abcd", b"efgh", b"ijkl")
+
+    assert [data for _, data in rq.copy()] == [b"efgh", b"ijkl"]
+    assert rq._rcv_queue.nbytes == 8
+
+    rq.pushitems(b"x" * 20)
+
+    assert [data for _, data in rq.copy()] == [b"x" * 20]
+    assert rq._rcv_queue.nbytes == 20
+
+    # removed items are dropped from memory eventually
+    for _ in range(10):
+        rq.pushitems(b"abcdefghij")
+
+    assert len(rq._rcv_queue._store) <= 2
+
+
+def test_send_queue_coalesce() -> None:
+    """
+    Joining the send queue should stop before the byte limit but take at least one object
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", coalesce_bytes=5)
+    sq = SendQueue([b"ab", b"cd", b"ef", b"ghijklm", b"n"])
+
+    assert conn._join_send_queue(sq) == b"abcd"
+    assert conn._join_send_queue(sq) == b"ef"
+    assert conn._join_send_queue(sq) == b"ghijklm"
+    assert conn._join_send_queue(sq) == b"n"
+    assert len(sq) == 0
+
+
+def test_full_send_queue_keeps_interval() -> None:
+    """
+    A send rejected because the send queue is full should not start a new send interval
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", send_interval=0.5)
+    conn._conn = True  # pretend to be connected
+    conn._last_sent = 0.0
+
+    conn._to_send.extend([b"x"] * SEND_QUEUE_MAX_SIZE)
+    assert not conn.send("full")
+
+    conn._to_send.popleft()
+    assert conn.send("room")
+    assert not conn.send("too soon")
+
+
+def test_queue_bytes_waits_for_interval() -> None:
+    """
+    queue_bytes() with `wait` should wait out the send interval instead of failing
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", send_interval=0.2)
+    conn._conn = True  # pretend to be connected
+    conn._last_sent = 0.0
+
+    assert conn.queue_bytes(b"first") is not None
+    assert conn.queue_bytes(b"no wait") is None
+    assert conn.queue_bytes(b"short wait", wait=0.05) is None
+
+    start = time.time()
+    assert conn.queue_bytes(b"second", wait=1) is not None
+    assert 0.1 < time.time() - start < 0.5
+
+    assert list(conn._to_send) == [b"first", b"second"]
+
+
+def test_cycle_consumes_send_queue_in_place() -> None:
+    """
+    The IO thread should write and pop the connection's own send queue, not a copy of it
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", send_interval=0)
+    conn._conn = FakeSerial()
+    conn._cyc_func = conn._default_cycle
+
+    to_send = conn._to_send
+    to_send.extend([b"a\n", b"b\n", b"c\n"])
+
+    # wraps the deque instead of copying it
+    send_queue = SendQueue(to_send)
+    send_queue.pop()
+    assert list(to_send) == [b"b\n", b"c\n"]
+
+    conn._cyc()
+
+    assert conn._conn.written == [b"b\n", b"c\n"]
+    assert conn._to_send is to_send
+    assert len(to_send) == 0
+
+
+def test_cycle_flushes_only_after_writing() -> None:
+    """
+    A cycle that writes nothing should not flush, since flushing waits for the serial port
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", send_interval=0)
+    conn._conn = FakeSerial([b"hello\n"])
+    conn._cyc_func = conn._default_cycle
+
+    conn._cyc()
+    assert conn._conn.flushes == 0
+
+    conn._to_send.extend([b"a\n", b"b\n"])
+    conn._cyc()
+    assert conn._conn.flushes == 2
+
+    # one write, so one flush
+    conn._coalesce_bytes = 64
+    conn._to_send.extend([b"a\n", b"b\n"])
+    conn._cyc()
+    conn._cyc()
+    assert conn._conn.written[2:] == [b"a\nb\n"]
+    assert conn._conn.flushes == 3
+
+
+def test_cycle_pushes_to_receive_queue_directly() -> None:
+    """
+    The IO thread should push into the connection's own receive queue, not a copy of it
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = FakeSerial([b"hello\n"])
+    conn._cyc_func = conn._default_cycle
+
+    rcv_queue = conn._rcv_queue
+    rcv_queue.push((1.0, b"old"))
+
+    conn._cyc()
+
+    assert conn._rcv_queue is rcv_queue
+    assert [data for _, data in rcv_queue.since(0)] == [b"old", b"hello\n"]
+
+    # items pushed by a custom cycle are in the receive queue as soon as they are pushed
+    def _cycle(_, rcv_queue: ReceiveQueue, __) -> None:
+        rcv_queue.pushitems(b"custom")
+        assert conn._rcv_queue[-1][1] == b"custom"
+
+    conn._cyc_func = _cycle
+    conn._cyc()
+
+    assert conn._rcv_queue.last_seq == 3
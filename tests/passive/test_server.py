@@ -1,15 +1,34 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import threading
+import time
+import typing as t
+import urllib.error
+import urllib.request
+from unittest import mock
+
 from com_server import (
+    ACCESS_SHARED,
+    ACCESS_UNLOCKED,
+    ROUTE_MAX_STREAMS,
+    ROUTE_MAX_WAIT,
+    ROUTE_MAX_WAITING,
     Connection,
+    start_app,
     start_conns,
     ConnectionRoutes,
     ConnectionResource,
     DuplicatePortException,
+    RestApiHandler,
+    api_server,
+    server,
 )
-from flask_restful import Resource
+from flask import Flask
+from flask_restful import Api, Resource
+from werkzeug.exceptions import HTTPException
 import pytest
+import waitress
 
 
 def test_subclass_type_exception() -> None:
@@ -184,3 +203,247 @@ def test_other_method_still_copied() -> None:
     cls = h1.all_resources["/route1"]
 
     assert hasattr(cls, "non_http_method")
+
+
+def test_resource_access() -> None:
+    """
+    Shared resources should run together, exclusive ones alone, and unlocked ones always
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    handler = ConnectionRoutes(conn, max_wait=0)
+
+    @handler.add_resource("/exclusive")
+    class Exclusive(ConnectionResource):
+        def get(self):
+            return "exclusive"
+
+    @handler.add_resource("/shared")
+    class Shared(ConnectionResource):
+        access = ACCESS_SHARED
+
+        def get(self):
+            return "shared"
+
+    @handler.add_resource("/unlocked")
+    class Unlocked(ConnectionResource):
+        access = ACCESS_UNLOCKED
+
+        def get(self):
+            return "unlocked"
+
+    # a shared resource is running
+    assert handler._lock.acquire(shared=True)
+
+    assert Shared().get() == "shared"
+    assert Unlocked().get() == "unlocked"
+
+    with pytest.raises(HTTPException) as e:
+        Exclusive().get()
+
+    assert e.value.code == 503
+
+    handler._lock.release(shared=True)
+
+    # an exclusive resource is running
+    assert handler._lock.acquire()
+
+    with pytest.raises(HTTPException):
+        Shared().get()
+
+    assert Unlocked().get() == "unlocked"
+
+    handler._lock.release()
+
+    assert Exclusive().get() == "exclusive"
+    assert handler._lock.holders == 0
+
+    with pytest.raises(ValueError):
+
+        @handler.add_resource("/invalid")
+        class Invalid(ConnectionResource):
+            access = "invalid"
+
+    with pytest.raises(ValueError):
+        ConnectionRoutes(conn, max_wait=-1)
+
+
+def test_resource_waits_for_access() -> None:
+    """
+    A resource should wait for the connection instead of responding with 503 right away
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    handler = ConnectionRoutes(conn, max_wait=5)
+
+    @handler.add_resource("/exclusive")
+    class Exclusive(ConnectionResource):
+        def get(self):
+            return "exclusive"
+
+    assert handler._lock.acquire()
+    threading.Timer(0.1, handler._lock.release).start()
+
+    st = time.time()
+    assert Exclusive().get() == "exclusive"
+    assert 0.05 < time.time() - st < 1
+
+
+def test_resource_queue_full() -> None:
+    """
+    A resource should respond with 503 and Retry-After right away when too many requests are waiting
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    handler = ConnectionRoutes(conn, max_wait=2.5, max_waiting=0)
+
+    @handler.add_resource("/exclusive")
+    class Exclusive(ConnectionResource):
+        def get(self):
+            return "exclusive"
+
+    assert Exclusive.routes is handler
+    assert handler._lock.acquire()
+
+    st = time.time()
+    with pytest.raises(HTTPException) as e:
+        Exclusive().get()
+
+    assert time.time() - st < 1
+    assert e.value.code == 503
+    assert e.value.get_response().headers["Retry-After"] == "3"
+    assert handler.wait_stats["rejected"] == 1
+
+    handler._lock.release()
+    assert Exclusive().get() == "exclusive"
+
+    with pytest.raises(ValueError):
+        ConnectionRoutes(conn, max_waiting=-1)
+
+    with pytest.raises(ValueError):
+        ConnectionRoutes(conn, max_streams=-1)
+
+
+def test_start_app_threads(monkeypatch) -> None:
+    """
+    start_app() should serve with enough threads for max_waiting and max_streams
+    """
+
+    served = {}
+    monkeypatch.setattr(server.waitress, "serve", lambda app, **kw: served.update(kw))
+    monkeypatch.setattr(server, "start_conns", lambda *args, **kwargs: None)
+    monkeypatch.setattr(server, "disconnect_conns", lambda *routes: None)
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+
+    start_app(Flask(__name__), Api(), ConnectionRoutes(conn))
+    assert served["threads"] == ROUTE_MAX_WAITING + ROUTE_MAX_STREAMS + 4
+
+    handler = ConnectionRoutes(conn, max_waiting=4, max_streams=2)
+    start_app(Flask(__name__), Api(), handler)
+    assert served["threads"] == 10
+
+    start_app(Flask(__name__), Api(), handler, threads=20)
+    assert served["threads"] == 20
+
+    with pytest.raises(ValueError):
+        start_app(Flask(__name__), Api(), handler, threads=9)
+
+
+def test_rest_api_handler_threads(monkeypatch) -> None:
+    """
+    RestApiHandler.run() should serve with enough threads for max_waiting unless threads is given
+    """
+
+    served = {}
+    monkeypatch.setattr(
+        api_server.waitress, "serve", lambda app, **kw: served.update(kw)
+    )
+    monkeypatch.setattr(api_server.disconnect, "Reconnector", mock.MagicMock())
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    monkeypatch.setattr(conn, "disconnect", lambda: None)
+    conn._conn = True  # pretend to be connected
+
+    RestApiHandler(conn).run()
+    assert served["threads"] == ROUTE_MAX_WAITING + 4
+
+    RestApiHandler(conn).run(threads=2)
+    assert served["threads"] == 2
+
+
+def test_start_app_queue_full(monkeypatch) -> None:
+    """
+    With the default settings of start_app(), the wait queue should fill up and respond with 503
+    """
+
+    servers = []
+
+    def _serve(app, **kwargs):
+        servers.append(waitress.create_server(app, **kwargs))
+        try:
+            servers[0].run()
+        except OSError:
+            # closed at the end of the test
+            pass
+
+    monkeypatch.setattr(server.waitress, "serve", _serve)
+    monkeypatch.setattr(server, "start_conns", lambda *args, **kwargs: None)
+    monkeypatch.setattr(server, "disconnect_conns", lambda *routes: None)
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    handler = ConnectionRoutes(conn)
+    release = threading.Event()
+
+    @handler.add_resource("/exclusive")
+    class Exclusive(ConnectionResource):
+        def get(self):
+            release.wait(5)
+            return "exclusive"
+
+    app = Flask(__name__)
+    thread = threading.Thread(
+        target=start_app,
+        args=(app, Api(app), handler),
+        kwargs={"host": "127.0.0.1", "port": 0},
+        daemon=True,
+    )
+    thread.start()
+
+    while not servers:
+        time.sleep(0.01)
+
+    url = f"http://127.0.0.1:{servers[0].effective_port}/exclusive"
+    statuses: t.List[int] = []
+
+    def _get() -> None:
+        with urllib.request.urlopen(url) as res:
+            statuses.append(res.status)
+
+    # one request holds the connection and the rest wait
+    getters = [threading.Thread(target=_get) for _ in range(ROUTE_MAX_WAITING + 1)]
+    for getter in getters:
+        getter.start()
+
+    st = time.time()
+    while handler.wait_stats["waiting"] < ROUTE_MAX_WAITING and time.time() - st < 5:
+        time.sleep(0.01)
+
+    with pytest.raises(urllib.error.HTTPError) as e:
+        urllib.request.urlopen(url)
+
+    assert e.value.code == 503
+    assert e.value.headers["Retry-After"] == str(int(ROUTE_MAX_WAIT))
+
+    release.set()
+    for getter in getters:
+        getter.join()
+
+    assert statuses == [200] * (ROUTE_MAX_WAITING + 1)
+
+    servers[0].close()
+    thread.join(1)
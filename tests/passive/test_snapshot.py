@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests if receive queue snapshots share items and do not change.
+"""
+
+import pytest
+from com_server import Connection, ConnectException
+from com_server.tools import ReceiveBuffer
+
+RCV_LIST_TEST = [(0.0, b"a\n"), (0.1, b"b\n"), (0.2, b"c\n"), (0.3, b"d\n")]
+
+
+def test_snapshot_items() -> None:
+    """
+    Snapshot should contain the same items as the buffer
+    """
+
+    buf = ReceiveBuffer(4)
+    buf.push(*RCV_LIST_TEST)
+    snap = buf.snapshot()
+
+    assert list(snap) == RCV_LIST_TEST
+    assert snap[-1] == RCV_LIST_TEST[-1]
+    assert (snap.first_seq, snap.last_seq) == (1, 4)
+
+
+def test_snapshot_unchanged() -> None:
+    """
+    Snapshot should not change when items are pushed, removed, or cleared
+    """
+
+    buf = ReceiveBuffer(4)
+    buf.push(*RCV_LIST_TEST)
+    snap = buf.snapshot()
+
+    for i in range(10):
+        buf.push((1.0 + i, b"new"))
+
+    assert list(snap) == RCV_LIST_TEST
+
+    buf.clear()
+    assert list(snap) == RCV_LIST_TEST
+    assert len(buf.snapshot()) == 0
+
+
+def test_snapshot_slice() -> None:
+    """
+    Slicing should work by index and by sequence number
+    """
+
+    buf = ReceiveBuffer(2)
+    buf.push(*RCV_LIST_TEST)  # seqs 3 and 4 left
+    snap = buf.snapshot()
+
+    assert list(snap[1:]) == RCV_LIST_TEST[3:]
+    assert snap[1:].first_seq == 4
+    assert snap[::-1] == RCV_LIST_TEST[:1:-1]
+
+    assert list(snap.seq_range(1, 3)) == RCV_LIST_TEST[2:3]
+    assert list(snap.seq_range(start_seq=4)) == RCV_LIST_TEST[3:]
+    assert len(snap.seq_range(10)) == 0
+    assert snap.get_seq(3) == RCV_LIST_TEST[2]
+    assert snap.get_seq(2) is None
+
+    with pytest.raises(IndexError):
+        snap[2]
+
+
+def test_snapshot_exception() -> None:
+    """
+    Should raise ConnectException if not connected
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+
+    with pytest.raises(ConnectException):
+        conn.snapshot()
+
+
+def test_empty_items() -> None:
+    """
+    Empty bytes objects should be stored and read correctly
+    """
+
+    buf = ReceiveBuffer(3)
+    buf.push((0.0, b""), (0.1, b"ab"), (0.2, b""), (0.3, b"c"))
+
+    assert buf.copy() == [(0.1, b"ab"), (0.2, b""), (0.3, b"c")]
+    assert buf.nbytes == 3
@@ -1,8 +1,21 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-from com_server import Connection, ConnectionRoutes, RestApiHandler
-from com_server.api import V1
+import time
+
+from com_server import (
+    Connection,
+    ConnectionRoutes,
+    Macro,
+    MacroStep,
+    PollJob,
+    ReceiveJournal,
+    RestApiHandler,
+    add_resources,
+)
+from com_server.api import V1, v1
+from flask import Flask
+from flask_restful import Api
 import pytest
 
 
@@ -21,9 +34,14 @@ def test_all_routes_being_added() -> None:
         "/send",
         "/receive/<int:num_before>",
         "/receive",
+        "/receive/next",
+        "/stream",
         "/get",
         "/first_response",
         "/send_until",
+        "/batch",
+        "/macros/<string:name>",
+        "/polls/<string:name>",
         "/connection_state",
         "/all_ports",
     ]
@@ -40,3 +58,397 @@ def test_not_connection_routes_raises_exception() -> None:
 
     with pytest.raises(TypeError):
         V1(handler)
+
+
+def test_stream_events() -> None:
+    """Tests that /stream sends received data as events and resumes from Last-Event-ID"""
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    conn._rcv_queue.push((1.0, b"temp 20\n"), (2.0, b"hum 40\n"), (3.0, b"temp 21\n"))
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    res = client.get("/v1/stream?match=^temp", headers={"Last-Event-ID": "0"})
+    assert res.mimetype == "text/event-stream"
+
+    events = next(res.response).decode()
+    assert events == (
+        'id: 1\ndata: {"timestamp": 1.0, "data": "temp 20"}\n\n'
+        'id: 3\ndata: {"timestamp": 3.0, "data": "temp 21"}\n\n'
+    )
+
+    # stops when disconnected
+    conn._conn = None
+    assert list(res.response) == []
+
+    conn._conn = True
+    assert client.get("/v1/stream?match=(").status_code == 400
+
+
+def test_stream_non_utf8() -> None:
+    """Tests that /stream keeps going when a frame is not valid UTF-8"""
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    conn._rcv_queue.push((1.0, b"\xc0\xff\x01"), (2.0, b"ok\n"))
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    res = client.get("/v1/stream?cursor=0")
+    assert next(res.response).decode() == (
+        'id: 1\ndata: {"timestamp": 1.0, "data": "\\ufffd\\ufffd\\u0001"}\n\n'
+        'id: 2\ndata: {"timestamp": 2.0, "data": "ok"}\n\n'
+    )
+
+    conn._conn = None
+    assert list(res.response) == []
+
+    conn._conn = True
+    assert client.get("/v1/receive?since=0").get_json()["data"] == [
+        "\ufffd\ufffd\x01",
+        "ok",
+    ]
+
+
+def test_stream_limit() -> None:
+    """Tests that streams and long polls past max_streams respond with 503"""
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+    conn._rcv_queue.push((1.0, b"a\n"))
+
+    handler = ConnectionRoutes(conn, max_streams=1)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    stream = client.get("/v1/stream?cursor=0")
+    assert stream.status_code == 200
+    assert handler.wait_stats["streams"] == 1
+
+    assert client.get("/v1/stream").status_code == 503
+    assert client.get("/v1/receive/next?cursor=1&wait=0.1").status_code == 503
+
+    # returns right away when there is data, so it does not need a slot
+    assert client.get("/v1/receive/next?cursor=0&wait=0.1").status_code == 200
+
+    stream.close()
+    assert handler.wait_stats["streams"] == 0
+
+    st = time.time()
+    res = client.get("/v1/receive/next?cursor=1&wait=0.1")
+    assert res.status_code == 200 and res.get_json()["seqs"] == []
+    assert time.time() - st >= 0.1
+    assert handler.wait_stats["streams"] == 0
+
+
+def test_receive_range_limit(tmp_path, monkeypatch) -> None:
+    """Tests that a time range from /receive has a default and a maximum limit, even with a journal"""
+
+    monkeypatch.setattr(v1, "RECEIVE_RANGE_DEFAULT_LIMIT", 3)
+    monkeypatch.setattr(v1, "RECEIVE_RANGE_MAX_LIMIT", 5)
+
+    conn = Connection(
+        115200, "/dev/ttyUSB0", queue_size=2, journal=ReceiveJournal(str(tmp_path))
+    )
+    conn._conn = True  # pretend to be connected
+    conn._rcv_queue.push(*[(float(i), b"x") for i in range(10)])
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    assert client.get("/v1/receive?since=0").get_json()["seqs"] == [1, 2, 3]
+    assert client.get("/v1/receive?until=9").get_json()["seqs"] == [1, 2, 3]
+    assert client.get("/v1/receive?limit=4").get_json()["seqs"] == [1, 2, 3, 4]
+    assert client.get("/v1/receive?limit=100").get_json()["seqs"] == [1, 2, 3, 4, 5]
+    assert client.get("/v1/receive?since=8&limit=100").get_json()["seqs"] == [9, 10]
+    assert client.get("/v1/receive?limit=-1").status_code == 400
+
+    conn.journal.close()
+
+
+def test_receive_next_limit(tmp_path) -> None:
+    """Tests that /receive/next from cursor 0 with a journal returns at most the default limit"""
+
+    conn = Connection(
+        115200, "/dev/ttyUSB0", queue_size=2, journal=ReceiveJournal(str(tmp_path))
+    )
+    conn._conn = True  # pretend to be connected
+    count = v1.RECEIVE_RANGE_DEFAULT_LIMIT + 500
+    conn._rcv_queue.push(*[(float(i), b"x") for i in range(count)])
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    res = client.get("/v1/receive/next?cursor=0").get_json()
+    assert res["seqs"] == list(range(1, v1.RECEIVE_RANGE_DEFAULT_LIMIT + 1))
+    assert res["cursor"] == v1.RECEIVE_RANGE_DEFAULT_LIMIT
+
+    # the rest, from the returned cursor
+    res = client.get(f"/v1/receive/next?cursor={res['cursor']}").get_json()
+    assert len(res["seqs"]) == 500
+
+    # a cursor from the future reads from now on, not from the beginning
+    res = client.get(f"/v1/receive/next?cursor={count + 100}").get_json()
+    assert res["seqs"] == [] and res["cursor"] == count
+
+    limit = v1.RECEIVE_RANGE_MAX_LIMIT + 1
+    assert client.get(f"/v1/receive/next?limit={limit}").status_code == 400
+
+    conn.journal.close()
+
+
+def test_batch() -> None:
+    """Tests that /batch runs every operation in order and checks them before running any"""
+
+    conn = Connection(115200, "/dev/ttyUSB0", timeout=0.2, send_interval=0)
+    conn._conn = True  # pretend to be connected
+    conn._rcv_queue.push((1.0, b"ready\n"))
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    res = client.post(
+        "/v1/batch",
+        json={
+            "ops": [
+                {"op": "send", "data": ["led", 1]},
+                {"op": "receive"},
+                {"op": "sleep", "seconds": 0.01},
+                {"op": "send", "data": "off", "ending": "\n"},
+                {"op": "get"},
+                {"op": "wait_for", "response": "done"},
+            ]
+        },
+    )
+
+    assert res.status_code == 200
+    results = res.get_json()["results"]
+    assert [r["op"] for r in results] == [
+        "send",
+        "receive",
+        "sleep",
+        "send",
+        "get",
+        "wait_for",
+    ]
+    assert [r["message"] for r in results] == [
+        "OK",
+        "OK",
+        "OK",
+        "OK",
+        "Nothing received",
+        "Nothing received",
+    ]
+    assert results[1]["data"] == "ready"
+    assert list(conn._to_send) == [b"led 1\r\n", b"off\n"]
+
+    # stops at the first failure
+    res = client.post(
+        "/v1/batch",
+        json={
+            "ops": [{"op": "get"}, {"op": "send", "data": "x"}],
+            "stop_on_failure": True,
+        },
+    )
+    assert [r["op"] for r in res.get_json()["results"]] == ["get"]
+
+    # nothing runs if any operation is invalid
+    for ops in (
+        [{"op": "send", "data": "x"}, {"op": "jump"}],
+        [{"op": "send", "data": "x"}, {"op": "wait_for"}],
+        [{"op": "send", "data": "x"}, {"op": "sleep", "seconds": 1000}],
+        [{"op": "send", "data": "x"}, {"op": "receive", "num_before": True}],
+        [{"op": "send", "data": "x", "extra": 1}],
+    ):
+        assert client.post("/v1/batch", json={"ops": ops}).status_code == 400
+
+    assert len(conn._to_send) == 2
+
+
+def test_batch_send_interval() -> None:
+    """Tests that sends in one /batch wait out the send interval and that stop_on_failure accepts strings"""
+
+    conn = Connection(115200, "/dev/ttyUSB0", timeout=0.1, send_interval=0.2)
+    conn._conn = True  # pretend to be connected
+    conn._last_sent = 0.0
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    res = client.post(
+        "/v1/batch",
+        json={
+            "ops": [
+                {"op": "send", "data": "a"},
+                {"op": "get"},
+                {"op": "send", "data": "b"},
+            ],
+            "stop_on_failure": "false",
+        },
+    )
+
+    assert res.status_code == 200
+    assert [r["message"] for r in res.get_json()["results"]] == [
+        "OK",
+        "Nothing received",
+        "OK",
+    ]
+    assert list(conn._to_send) == [b"a\r\n", b"b\r\n"]
+
+
+def test_batch_time_limit(monkeypatch) -> None:
+    """Tests that a batch that can take too long is rejected and one that runs out of time is cut off"""
+
+    conn = Connection(115200, "/dev/ttyUSB0", timeout=4, send_interval=0.2)
+    conn._conn = True  # pretend to be connected
+    conn._last_sent = 0.0
+
+    handler = ConnectionRoutes(conn)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    # rejected before anything runs
+    for ops in (
+        [{"op": "sleep", "seconds": 6}, {"op": "sleep", "seconds": 6}],
+        [{"op": "send", "data": "x"}] + [{"op": "get"}] * 3,
+        [{"op": "wait_for", "response": "ok"}] * 3,
+    ):
+        assert client.post("/v1/batch", json={"ops": ops}).status_code == 400
+
+    assert len(conn._to_send) == 0
+
+    # the second send waits out the send interval, so the last sleep is cut short
+    # and the operations after it do not run
+    monkeypatch.setattr(v1, "BATCH_MAX_TIME", 0.3)
+
+    st = time.time()
+    res = client.post(
+        "/v1/batch",
+        json={
+            "ops": [
+                {"op": "send", "data": "a"},
+                {"op": "send", "data": "b"},
+                {"op": "sleep", "seconds": 0.05},
+                {"op": "sleep", "seconds": 0.05},
+                {"op": "sleep", "seconds": 0.05},
+                {"op": "receive"},
+                {"op": "send", "data": "c"},
+            ]
+        },
+    )
+
+    assert 0.3 <= time.time() - st < 0.6
+    assert [r["message"] for r in res.get_json()["results"]] == [
+        "OK",
+        "OK",
+        "OK",
+        "OK",
+        "Time limit reached",
+    ]
+    assert list(conn._to_send) == [b"a\r\n", b"b\r\n"]
+
+
+def test_macros() -> None:
+    """Tests that /macros/<name> runs a macro with the given parameters"""
+
+    conn = Connection(115200, "/dev/ttyUSB0", timeout=0.2, send_interval=0)
+    conn._conn = True  # pretend to be connected
+
+    handler = ConnectionRoutes(conn)
+    handler.add_macro("set", Macro(MacroStep(send="SET {value}", expect="^OK$")))
+    handler.add_macro("reset", Macro(MacroStep(send="RESET")))
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    res = client.post("/v1/macros/reset")
+    assert res.get_json() == {
+        "message": "OK",
+        "results": [{"message": "OK", "sent": "RESET"}],
+    }
+
+    res = client.post("/v1/macros/set", json={"params": {"value": 3}})
+    assert res.get_json() == {
+        "message": "Nothing received",
+        "results": [{"message": "Nothing received", "sent": "SET 3"}],
+    }
+    assert list(conn._to_send) == [b"RESET\r\n", b"SET 3\r\n"]
+
+    assert client.post("/v1/macros/unknown").status_code == 404
+    assert client.post("/v1/macros/set").status_code == 400
+    assert (
+        client.post("/v1/macros/set", json={"params": {"value": [1]}}).status_code
+        == 400
+    )
+
+
+def test_polls() -> None:
+    """Tests that /polls/<name> responds with the cached response of a poll job"""
+
+    conn = Connection(115200, "/dev/ttyUSB0")
+    conn._conn = True  # pretend to be connected
+
+    handler = ConnectionRoutes(conn)
+    job = PollJob("READ TEMP", 1)
+    handler.add_poll("temp", job)
+    V1(handler)
+
+    app = Flask(__name__)
+    add_resources(Api(app), handler)
+    client = app.test_client()
+
+    assert client.get("/v1/polls/temp").get_json() == {
+        "message": "Nothing received",
+        "failures": 0,
+    }
+
+    job._latest = {"data": "TEMP 21", "groups": [], "timestamp": 1.0}
+    assert client.get("/v1/polls/temp").get_json() == {
+        "message": "OK",
+        "data": "TEMP 21",
+        "groups": [],
+        "timestamp": 1.0,
+        "failures": 0,
+    }
+
+    # does not wait for the serial port
+    handler._lock.acquire()
+    assert client.get("/v1/polls/temp").status_code == 200
+    handler._lock.release()
+
+    assert client.get("/v1/polls/unknown").status_code == 404
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests that threads waiting for received data are woken up by the receive queue's condition variable.
+"""
+
+import threading
+import time
+import typing as t
+
+from com_server import Connection
+from com_server.base_connection import RCV_WAIT_INTERVAL
+
+
+def _connection() -> Connection:
+    conn = Connection(115200, "/dev/ttyUSB0", timeout=5)
+    conn._conn = True  # pretend to be connected
+
+    return conn
+
+
+def _push_later(
+    conn: Connection, data: bytes, pushed_at: t.List[float]
+) -> threading.Thread:
+    """Pushes `data` from another thread after a short delay, recording when"""
+
+    def _run() -> None:
+        time.sleep(0.1)
+        pushed_at.append(time.time())
+        conn._rcv_queue.push((time.time(), data))
+
+    thread = threading.Thread(target=_run)
+    thread.start()
+
+    return thread
+
+
+def test_get_wakes_up() -> None:
+    """
+    get() should return as soon as something is pushed, not at the next check of the connection
+    """
+
+    conn = _connection()
+    pushed_at: t.List[float] = []
+    thread = _push_later(conn, b"hello\n", pushed_at)
+
+    assert conn.get() == "hello"
+    woke_at = time.time()
+    thread.join()
+
+    assert woke_at - pushed_at[0] < RCV_WAIT_INTERVAL / 10
+
+
+def test_wait_for_response_wakes_up() -> None:
+    """
+    wait_for_response() should return as soon as the response is pushed
+    """
+
+    conn = _connection()
+    pushed_at: t.List[float] = []
+    thread = _push_later(conn, b"ready\n", pushed_at)
+
+    assert conn.wait_for_response("ready")
+    woke_at = time.time()
+    thread.join()
+
+    assert woke_at - pushed_at[0] < RCV_WAIT_INTERVAL / 10
+
+
+def test_wait_timeout() -> None:
+    """
+    get() and wait_for_response() should still give up after the timeout if nothing comes
+    """
+
+    conn = _connection()
+    conn._timeout = 0.2
+
+    st = time.time()
+    assert conn.get() is None
+    assert 0.2 <= time.time() - st < 0.2 + RCV_WAIT_INTERVAL / 2
+
+    # something else was received
+    pushed_at: t.List[float] = []
+    thread = _push_later(conn, b"busy\n", pushed_at)
+
+    st = time.time()
+    assert not conn.wait_for_response("ready")
+    assert 0.2 <= time.time() - st < 0.2 + RCV_WAIT_INTERVAL / 2
+    thread.join()
+
+    # a timeout given to the call is used instead of the connection's
+    st = time.time()
+    assert conn.get(timeout=0.05) is None
+    assert not conn.wait_for_response("ready", timeout=0.05)
+    assert 0.1 <= time.time() - st < 0.2
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Tests the WebSocket server.
+"""
+
+import base64
+import io
+import os
+import socket
+import struct
+import time
+import typing as t
+from types import SimpleNamespace
+
+import pytest
+from com_server import AsyncConnection, Connection, WebSocketServer
+from com_server.websocket import _encode_frame, _Handler, _unmask
+
+
+def _frame(opcode: int, payload: bytes, fin: bool = True) -> bytes:
+    """Encodes a masked frame like a client"""
+
+    mask = os.urandom(4)
+    header = bytes([(0x80 if fin else 0) | opcode])
+
+    if len(payload) < 126:
+        header += bytes([0x80 | len(payload)])
+    else:
+        header += bytes([0x80 | 126]) + struct.pack("!H", len(payload))
+
+    return header + mask + bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+
+
+def _read_frame(sock: socket.socket) -> tuple:
+    """Reads an unmasked frame like a client"""
+
+    header = sock.recv(2, socket.MSG_WAITALL)
+    size = header[1] & 0x7F
+
+    if size == 126:
+        size = struct.unpack("!H", sock.recv(2, socket.MSG_WAITALL))[0]
+
+    return header[0] & 0x0F, sock.recv(size, socket.MSG_WAITALL) if size else b""
+
+
+def _open(address: tuple) -> socket.socket:
+    """Connects and does the opening handshake"""
+
+    sock = socket.create_connection(address)
+    sock.settimeout(5)
+
+    key = base64.b64encode(os.urandom(16)).decode()
+    sock.sendall(
+        (
+            "GET / HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Key: {key}\r\nSec-WebSocket-Version: 13\r\n\r\n"
+        ).encode()
+    )
+
+    response = b""
+    while not response.endswith(b"\r\n\r\n"):
+        response += sock.recv(1)
+
+    assert response.startswith(b"HTTP/1.1 101")
+
+    return sock
+
+
+def test_frames() -> None:
+    """
+    Tests encoding frames and unmasking payloads
+    """
+
+    assert _encode_frame(0x2, b"abc") == b"\x82\x03abc"
+    assert _encode_frame(0x2, b"a" * 200)[:4] == b"\x82\x7e\x00\xc8"
+    assert _encode_frame(0x2, b"a" * 70000)[:10] == b"\x82\x7f" + struct.pack(
+        "!Q", 70000
+    )
+
+    mask = b"\x01\x02\x03\x04"
+    masked = bytes(b ^ mask[i % 4] for i, b in enumerate(b"hello world"))
+    assert _unmask(masked, mask) == b"hello world"
+    assert _unmask(b"", mask) == b""
+
+
+def test_read_cut_off_frame() -> None:
+    """
+    A frame cut off anywhere, including in its extended length, should read as a closed connection
+    """
+
+    def read(data: bytes) -> t.Optional[tuple]:
+        return _Handler._read_frame(SimpleNamespace(rfile=io.BytesIO(data)))  # type: ignore
+
+    frame = _frame(0x2, b"a" * 200)
+
+    assert read(frame) == (True, 0x2, b"a" * 200)
+
+    for size in (0, 1, 3, 5, len(frame) - 1):
+        assert read(frame[:size]) is None
+
+    # 64-bit length
+    assert read(b"\x82\xff" + struct.pack("!Q", 5)[:4]) is None
+
+
+def test_websocket_send_receive() -> None:
+    """
+    Messages should go into the send queue and received data should be sent to the client
+    """
+
+    conn = Connection(115200, "/dev/ttyUSB0", send_interval=0)
+    conn._conn = True  # pretend to be connected
+
+    ws = WebSocketServer(conn, "127.0.0.1", 0)
+    ws.start()
+
+    try:
+        sock = _open(ws.address)
+
+        sock.sendall(_frame(0x1, b"hello\n"))
+        sock.sendall(_frame(0x2, b"frag", fin=False) + _frame(0x9, b"hi"))
+        sock.sendall(_frame(0x0, b"ment"))
+
+        assert _read_frame(sock) == (0xA, b"hi")
+
+        deadline = time.time() + 5
+        while len(conn._to_send) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert list(conn._to_send) == [b"hello\n", b"fragment"]
+
+        conn._rcv_queue.push((1.0, b"abc"), (2.0, b"def"))
+        assert _read_frame(sock) == (0x2, b"abc")
+        assert _read_frame(sock) == (0x2, b"def")
+
+        sock.sendall(_frame(0x8, struct.pack("!H", 1000)))
+        assert _read_frame(sock) == (0x8, struct.pack("!H", 1000))
+        sock.close()
+
+        # not a WebSocket handshake
+        sock = socket.create_connection(ws.address)
+        sock.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        assert sock.recv(100).startswith(b"HTTP/1.1 400")
+        sock.close()
+    finally:
+        ws.shutdown()
+
+
+def test_websocket_exceptions() -> None:
+    """
+    Should check the connection type, rejecting async connections, and only start once
+    """
+
+    with pytest.raises(TypeError):
+        WebSocketServer("/dev/ttyUSB0", "127.0.0.1", 0)  # type: ignore
+
+    with pytest.raises(TypeError):
+        WebSocketServer(AsyncConnection(115200, "/dev/ttyUSB0"), "127.0.0.1", 0)
+
+    ws = WebSocketServer(Connection(115200, "/dev/ttyUSB0"), "127.0.0.1", 0)
+    ws.start()
+
+    with pytest.raises(RuntimeError):
+        ws.start()
+
+    ws.shutdown()